@@ -1,9 +1,15 @@
 #!/usr/bin/env python
+import os
+import sys
 import argparse
 import logging
 import asyncio
+from concurrent.futures import ProcessPoolExecutor
 
 
+LOGGER = logging.getLogger('cloud.s3')
+RESUME_FOLDER = os.path.join(os.path.expanduser('~'), '.s3upload')
+
 parser = argparse.ArgumentParser(
     description='Upload a file or a directory to s3')
 parser.add_argument('path', nargs=1,
@@ -12,22 +18,120 @@ parser.add_argument('--bucket', '-b', nargs=1, required=True,
                     help='Bucket name to upload files to')
 parser.add_argument('--region', '-r', dest='region', default='us-east-1',
                     help='S3 region to upload files')
-
-args = parser.parse_args()
+parser.add_argument('--endpoint-url', default=None,
+                    help='Optional url of the S3 endpoint')
+parser.add_argument('--workers', '-w', type=int, default=1,
+                    help='Number of processes uploading files, each with '
+                         'its own event loop and connection pool')
+parser.add_argument('--concurrency', '-c', type=int, default=10,
+                    help='Maximum number of files uploaded concurrently '
+                         'by each process')
+parser.add_argument('--part-size', type=int, default=8,
+                    help='Size in MB of the parts of multipart uploads, '
+                         'at least 5')
+parser.add_argument('--sync', action='store_true',
+                    help='Skip files already uploaded with the same size '
+                         'and a later modification time')
+parser.add_argument('--bandwidth', type=float, default=None,
+                    help='Maximum upload bandwidth in MB per second shared '
+                         'by all workers')
+parser.add_argument('--verify', action='store_true',
+                    help='Verify the ETags of uploaded files and parts '
+                         'against their MD5 digests')
+parser.add_argument('--resume', nargs='?', const=RESUME_FOLDER, default=None,
+                    help='Save the state of multipart uploads in a folder, '
+                         '%s by default, and resume failed uploads'
+                         % RESUME_FOLDER)
 
 
-def upload(options, loop=None):
+def upload(options, loop=None, files=None):
     from cloud.aws import AsyncioBotocore
+    from cloud.utils.s3 import bandwidth
+    if options.bandwidth:
+        bandwidth.set_rate(options.bandwidth*2**20/options.workers)
     bucket = options.bucket[0]
     bits = bucket.split('/')
     bucket = bits[0]
     key = '/'.join(bits[1:])
-    s3 = AsyncioBotocore('s3', options.region, loop=loop)
-    return s3.upload_folder(bucket, options.path[0], key=key)
+    s3 = AsyncioBotocore('s3', options.region, loop=loop,
+                         endpoint_url=options.endpoint_url)
+    return s3.upload_folder(bucket, options.path[0], key=key, files=files,
+                            concurrency=options.concurrency,
+                            part_size=options.part_size*2**20,
+                            sync=options.sync, resume=options.resume,
+                            verify=options.verify)
+
+
+def upload_shard(options, files):
+    """Upload ``files`` in a worker process with a new event loop
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(upload(options, loop, files))
+    finally:
+        loop.close()
+
+
+def shard_files(files, workers):
+    """Split the dictionary of file sizes ``files`` into ``workers``
+    dictionaries of similar total size
+    """
+    shards = [{} for _ in range(workers)]
+    sizes = [0]*workers
+    for path, size in sorted(files.items(), key=lambda f: f[1],
+                             reverse=True):
+        index = sizes.index(min(sizes))
+        shards[index][path] = size
+        sizes[index] += size
+    return [shard for shard in shards if shard]
+
+
+def merge_results(results):
+    merged = dict(failures={}, files={}, skipped={}, total_size=0,
+                  part_retries=0)
+    for result in results:
+        merged['failures'].update(result['failures'])
+        merged['files'].update(result['files'])
+        merged['skipped'].update(result['skipped'])
+        merged['total_size'] += result['total_size']
+        merged['part_retries'] += result['part_retries']
+    return merged
+
+
+def upload_workers(options):
+    from cloud.utils.s3 import folder_files, convert_bytes
+    path = options.path[0]
+    if not os.path.isdir(path):
+        raise ValueError('%s not a folder' % path)
+    shards = shard_files(folder_files(path), options.workers)
+    with ProcessPoolExecutor(max_workers=len(shards) or 1) as executor:
+        results = merge_results(executor.map(
+            upload_shard, [options]*len(shards), shards))
+    for key in sorted(results['failures']):
+        LOGGER.error('Could not upload "%s"', key)
+    LOGGER.info('%d workers uploaded %d files for a total of %s. '
+                '%d failures, %d skipped, %d part retries', len(shards),
+                len(results['files']), convert_bytes(results['total_size']),
+                len(results['failures']), len(results['skipped']),
+                results['part_retries'])
+    return results
+
+
+def main():
+    options = parser.parse_args()
+    if options.part_size < 5:
+        parser.error('part size must be at least 5MB')
+    if options.workers > 1:
+        logging.basicConfig(format='%(processName)s %(message)s',
+                            level=logging.INFO)
+        results = upload_workers(options)
+    else:
+        logging.basicConfig(format='%(message)s', level=logging.INFO)
+        loop = asyncio.get_event_loop()
+        results = loop.run_until_complete(upload(options, loop=loop))
+    return 1 if results['failures'] else 0
 
 
 if __name__ == "__main__":
-    logging.basicConfig(format='%(message)s', level=logging.INFO)
-    loop = asyncio.get_event_loop()
-    result = upload(parser.parse_args(), loop=loop)
-    loop.run_until_complete(result)
+    sys.exit(main())
@@ -1,3 +1,10 @@
-from .session import get_session
-
 __all__ = ['get_session']
+
+
+def get_session(env_vars=None):
+    """Return a new :class:`.AsyncSession`
+
+    botocore session machinery is imported on first use
+    """
+    from .session import get_session
+    return get_session(env_vars)
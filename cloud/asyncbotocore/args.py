@@ -2,14 +2,74 @@ import copy
 
 import botocore.serialize
 from botocore.args import ClientArgsCreator
-from botocore.signers import RequestSigner
 
-from .endpoint import AsyncEndpointCreator
+from .endpoint import AsyncEndpointCreator, _proxies
 from .config import AsyncConfig
+from .signers import AsyncRequestSigner
+from .hashing import register_handlers
+
+
+# Results of compute_client_args shared by all sessions, keyed by service
+# model, region, endpoint url, scheme and configuration
+_client_args = {}
+
+
+def clear_args_cache():
+    """Clear the process-wide cache of computed client arguments and
+    endpoint proxies, needed when proxy environment variables change
+    """
+    _client_args.clear()
+    _proxies.clear()
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    elif isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _config_key(config):
+    if config is None:
+        return None
+    return tuple(_freeze(getattr(config, name, None))
+                 for name in config.OPTION_DEFAULTS)
 
 
 class AsyncClientArgsCreator(ClientArgsCreator):
 
+    def compute_client_args(self, service_model, client_config,
+                            endpoint_bridge, region_name, endpoint_url,
+                            is_secure, scoped_config):
+        """Memoized :meth:`ClientArgsCreator.compute_client_args`
+
+        Endpoint resolution, signing region and configuration only depend
+        on the arguments, therefore they are computed once per process
+        for each combination and copied for every new client
+        """
+        try:
+            key = (service_model, region_name, endpoint_url, is_secure,
+                   self._user_agent, endpoint_bridge.endpoint_resolver,
+                   endpoint_bridge.service_signing_name,
+                   _config_key(client_config), _freeze(scoped_config))
+            final_args = _client_args.get(key)
+        except TypeError:
+            # unhashable configuration values, do not cache
+            key = final_args = None
+        if final_args is None:
+            final_args = super().compute_client_args(
+                service_model, client_config, endpoint_bridge, region_name,
+                endpoint_url, is_secure, scoped_config)
+            if key is not None:
+                _client_args[key] = final_args
+        # clients may modify their configuration, copy mutable values
+        final_args = dict(final_args)
+        for name in ('endpoint_config', 'config_kwargs', 's3_config'):
+            if final_args[name] is not None:
+                final_args[name] = dict(final_args[name])
+        return final_args
+
     def get_client_args(self, service_model, region_name, is_secure,
                         endpoint_url, verify, credentials, scoped_config,
                         client_config, endpoint_bridge, http_session):
@@ -28,7 +88,8 @@ class AsyncClientArgsCreator(ClientArgsCreator):
         partition = endpoint_config['metadata'].get('partition', None)
 
         event_emitter = copy.copy(self._event_emitter)
-        signer = RequestSigner(
+        register_handlers(event_emitter)
+        signer = AsyncRequestSigner(
             service_name, endpoint_config['signing_region'],
             endpoint_config['signing_name'],
             endpoint_config['signature_version'],
@@ -39,7 +100,14 @@ class AsyncClientArgsCreator(ClientArgsCreator):
 
         # END OF CUT AND PASTE
 
-        new_config = AsyncConfig(**config_kwargs)
+        new_config = AsyncConfig(
+            connector_args=getattr(client_config, 'connector_args', None),
+            retry_args=getattr(client_config, 'retry_args', None),
+            hedge_args=getattr(client_config, 'hedge_args', None),
+            deadline=getattr(client_config, 'deadline', None),
+            instrumentation=getattr(client_config, 'instrumentation', None),
+            metrics=getattr(client_config, 'metrics', None),
+            **config_kwargs)
         endpoint_creator = AsyncEndpointCreator(http_session, event_emitter)
 
         # CUT AND PASTE FROM BOTOCORE
@@ -49,7 +117,11 @@ class AsyncClientArgsCreator(ClientArgsCreator):
             endpoint_url=endpoint_config['endpoint_url'], verify=verify,
             response_parser_factory=self._response_parser_factory,
             max_pool_connections=new_config.max_pool_connections,
-            timeout=(new_config.connect_timeout, new_config.read_timeout))
+            timeout=(new_config.connect_timeout, new_config.read_timeout),
+            retry_args=new_config.retry_args,
+            hedge_args=new_config.hedge_args,
+            instrumentation=new_config.instrumentation,
+            metrics_registry=new_config.metrics)
 
         serializer = botocore.serialize.create_serializer(
             protocol, parameter_validation)
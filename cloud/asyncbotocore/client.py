@@ -1,10 +1,60 @@
+import asyncio
+import weakref
+from contextlib import contextmanager
+
 import botocore.parsers
-from botocore.exceptions import ClientError, OperationNotPageableError
+from botocore.exceptions import (
+    BotoCoreError, ClientError, OperationNotPageableError
+)
 from botocore.utils import get_service_module_name
 from botocore.paginate import Paginator
+from botocore.model import ServiceModel
 
 from .paginate import AsyncPageIterator
 from .args import AsyncClientArgsCreator
+from .credentials import CredentialCache
+from .hashing import hash_request
+
+
+# Process-wide caches of service models and client classes
+_service_models = {}
+_client_classes = {}
+# Number of open clients using an http session
+_session_refs = weakref.WeakKeyDictionary()
+# Calls accepted while a client drains, they clean up after operations
+# failing because of the drain
+CLEANUP_OPERATIONS = frozenset(('AbortMultipartUpload',))
+
+
+def clear_client_cache():
+    _service_models.clear()
+    _client_classes.clear()
+
+
+def acquire_session(http_session):
+    """Add a reference to ``http_session``
+    """
+    _session_refs[http_session] = _session_refs.get(http_session, 0) + 1
+
+
+def release_session(http_session):
+    """Remove a reference to ``http_session`` and close it when no longer
+    referenced
+
+    :return: an awaitable
+    """
+    refs = _session_refs.get(http_session, 0) - 1
+    if refs > 0:
+        _session_refs[http_session] = refs
+        return asyncio.gather(loop=http_session._loop)
+    _session_refs.pop(http_session, None)
+    return http_session.close()
+
+
+class ClientClosedError(BotoCoreError):
+    """A call was made with a closed or draining client.
+    """
+    fmt = 'Client is closed, cannot call "{operation_name}"'
 
 
 class AsyncClientCreator(botocore.client.ClientCreator):
@@ -29,7 +79,43 @@ class AsyncClientCreator(botocore.client.ClientCreator):
             verify, credentials, scoped_config, client_config, endpoint_bridge,
             self.http_session)
 
+    def _load_service_model(self, service_name, api_version=None):
+        key = (self._loader, service_name, api_version)
+        service_model = _service_models.get(key)
+        if service_model is None:
+            json_model = self._loader.load_service_model(
+                service_name, 'service-2', api_version=api_version)
+            service_model = ServiceModel(json_model,
+                                         service_name=service_name)
+            _service_models[key] = service_model
+        # retry handlers are registered with the session event emitter
+        self._register_retries(service_model)
+        return service_model
+
     def _create_client_class(self, service_name, service_model):
+        # classes are customised by creating-client-class handlers,
+        # sessions with different handlers do not share classes
+        handlers = self._class_handlers(service_name)
+        if handlers is None:
+            return self._new_client_class(service_name, service_model)
+        key = (service_name, service_model, handlers)
+        cls = _client_classes.get(key)
+        if cls is None:
+            cls = self._new_client_class(service_name, service_model)
+            _client_classes[key] = cls
+        return cls
+
+    def _class_handlers(self, service_name):
+        """Tuple of handlers of the ``creating-client-class`` event of
+        ``service_name``, ``None`` if they cannot be inspected
+        """
+        try:
+            search = self._event_emitter._handlers.prefix_search
+        except AttributeError:
+            return None
+        return tuple(search('creating-client-class.%s' % service_name))
+
+    def _new_client_class(self, service_name, service_model):
         class_attributes = self._create_methods(service_model)
         py_name_to_operation_name = self._create_name_mapping(service_model)
         class_attributes['_PY_TO_OP_NAME'] = py_name_to_operation_name
@@ -43,6 +129,22 @@ class AsyncClientCreator(botocore.client.ClientCreator):
 
 
 class AsyncBaseClient(botocore.client.BaseClient):
+    """Base class of asynchronous clients
+
+    Clients hold a reference to their http session, which is closed when
+    the last client using it is closed, and to their
+    :class:`.CredentialCache`, which stops refreshing credentials in the
+    background.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._closing = False
+        self._closed = False
+        self._in_flight = 0
+        self._drained = None
+        acquire_session(self.http_session)
+        if isinstance(self._credentials, CredentialCache):
+            self._credentials.start(self._loop)
 
     @property
     def http_session(self):
@@ -52,15 +154,81 @@ class AsyncBaseClient(botocore.client.BaseClient):
     def _loop(self):
         return self._endpoint._loop
 
+    @property
+    def _credentials(self):
+        return self._request_signer._credentials
+
+    @property
+    def in_flight(self):
+        """Number of calls and operations in progress
+        """
+        return self._in_flight
+
+    @contextmanager
+    def operation(self):
+        """Context manager of a high level operation made of several calls,
+        such as a multipart upload.
+
+        :meth:`drain` waits for operations in progress as it does for calls
+        """
+        self._in_flight += 1
+        try:
+            yield self
+        finally:
+            self._done()
+
     async def _make_api_call(self, operation_name, api_params):
+        if self._closing and (self._closed or
+                              operation_name not in CLEANUP_OPERATIONS):
+            raise ClientClosedError(operation_name=operation_name)
+        with self.operation():
+            return await self._timed_call(operation_name, api_params)
+
+    def _done(self):
+        self._in_flight -= 1
+        drained = self._drained
+        if not self._in_flight and drained and not drained.done():
+            drained.set_result(None)
+
+    async def _timed_call(self, operation_name, api_params):
+        instrumentation = self._endpoint.instrumentation
+        if instrumentation is None:
+            return await self._api_call(operation_name, api_params)
+        timings = instrumentation.start(self._service_model.endpoint_prefix,
+                                        operation_name, self._loop)
+        try:
+            return await self._api_call(operation_name, api_params, timings)
+        except Exception as exc:
+            timings.error = exc
+            raise
+        finally:
+            instrumentation.finish(timings)
+
+    async def _api_call(self, operation_name, api_params, timings=None):
+        # the deadline covers connections, reads and retries of the call
+        deadline = api_params.pop('deadline', None)
+        if deadline is None:
+            deadline = getattr(self.meta.config, 'deadline', None)
         operation_model = self._service_model.operation_model(operation_name)
         request_context = {
             'client_region': self.meta.region_name,
             'client_config': self.meta.config,
             'has_streaming_input': operation_model.has_streaming_input
         }
+        if deadline is not None:
+            request_context['deadline'] = self._loop.time() + deadline
+        if timings is not None:
+            request_context['timings'] = timings
+            start = timings.clock()
         request_dict = self._convert_to_request_dict(
             api_params, operation_model, context=request_context)
+        if timings is not None:
+            timings.phase('serialize', start)
+            start = timings.clock()
+        await hash_request(operation_name, request_dict, request_context,
+                           loop=self._loop)
+        if timings is not None:
+            timings.phase('hash', start)
 
         self.meta.events.emit(
             'before-call.{endpoint_prefix}.{operation_name}'.format(
@@ -70,8 +238,13 @@ class AsyncBaseClient(botocore.client.BaseClient):
             request_signer=self._request_signer, context=request_context
         )
 
-        http, parsed_response = await self._endpoint.make_request(
-            operation_model, request_dict)
+        hedger = self._endpoint.hedger
+        if hedger and operation_name in hedger.operations:
+            http, parsed_response = await hedger.make_request(
+                self._endpoint, operation_model, request_dict)
+        else:
+            http, parsed_response = await self._endpoint.make_request(
+                operation_model, request_dict)
 
         self.meta.events.emit(
             'after-call.{endpoint_prefix}.{operation_name}'.format(
@@ -109,15 +282,53 @@ class AsyncBaseClient(botocore.client.BaseClient):
             Paginator.PAGE_ITERATOR_CLS = AsyncPageIterator
             paginator = Paginator(
                 getattr(self, operation_name),
-                self._cache['page_config'][actual_operation_name])
+                self._cache['page_config'][actual_operation_name],
+                self._service_model.operation_model(actual_operation_name))
             return paginator
 
     async def __aenter__(self):
-        await self.http_session.__aenter__()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.http_session.__aexit__(exc_type, exc_val, exc_tb)
+        await self.drain()
 
     def close(self):
-        return self.http_session.close()
+        """Close the client without waiting for calls in progress
+
+        The http session is closed, and background refreshes of credentials
+        stopped, if no other client uses them.
+
+        :return: an awaitable
+        """
+        self._closing = True
+        if self._closed:
+            return asyncio.gather(loop=self._loop)
+        self._closed = True
+        if isinstance(self._credentials, CredentialCache):
+            self._credentials.release()
+        return release_session(self.http_session)
+
+    async def drain(self, timeout=None):
+        """Stop accepting calls, wait for calls in progress to finish and
+        close the client
+
+        High level operations in progress, see :meth:`operation`, are
+        waited for. Their next call fails once draining has started, apart
+        from calls cleaning up after them such as aborting a multipart
+        upload.
+
+        :param timeout: optional number of seconds to wait for calls in
+            progress, they are not cancelled when it expires
+        :return: the number of calls still in progress
+        """
+        self._closing = True
+        if self._in_flight:
+            if self._drained is None:
+                self._drained = self._loop.create_future()
+            try:
+                await asyncio.wait_for(asyncio.shield(self._drained),
+                                       timeout, loop=self._loop)
+            except asyncio.TimeoutError:
+                pass
+        await self.close()
+        return self._in_flight
@@ -4,12 +4,35 @@ import copy
 import botocore.client
 from botocore.exceptions import ParamValidationError
 
+from .instrumentation import Instrumentation
+from .metrics import MetricsRegistry
+from .ratelimit import JITTERS
+
 
 class AsyncConfig(botocore.client.Config):
 
-    def __init__(self, connector_args=None, **kwargs):
+    def __init__(self, connector_args=None, retry_args=None, hedge_args=None,
+                 deadline=None, instrumentation=None, metrics=None,
+                 **kwargs):
         super().__init__(**kwargs)
 
+        if (instrumentation is not None and
+                not isinstance(instrumentation, Instrumentation)):
+            raise ParamValidationError(
+                report='instrumentation must be an Instrumentation instance')
+        self.instrumentation = instrumentation
+
+        if (metrics is not None and metrics is not False and
+                not isinstance(metrics, MetricsRegistry)):
+            raise ParamValidationError(
+                report='metrics must be a MetricsRegistry instance or False')
+        self.metrics = metrics
+
+        if deadline is not None and not isinstance(deadline, (int, float)):
+            raise ParamValidationError(
+                report='deadline value must be a float/int')
+        self.deadline = deadline
+
         self._validate_connector_args(connector_args)
         self.connector_args = copy.copy(connector_args)
         if not self.connector_args:
@@ -22,11 +45,32 @@ class AsyncConfig(botocore.client.Config):
             # reasonable here
             self.connector_args['keepalive_timeout'] = 12
 
+        self._validate_retry_args(retry_args)
+        self.retry_args = copy.copy(retry_args) or {}
+
+        self._validate_hedge_args(hedge_args)
+        self.hedge_args = copy.copy(hedge_args) or {}
+
     def merge(self, other_config):
         # Adapted from parent class
         config_options = copy.copy(self._user_provided_options)
         config_options.update(other_config._user_provided_options)
-        return AsyncConfig(self.connector_args, **config_options)
+        retry_args = copy.copy(self.retry_args)
+        retry_args.update(getattr(other_config, 'retry_args', None) or ())
+        hedge_args = copy.copy(self.hedge_args)
+        hedge_args.update(getattr(other_config, 'hedge_args', None) or ())
+        deadline = getattr(other_config, 'deadline', None)
+        if deadline is None:
+            deadline = self.deadline
+        instrumentation = getattr(other_config, 'instrumentation', None)
+        if instrumentation is None:
+            instrumentation = self.instrumentation
+        metrics = getattr(other_config, 'metrics', None)
+        if metrics is None:
+            metrics = self.metrics
+        return AsyncConfig(self.connector_args, retry_args, hedge_args,
+                           deadline, instrumentation, metrics,
+                           **config_options)
 
     @staticmethod
     def _validate_connector_args(connector_args):
@@ -58,3 +102,54 @@ class AsyncConfig(botocore.client.Config):
             else:
                 raise ParamValidationError(
                     report='invalid connector_arg:{}'.format(k))
+
+    @staticmethod
+    def _validate_retry_args(retry_args):
+        if retry_args is None:
+            return
+
+        for k, v in retry_args.items():
+            if k == 'adaptive':
+                if not isinstance(v, bool):
+                    raise ParamValidationError(
+                        report='{} value must be a boolean'.format(k))
+            elif k in ['budget_ratio', 'min_rate']:
+                if not isinstance(v, float) and not isinstance(v, int):
+                    raise ParamValidationError(
+                        report='{} value must be a float/int'.format(k))
+            elif k == 'min_retries':
+                if not isinstance(v, int):
+                    raise ParamValidationError(
+                        report='{} value must be an int'.format(k))
+            elif k == 'jitter':
+                if v not in JITTERS:
+                    raise ParamValidationError(
+                        report='{} value must be one of {}'.format(
+                            k, ', '.join(JITTERS)))
+            else:
+                raise ParamValidationError(
+                    report='invalid retry_arg:{}'.format(k))
+
+    @staticmethod
+    def _validate_hedge_args(hedge_args):
+        if hedge_args is None:
+            return
+
+        for k, v in hedge_args.items():
+            if k == 'operations':
+                if (not isinstance(v, (list, tuple, set, frozenset)) or
+                        not all(isinstance(o, str) for o in v)):
+                    raise ParamValidationError(
+                        report='{} value must be a list of operation '
+                               'names'.format(k))
+            elif k in ['percentile', 'max_ratio', 'min_delay']:
+                if not isinstance(v, float) and not isinstance(v, int):
+                    raise ParamValidationError(
+                        report='{} value must be a float/int'.format(k))
+            elif k == 'min_samples':
+                if not isinstance(v, int):
+                    raise ParamValidationError(
+                        report='{} value must be an int'.format(k))
+            else:
+                raise ParamValidationError(
+                    report='invalid hedge_arg:{}'.format(k))
@@ -0,0 +1,124 @@
+"""Credentials refreshed off the event loop thread"""
+import asyncio
+import logging
+from collections import Counter
+
+
+LOGGER = logging.getLogger('cloud.credentials')
+# Seconds to wait before retrying a failed background refresh
+RETRY_INTERVAL = 30
+
+
+class CredentialCache:
+    """Cache the frozen credentials of a botocore ``credentials`` object.
+
+    Botocore refreshes expiring credentials synchronously, in the event
+    loop thread, when signing a request. Instead, this cache refreshes
+    them in a thread pool once they are within the botocore advisory
+    refresh timeout, and the signer uses the cached credentials in the
+    meantime. Credentials are refreshed synchronously only once they are
+    within the botocore mandatory refresh timeout.
+
+    Clients using the cache :meth:`start` it when created and
+    :meth:`release` it when closed, background refreshes stop once the
+    last client is closed.
+
+    .. attribute:: stats
+
+        A :class:`~collections.Counter` of background ``refreshes``,
+        refresh ``failures`` and ``blocking`` refreshes
+    """
+    def __init__(self, credentials, loop=None):
+        self.credentials = credentials
+        self.stats = Counter()
+        self._loop = loop
+        self._frozen = None
+        self._refreshing = None
+        self._timer = None
+        self._clients = 0
+
+    def __getattr__(self, name):
+        return getattr(self.credentials, name)
+
+    @property
+    def refreshable(self):
+        return hasattr(self.credentials, 'refresh_needed')
+
+    def start(self, loop=None):
+        """Add a client of the cache and start refreshing credentials in
+        the background
+        """
+        self._clients += 1
+        if self._loop is None:
+            self._loop = loop or asyncio.get_event_loop()
+        if self.refreshable and self._timer is None:
+            self._schedule()
+
+    def release(self):
+        """Remove a client of the cache, background refreshes stop when
+        no client is left
+        """
+        self._clients = max(self._clients - 1, 0)
+        if not self._clients:
+            self.stop()
+
+    def stop(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    def get_frozen_credentials(self):
+        if not self.refreshable:
+            return self.credentials.get_frozen_credentials()
+        credentials = self.credentials
+        if credentials.refresh_needed():
+            if (self._frozen is None or credentials.refresh_needed(
+                    credentials._mandatory_refresh_timeout)):
+                self.stats['blocking'] += 1
+                self._frozen = credentials.get_frozen_credentials()
+            else:
+                self.refresh()
+        elif self._frozen is None:
+            # no refresh needed, botocore does not block
+            self._frozen = credentials.get_frozen_credentials()
+        return self._frozen
+
+    def refresh(self):
+        """Refresh credentials in the thread pool
+
+        :return: a :class:`~asyncio.Future` done when the refresh finishes
+        """
+        if self._refreshing is None:
+            loop = self._loop or asyncio.get_event_loop()
+            self._refreshing = asyncio.ensure_future(self._refresh(loop),
+                                                     loop=loop)
+        return self._refreshing
+
+    async def _refresh(self, loop):
+        failed = False
+        try:
+            self._frozen = await loop.run_in_executor(
+                None, self.credentials.get_frozen_credentials)
+        except Exception:
+            failed = True
+            self.stats['failures'] += 1
+            LOGGER.exception('Could not refresh credentials')
+        else:
+            self.stats['refreshes'] += 1
+        finally:
+            self._refreshing = None
+        if self._timer is not None:
+            self._schedule(failed)
+
+    def _schedule(self, failed=False):
+        credentials = self.credentials
+        delay = (credentials._seconds_remaining() -
+                 credentials._advisory_refresh_timeout)
+        if delay <= 0:
+            # refresh straight away when starting, wait before retrying
+            # a refresh which failed or did not extend the expiry
+            if failed or self._frozen is not None:
+                delay = RETRY_INTERVAL
+            else:
+                delay = 0
+        self._timer = self._loop.call_later(delay, self.refresh)
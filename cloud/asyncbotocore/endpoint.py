@@ -1,15 +1,131 @@
 import asyncio
 import logging
 import zlib
+from asyncio import ensure_future
+from collections import Counter
+from inspect import isawaitable, iscoroutine
 
 import botocore.endpoint
 from botocore.endpoint import first_non_none_response, MAX_POOL_CONNECTIONS
-from botocore.exceptions import EndpointConnectionError, ConnectionClosedError
+from botocore.exceptions import (
+    EndpointConnectionError, ConnectionClosedError, BotoCoreError
+)
 from botocore.utils import is_valid_endpoint_url
+from botocore.vendored.requests import Timeout
+
+from .ratelimit import (
+    AdaptiveRateLimiter, RetryBudget, is_throttled, jitter_delay
+)
+from .hedging import Hedger
+from . import metrics
 
 
 logger = logging.getLogger(__name__)
 DEFAULT_TIMEOUT = 60
+# Environment proxies of endpoint urls, shared by all endpoint creators
+_proxies = {}
+
+
+class RequestTimeoutError(Timeout):
+    """An attempt did not complete within the connect and read timeouts.
+
+    It is a subclass of the requests ``Timeout`` exception so that it
+    is retried by botocore retry handlers.
+    """
+
+
+class SendProgress:
+    """Progress of sending a request, it restarts the read timeout.
+
+    A request progresses when it obtains a connection, when a chunk of a
+    streamed body is produced and when the write buffer of the connection
+    shrinks (sampled each time the timeout expires).
+
+    A streamed body is written by a task of the http client which outlives
+    a failed attempt, :meth:`close` stops it.
+
+    .. attribute:: body
+
+        The request body to send, streamed bodies are wrapped so that
+        each chunk is recorded
+    """
+    def __init__(self, body, loop):
+        self.body = body
+        self.connected = False
+        self.closed = False
+        self.transport = None
+        self._loop = loop
+        self._buffered = 0
+        self._pending = None
+        self._last = loop.time()
+        if body and is_streamed(body):
+            self.body = self._stream(body)
+
+    def connect(self, response, exc=None):
+        """``pre_request`` event of the http response, a connection
+        was obtained and the request is about to be written
+        """
+        self.connected = True
+        self.transport = getattr(response, 'transport', None)
+        self.advance()
+        self._loop.call_soon(self.poll)
+
+    def advance(self):
+        self._last = self._loop.time()
+
+    def poll(self):
+        """Sample the write buffer of the connection
+        """
+        if self.transport is None:
+            return
+        buffered = self.transport.get_write_buffer_size()
+        if buffered != self._buffered:
+            self._buffered = buffered
+            self.advance()
+
+    def timeout(self, connect_timeout, read_timeout):
+        """Time left before the request times out
+        """
+        timeout = read_timeout if self.connected else connect_timeout
+        return self._last + timeout - self._loop.time()
+
+    def close(self):
+        """Stop sending a streamed body, the chunk being awaited is
+        cancelled and no other chunk is produced
+        """
+        self.closed = True
+        if self._pending is not None:
+            self._pending.cancel()
+
+    def _stream(self, body):
+        for chunk in body:
+            if self.closed:
+                if iscoroutine(chunk):
+                    chunk.close()
+                break
+            self.advance()
+            if isawaitable(chunk):
+                chunk = self._pending = ensure_future(chunk, loop=self._loop)
+            yield chunk
+
+
+def is_streamed(body):
+    """Whether ``body`` is sent by iterating it, as pulsar does for
+    bodies without a length
+    """
+    if isinstance(body, (bytes, str)):
+        return False
+    try:
+        len(body)
+    except TypeError:
+        return True
+    return False
+
+
+class DeadlineExceededError(BotoCoreError):
+    """The deadline of an operation expired.
+    """
+    fmt = 'Deadline exceeded for "{endpoint_url}" after {attempts} attempts'
 
 
 async def convert_to_response_dict(http_response, operation_model):
@@ -54,6 +170,14 @@ async def read(http_response):
     return body
 
 
+def close_connection(http_response):
+    """Close the connection of a partially read ``http_response``
+    """
+    connection = getattr(http_response, 'connection', None)
+    if connection is not None:
+        connection.close()
+
+
 def patch_stream(raw):
     raw.set_socket_timeout = noop
     return raw
@@ -68,50 +192,136 @@ class AsyncEndpoint(botocore.endpoint.Endpoint):
 
     the ``http_session`` object is an asynchronous http client with
     and api similar to python requests
+
+    .. attribute:: rate_limiter
+
+        :class:`.AdaptiveRateLimiter` shared by all requests to this
+        endpoint, ``None`` when adaptive rate limiting is disabled
+
+    .. attribute:: retry_budget
+
+        :class:`.RetryBudget` capping retries as a fraction of requests
+
+    .. attribute:: retry_stats
+
+        A :class:`~collections.Counter` of ``requests``, ``retries``,
+        ``throttled`` responses, retries ``denied`` by the retry budget,
+        retries not attempted because of the ``deadline`` and total
+        ``retry_sleep`` time
+
+    .. attribute:: hedger
+
+        :class:`.Hedger` for operations configured via ``hedge_args``,
+        ``None`` when hedging is disabled
+
+    .. attribute:: instrumentation
+
+        :class:`.Instrumentation` recording phase timings of calls,
+        ``None`` when calls are not instrumented
+
+    .. attribute:: metrics
+
+        :class:`.MetricsRegistry` updated by requests, the process-wide
+        :data:`.metrics.registry` by default, ``None`` when disabled
     '''
-    def __init__(self, http_session, *args, **kw):
+    def __init__(self, http_session, *args, retry_args=None, hedge_args=None,
+                 instrumentation=None, metrics_registry=None, **kw):
         super().__init__(*args, **kw)
         self.http_session = http_session
+        retry_args = retry_args or {}
+        self.jitter = retry_args.get('jitter', 'equal')
+        self.rate_limiter = None
+        if retry_args.get('adaptive', True):
+            self.rate_limiter = AdaptiveRateLimiter(
+                min_rate=retry_args.get('min_rate', 1), loop=self._loop)
+        self.retry_budget = RetryBudget(
+            ratio=retry_args.get('budget_ratio', 0.2),
+            min_retries=retry_args.get('min_retries', 10))
+        self.retry_stats = Counter()
+        self.hedger = None
+        if hedge_args and hedge_args.get('operations'):
+            self.hedger = Hedger(loop=self._loop, **hedge_args)
+        self.instrumentation = instrumentation
+        if metrics_registry is None:
+            metrics_registry = metrics.registry
+        self.metrics = metrics_registry or None
 
     @property
     def _loop(self):
         return self.http_session._loop
 
     async def _send_request(self, request_dict, operation_model):
+        registry = self.metrics
+        if registry is None:
+            return await self._send_attempts(request_dict, operation_model)
+        with registry.call(self._endpoint_prefix, operation_model.name,
+                           request_dict, self._loop) as call:
+            call.response = await self._send_attempts(
+                request_dict, operation_model, call)
+            return call.response
+
+    async def _send_attempts(self, request_dict, operation_model, call=None):
         attempts = 1
-        request = self.create_request(request_dict, operation_model)
+        self.retry_stats['requests'] += 1
+        self.retry_budget.deposit()
+        deadline = request_dict['context'].get('deadline')
+        timings = request_dict['context'].get('timings')
+        request = self._create_request(request_dict, operation_model, timings)
         success_response, exception = await self._get_response(
-            request, operation_model, attempts)
+            request, operation_model, attempts, deadline, timings)
         while await self._needs_retry(attempts, operation_model, request_dict,
                                       success_response, exception):
             attempts += 1
+            if call is not None:
+                call.attempts = attempts
             # If there is a stream associated with the request, we need
             # to reset it before attempting to send the request again.
             # This will ensure that we resend the entire contents of the
             # body.
             request.reset_stream()
             # Create a new request when retried (including a new signature).
-            request = self.create_request(
-                request_dict, operation_model)
+            request = self._create_request(request_dict, operation_model,
+                                           timings)
             success_response, exception = await self._get_response(
-                request, operation_model, attempts)
+                request, operation_model, attempts, deadline, timings)
+        if success_response is not None and \
+                'ResponseMetadata' in success_response[1]:
+            # We want to share num retries, not num attempts.
+            success_response[1]['ResponseMetadata']['RetryAttempts'] = \
+                attempts - 1
         if exception is not None:
             raise exception
         else:
             return success_response
 
-    async def _get_response(self, request, operation_model, attempts):
+    async def _get_response(self, request, operation_model, attempts,
+                            deadline=None, timings=None):
         # This will return a tuple of (success_response, exception)
         # and success_response is itself a tuple of
         # (http_response, parsed_dict).
         # If an exception occurs then the success_response is None.
         # If no exception occurs then exception is None.
+        if timings is not None:
+            timings.attempts += 1
+            start = timings.clock()
+        if self.rate_limiter:
+            try:
+                await asyncio.wait_for(self.rate_limiter.acquire(),
+                                       self._remaining(None, deadline),
+                                       loop=self._loop)
+            except asyncio.TimeoutError:
+                return (None, self._timeout_error(request, attempts,
+                                                  deadline))
+            if timings is not None:
+                timings.phase('rate_limit', start)
+                start = timings.clock()
+        connect_timeout, read_timeout = self._timeouts()
         try:
             logger.debug("Sending http request: %s", request)
-            headers = dict(self._headers(request.headers))
-            http_response = await self.http_session.request(
-                method=request.method, url=request.url, data=request.body,
-                headers=headers, stream=True, verify=self.verify)
+            http_response = await self._send(request, connect_timeout,
+                                             read_timeout, deadline)
+        except asyncio.TimeoutError:
+            return (None, self._timeout_error(request, attempts, deadline))
         except ConnectionError as e:
             # For a connection error, if it looks like it's a DNS
             # lookup issue, 99% of the time this is due to a misconfigured
@@ -134,14 +344,55 @@ class AsyncEndpoint(botocore.endpoint.Endpoint):
             logger.debug("Exception received when sending HTTP request.",
                          exc_info=True)
             return (None, e)
+        if timings is not None:
+            self._record_send(timings, start, http_response)
+            start = timings.clock()
         # This returns the http_response and the parsed_data.
-        response_dict = await convert_to_response_dict(http_response,
-                                                       operation_model)
+        timeout = self._remaining(read_timeout, deadline)
+        try:
+            response_dict = await asyncio.wait_for(
+                convert_to_response_dict(http_response, operation_model),
+                timeout, loop=self._loop)
+        except asyncio.TimeoutError:
+            close_connection(http_response)
+            return (None, self._timeout_error(request, attempts, deadline))
+        if timings is not None:
+            timings.phase('read', start)
+            start = timings.clock()
         parser = self._response_parser_factory.create_parser(
             operation_model.metadata['protocol'])
-        return ((http_response,
-                 parser.parse(response_dict, operation_model.output_shape)),
-                None)
+        parsed = parser.parse(response_dict, operation_model.output_shape)
+        if timings is not None:
+            timings.phase('parse', start)
+        return (http_response, parsed), None
+
+    async def _send(self, request, connect_timeout, read_timeout, deadline):
+        """Send ``request`` and wait for the response headers.
+
+        ``connect_timeout`` applies to obtaining a connection and
+        ``read_timeout`` to each wait for the request to make progress,
+        so that slow uploads are not timed out while their body is sent.
+        """
+        progress = SendProgress(request.body, self._loop)
+        response = ensure_future(self.http_session.request(
+            method=request.method, url=request.url, data=progress.body,
+            headers=dict(self._headers(request.headers)), stream=True,
+            verify=self.verify, pre_request=progress.connect),
+            loop=self._loop)
+        try:
+            while True:
+                timeout = self._remaining(
+                    progress.timeout(connect_timeout, read_timeout), deadline)
+                if timeout <= 0:
+                    raise asyncio.TimeoutError
+                await asyncio.wait((response,), timeout=timeout,
+                                   loop=self._loop)
+                if response.done():
+                    return response.result()
+                progress.poll()
+        finally:
+            response.cancel()
+            progress.close()
 
     # CUT AND PASTE FROM BOTOCORE
 
@@ -154,18 +405,80 @@ class AsyncEndpoint(botocore.endpoint.Endpoint):
             operation=operation_model, attempts=attempts,
             caught_exception=caught_exception, request_dict=request_dict)
         handler_response = first_non_none_response(responses)
+
+        # END OF CUT AND PASTE
+
+        if is_throttled(response):
+            self.retry_stats['throttled'] += 1
+            if self.rate_limiter:
+                self.rate_limiter.throttled()
+        elif response is not None and self.rate_limiter:
+            self.rate_limiter.succeeded()
+
+        deadline = request_dict['context'].get('deadline')
         if handler_response is None:
             return False
+        elif deadline and self._loop.time() + handler_response >= deadline:
+            # no time left for sleeping and retrying
+            self.retry_stats['deadline'] += 1
+            return False
+        elif not self.retry_budget.withdraw():
+            self.retry_stats['denied'] += 1
+            logger.debug("Retry budget exhausted, not retrying")
+            return False
         else:
             # Request needs to be retried, and we need to sleep
             # for the specified number of times.
+            delay = jitter_delay(handler_response, self.jitter)
             logger.debug("Response received to retry, sleeping for "
-                         "%s seconds", handler_response)
-
-            # END OF CUT AND PASTE
-            await asyncio.sleep(handler_response, loop=self._loop)
+                         "%s seconds", delay)
+            self.retry_stats['retries'] += 1
+            self.retry_stats['retry_sleep'] += delay
+            timings = request_dict['context'].get('timings')
+            if timings is not None:
+                start = timings.clock()
+            await asyncio.sleep(delay, loop=self._loop)
+            if timings is not None:
+                timings.phase('retry_sleep', start)
             return True
 
+    def _create_request(self, request_dict, operation_model, timings=None):
+        if timings is None:
+            return self.create_request(request_dict, operation_model)
+        start = timings.clock()
+        request = self.create_request(request_dict, operation_model)
+        timings.phase('sign', start)
+        return request
+
+    def _record_send(self, timings, start, http_response):
+        # the pool records the time spent waiting for a connection
+        connection = getattr(http_response, 'connection', None)
+        acquire_time = getattr(connection, 'acquire_time', None)
+        if acquire_time is not None:
+            timings.phase('connect', start, start + acquire_time)
+            start += acquire_time
+        timings.phase('send', start)
+
+    def _timeouts(self):
+        if isinstance(self.timeout, tuple):
+            return self.timeout
+        return self.timeout, self.timeout
+
+    def _remaining(self, timeout, deadline):
+        """Time left to ``deadline`` capped to ``timeout``
+        """
+        if deadline is None:
+            return timeout
+        remaining = max(deadline - self._loop.time(), 0)
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def _timeout_error(self, request, attempts, deadline):
+        if deadline is not None and self._loop.time() >= deadline:
+            return DeadlineExceededError(endpoint_url=request.url,
+                                         attempts=attempts)
+        return RequestTimeoutError('Read timeout on endpoint URL: "%s"' %
+                                   request.url)
+
     def _headers(self, headers):
         for k, v in headers.items():
             if isinstance(v, bytes):
@@ -182,7 +495,9 @@ class AsyncEndpointCreator(botocore.endpoint.EndpointCreator):
     def create_endpoint(self, service_model, region_name, endpoint_url,
                         verify=None, response_parser_factory=None,
                         timeout=DEFAULT_TIMEOUT,
-                        max_pool_connections=MAX_POOL_CONNECTIONS):
+                        max_pool_connections=MAX_POOL_CONNECTIONS,
+                        retry_args=None, hedge_args=None,
+                        instrumentation=None, metrics_registry=None):
         if not is_valid_endpoint_url(endpoint_url):
             raise ValueError("Invalid endpoint: %s" % endpoint_url)
         return AsyncEndpoint(
@@ -194,4 +509,16 @@ class AsyncEndpointCreator(botocore.endpoint.EndpointCreator):
             verify=self._get_verify_value(verify),
             timeout=timeout,
             max_pool_connections=max_pool_connections,
-            response_parser_factory=response_parser_factory)
+            response_parser_factory=response_parser_factory,
+            retry_args=retry_args,
+            hedge_args=hedge_args,
+            instrumentation=instrumentation,
+            metrics_registry=metrics_registry)
+
+    def _get_proxies(self, url):
+        # scanning the environment for proxies is slow, do it once per url
+        proxies = _proxies.get(url)
+        if proxies is None:
+            proxies = super()._get_proxies(url)
+            _proxies[url] = proxies
+        return dict(proxies)
@@ -0,0 +1,200 @@
+"""Payload hashing off the event loop thread.
+
+hashlib releases the GIL while digesting large buffers, therefore the
+Content-MD5 and SHA256 payload hashes of large bodies are computed in a
+thread pool while the event loop keeps serving other requests.
+
+Botocore converts bytes bodies into ``BytesIO`` before the request is
+serialised, the buffer of ``BytesIO`` bodies is hashed without copying
+while other file-like bodies are read in chunks by the hashing thread.
+"""
+import io
+import asyncio
+import base64
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore import handlers
+
+
+# Operations with bodies hashed by the pipeline
+HASHED_OPERATIONS = frozenset(('PutObject', 'UploadPart'))
+# Bodies smaller than this are hashed in the event loop thread,
+# dispatching to the thread pool would cost more than the hashing itself
+MIN_THREADED_SIZE = 2**16
+MAX_WORKERS = 4
+# Size of the chunks read from file-like bodies
+READ_SIZE = 2**20
+
+_executor = None
+
+
+def get_executor():
+    """The process-wide :class:`.ThreadPoolExecutor` used for hashing
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    return _executor
+
+
+def md5_base64(body):
+    return base64.b64encode(hashlib.md5(body).digest()).decode('ascii')
+
+
+def sha256_hex(body):
+    return hashlib.sha256(body).hexdigest()
+
+
+def file_hashes(body, md5=True, sha256=True):
+    """Compute the MD5 and SHA256 hashes of the remaining content of a
+    seekable file-like ``body`` whose position is left unchanged
+
+    :return: a two-elements tuple with the base64 encoded MD5 digest and
+        the hex encoded SHA256 digest, ``None`` for hashes not computed
+    """
+    hashers = [hashlib.md5() if md5 else None,
+               hashlib.sha256() if sha256 else None]
+    position = body.tell()
+    try:
+        for chunk in iter(lambda: body.read(READ_SIZE), b''):
+            for hasher in hashers:
+                if hasher:
+                    hasher.update(chunk)
+    finally:
+        body.seek(position)
+    return (base64.b64encode(hashers[0].digest()).decode('ascii')
+            if md5 else None,
+            hashers[1].hexdigest() if sha256 else None)
+
+
+def remaining_size(body):
+    """Number of bytes left to read in a seekable file-like ``body``
+    """
+    position = body.tell()
+    try:
+        return body.seek(0, io.SEEK_END) - position
+    finally:
+        body.seek(position)
+
+
+async def payload_hashes(body, sha256=True, loop=None):
+    """Compute Content-MD5 and, optionally, SHA256 hashes of a bytes-like
+    ``body``
+
+    Large bodies are hashed concurrently in the thread pool.
+
+    :return: a two-elements tuple with the base64 encoded MD5 digest and
+        the hex encoded SHA256 digest (``None`` when ``sha256`` is false)
+    """
+    if len(body) < MIN_THREADED_SIZE:
+        return md5_base64(body), (sha256_hex(body) if sha256 else None)
+    loop = loop or asyncio.get_event_loop()
+    executor = get_executor()
+    hashers = [loop.run_in_executor(executor, md5_base64, body)]
+    if sha256:
+        hashers.append(loop.run_in_executor(executor, sha256_hex, body))
+    digests = await asyncio.gather(*hashers, loop=loop)
+    if not sha256:
+        digests.append(None)
+    return tuple(digests)
+
+
+def s3_option(context, name, default=None):
+    """Value of the ``name`` option in the s3 configuration of a client
+    """
+    s3_config = getattr(context.get('client_config'), 's3', None) or {}
+    value = s3_config.get(name)
+    return default if value is None else value
+
+
+def signs_payload(request_dict, context, content_md5=True):
+    """Check if the S3 signer will SHA256 sign the payload of a request
+    """
+    sign_payload = s3_option(context, 'payload_signing_enabled')
+    if sign_payload is not None:
+        return sign_payload
+    if not request_dict['url'].startswith('https'):
+        return True
+    if s3_option(context, 'unsigned_payload', False):
+        return False
+    # over https, streaming bodies with Content-MD5 are not signed
+    return not content_md5
+
+
+async def hash_request(operation_name, request_dict, context, loop=None):
+    """Hash the body of ``request_dict`` if required
+
+    The Content-MD5 header is added to the request headers, unless already
+    provided or disabled via the ``content_md5`` s3 option, while the
+    SHA256 payload hash, when needed by the signer, is stored in the
+    request ``context`` so that it is not recomputed.
+    """
+    if operation_name not in HASHED_OPERATIONS:
+        return
+    body = request_dict.get('body')
+    if not body:
+        return
+    if not isinstance(body, (bytes, bytearray)) and not seekable(body):
+        return
+    headers = request_dict['headers']
+    md5 = 'Content-MD5' not in headers and s3_option(context, 'content_md5',
+                                                     True)
+    sha256 = signs_payload(request_dict, context,
+                           md5 or 'Content-MD5' in headers)
+    if not (md5 or sha256):
+        return
+    if isinstance(body, io.BytesIO):
+        with body.getbuffer() as buffer, buffer[body.tell():] as view:
+            digests = await _bytes_hashes(view, md5, sha256, loop)
+    elif isinstance(body, (bytes, bytearray)):
+        digests = await _bytes_hashes(body, md5, sha256, loop)
+    else:
+        digests = await _file_hashes(body, md5, sha256, loop)
+    if md5:
+        headers['Content-MD5'] = digests[0]
+    if sha256:
+        context['payload_sha256'] = digests[1]
+
+
+def seekable(body):
+    try:
+        return body.seekable()
+    except AttributeError:
+        return hasattr(body, 'seek') and hasattr(body, 'tell')
+
+
+async def _bytes_hashes(body, md5, sha256, loop):
+    if md5:
+        return await payload_hashes(body, sha256, loop)
+    if len(body) < MIN_THREADED_SIZE:
+        return None, sha256_hex(body)
+    loop = loop or asyncio.get_event_loop()
+    return None, await loop.run_in_executor(get_executor(), sha256_hex, body)
+
+
+async def _file_hashes(body, md5, sha256, loop):
+    if remaining_size(body) < MIN_THREADED_SIZE:
+        return file_hashes(body, md5, sha256)
+    loop = loop or asyncio.get_event_loop()
+    return await loop.run_in_executor(get_executor(), file_hashes, body, md5,
+                                      sha256)
+
+
+def conditionally_calculate_md5(params, context, **kwargs):
+    """Replace the botocore handler for bodies not hashed by
+    :func:`hash_request` so that the ``content_md5`` s3 option is honoured
+    """
+    if s3_option(context, 'content_md5', True):
+        handlers.conditionally_calculate_md5(params, context=context,
+                                             **kwargs)
+
+
+def register_handlers(event_emitter):
+    """Register hashing handlers with a client ``event_emitter``
+    """
+    for operation_name in HASHED_OPERATIONS:
+        event_name = 'before-call.s3.%s' % operation_name
+        event_emitter.unregister(event_name,
+                                 handlers.conditionally_calculate_md5)
+        event_emitter.register(event_name, conditionally_calculate_md5)
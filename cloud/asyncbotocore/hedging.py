@@ -0,0 +1,114 @@
+"""Hedged requests for idempotent read operations"""
+import asyncio
+import math
+from collections import Counter, defaultdict, deque
+
+from .ratelimit import RetryBudget
+
+
+class LatencyTracker:
+    """Keep the latencies of the last ``window`` requests of an operation
+    """
+    def __init__(self, window=1000, refresh=50):
+        self.refresh = refresh
+        self._samples = deque(maxlen=window)
+        self._sorted = None
+        self._added = 0
+
+    def __len__(self):
+        return len(self._samples)
+
+    def add(self, latency):
+        self._samples.append(latency)
+        self._added += 1
+        if self._added >= self.refresh:
+            self._sorted = None
+
+    def percentile(self, percentile):
+        """Latency ``percentile`` (between 0 and 100) of recorded samples
+        """
+        if not self._samples:
+            return None
+        if self._sorted is None:
+            self._sorted = sorted(self._samples)
+            self._added = 0
+        samples = self._sorted
+        index = int(math.ceil(percentile*len(samples)/100)) - 1
+        return samples[min(max(index, 0), len(samples) - 1)]
+
+
+class Hedger:
+    """Send a duplicate request when the original one is slower than the
+    ``percentile`` latency of recent requests of the same operation.
+
+    The fastest of the two responses is returned and the other request
+    is cancelled. Hedged requests are capped to ``max_ratio`` of requests.
+
+    .. attribute:: stats
+
+        A :class:`~collections.Counter` of ``requests``, ``hedged``
+        requests, hedges which won the race (``hedge_wins``) and hedges
+        ``denied`` by the hedging budget
+    """
+    def __init__(self, operations, percentile=95, max_ratio=0.05,
+                 min_delay=0.005, min_samples=20, loop=None):
+        self.operations = frozenset(operations)
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.budget = RetryBudget(ratio=max_ratio, min_retries=10)
+        self.stats = Counter()
+        self.latencies = defaultdict(LatencyTracker)
+        self._loop = loop
+
+    def delay(self, operation_name):
+        """Time to wait before hedging a request, ``None`` if there is not
+        enough information to hedge
+        """
+        latencies = self.latencies[operation_name]
+        if len(latencies) < self.min_samples:
+            return None
+        return max(self.min_delay, latencies.percentile(self.percentile))
+
+    async def make_request(self, endpoint, operation_model, request_dict):
+        loop = self._loop
+        name = operation_model.name
+        self.stats['requests'] += 1
+        self.budget.deposit()
+        start = loop.time()
+        delay = self.delay(name)
+        requests = [asyncio.ensure_future(
+            endpoint.make_request(operation_model, request_dict), loop=loop)]
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(requests, timeout=delay,
+                                             loop=loop)
+                if not done:
+                    if self.budget.withdraw():
+                        self.stats['hedged'] += 1
+                        requests.append(asyncio.ensure_future(
+                            endpoint.make_request(operation_model,
+                                                  request_dict),
+                            loop=loop))
+                    else:
+                        self.stats['denied'] += 1
+            winner = await self._first_success(requests)
+        finally:
+            for request in requests:
+                if not request.done():
+                    request.cancel()
+        self.latencies[name].add(loop.time() - start)
+        if len(requests) > 1 and winner is requests[1]:
+            self.stats['hedge_wins'] += 1
+        return winner.result()
+
+    async def _first_success(self, requests):
+        pending = requests
+        while True:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED, loop=self._loop)
+            for request in requests:
+                if request in done and not request.exception():
+                    return request
+            if not pending:
+                return requests[0]
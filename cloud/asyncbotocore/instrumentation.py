@@ -0,0 +1,146 @@
+"""Per phase timings of client calls"""
+import logging
+from collections import defaultdict
+
+from .hedging import LatencyTracker
+
+
+LOGGER = logging.getLogger('cloud.instrumentation')
+
+# Phases of a client call, in order. Phases from ``sign`` to
+# ``retry_sleep`` are recorded for every attempt
+PHASES = (
+    'serialize',    # build the request dictionary from parameters
+    'hash',         # payload hashes computed in the thread pool
+    'sign',         # create and sign the http request
+    'rate_limit',   # wait for the adaptive rate limiter
+    'connect',      # wait for a pool connection, opening it if needed
+    'send',         # send the request and receive the response headers
+    'read',         # read the response body
+    'parse',        # parse the response body
+    'retry_sleep'   # sleep before retrying
+)
+
+
+class CallTimings:
+    """Timestamps of the phases of a client call
+
+    .. attribute:: events
+
+        list of ``(phase, start, end)`` tuples in event loop time.
+        Phases of retried or hedged attempts are recorded several times
+
+    .. attribute:: error
+
+        the exception raised by the call, if any
+    """
+    __slots__ = ('service', 'operation', 'start', 'end', 'attempts',
+                 'events', 'error', '_loop')
+
+    def __init__(self, service, operation, loop):
+        self.service = service
+        self.operation = operation
+        self.start = loop.time()
+        self.end = None
+        self.attempts = 0
+        self.events = []
+        self.error = None
+        self._loop = loop
+
+    def __repr__(self):
+        return '%s.%s %s' % (self.service, self.operation, ' '.join(
+            '%s=%.2fms' % (phase, 1000*duration)
+            for phase, duration in self.durations().items()))
+    __str__ = __repr__
+
+    @property
+    def duration(self):
+        """Duration of the call in seconds, ``None`` until finished
+        """
+        if self.end is not None:
+            return self.end - self.start
+
+    def clock(self):
+        return self._loop.time()
+
+    def phase(self, name, start, end=None):
+        """Record phase ``name`` from ``start`` to ``end`` (default now)
+        """
+        if end is None:
+            end = self._loop.time()
+        self.events.append((name, start, end))
+
+    def durations(self):
+        """Dictionary of total seconds spent in each phase, in
+        :data:`PHASES` order
+        """
+        durations = dict.fromkeys(PHASES, 0)
+        for name, start, end in self.events:
+            durations[name] += end - start
+        return dict(((name, duration) for name, duration in durations.items()
+                     if duration))
+
+
+class Instrumentation:
+    """Record :class:`.CallTimings` of client calls and pass them to
+    ``sinks`` when calls finish.
+
+    A sink is any callable accepting a :class:`.CallTimings`, for example
+    a :class:`.LatencySink` or a :class:`.LoggingSink`. Errors raised by
+    sinks are logged and do not affect calls.
+    """
+    def __init__(self, *sinks):
+        self.sinks = list(sinks)
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def start(self, service, operation, loop):
+        return CallTimings(service, operation, loop)
+
+    def finish(self, timings):
+        timings.end = timings.clock()
+        for sink in self.sinks:
+            try:
+                sink(timings)
+            except Exception:
+                LOGGER.exception('Instrumentation sink %r failed', sink)
+
+
+class LatencySink:
+    """Keep recent durations of calls and their phases per operation
+
+    .. attribute:: latencies
+
+        :class:`.LatencyTracker` keyed by ``(operation, phase)``, the
+        duration of the whole call is recorded as the ``total`` phase
+    """
+    def __init__(self, window=1000):
+        self.latencies = defaultdict(lambda: LatencyTracker(window))
+
+    def __call__(self, timings):
+        operation = timings.operation
+        self.latencies[(operation, 'total')].add(timings.duration)
+        for phase, duration in timings.durations().items():
+            self.latencies[(operation, phase)].add(duration)
+
+    def percentile(self, operation, phase='total', percentile=50):
+        """Duration ``percentile`` of ``phase`` of ``operation`` calls,
+        ``None`` if not recorded
+        """
+        tracker = self.latencies.get((operation, phase))
+        return tracker.percentile(percentile) if tracker else None
+
+
+class LoggingSink:
+    """Log the duration of calls and their phases
+    """
+    def __init__(self, logger=None, level=logging.DEBUG):
+        self.logger = logger or LOGGER
+        self.level = level
+
+    def __call__(self, timings):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, '%s in %.2fms, %d attempts%s',
+                            timings, 1000*timings.duration, timings.attempts,
+                            ' (%s)' % timings.error if timings.error else '')
@@ -0,0 +1,212 @@
+"""Latency histograms and counters of client calls"""
+import math
+from collections import Counter
+
+
+# Buckets per power of two of latency histograms, values are recorded
+# with a relative error below 1/SUB_BUCKETS
+SUB_BUCKETS = 32
+# Percentiles in histogram snapshots
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class Histogram:
+    """A histogram with logarithmic buckets in the spirit of HdrHistogram
+
+    Each power of two is split into :data:`SUB_BUCKETS` linear buckets so
+    that recording is constant time and memory does not depend on the
+    number of samples.
+    """
+    __slots__ = ('buckets', 'count', 'sum', 'min', 'max')
+
+    def __init__(self):
+        self.buckets = Counter()
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def __len__(self):
+        return self.count
+
+    def record(self, value):
+        if value > 0:
+            mantissa, exponent = math.frexp(value)
+            index = int((2*mantissa - 1)*SUB_BUCKETS)
+            self.buckets[exponent*SUB_BUCKETS + index] += 1
+        else:
+            value = 0
+            self.buckets[None] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, percentile):
+        """Value at ``percentile`` (between 0 and 100), ``None`` if empty
+        """
+        if not self.count:
+            return None
+        target = max(math.ceil(percentile*self.count/100), 1)
+        seen = self.buckets.get(None, 0)
+        if seen >= target:
+            return 0
+        for key in sorted(k for k in self.buckets if k is not None):
+            seen += self.buckets[key]
+            if seen >= target:
+                exponent, index = divmod(key, SUB_BUCKETS)
+                # upper bound of the bucket capped by the recorded maximum
+                value = math.ldexp(1 + (index + 1)/SUB_BUCKETS, exponent - 1)
+                return min(value, self.max)
+        return self.max
+
+    def snapshot(self):
+        data = dict(count=self.count, sum=self.sum, min=self.min,
+                    max=self.max)
+        for percentile in PERCENTILES:
+            data['p%s' % percentile] = self.percentile(percentile)
+        return data
+
+
+class OperationMetrics:
+    """Metrics of the calls of an operation which returned a ``status``
+
+    .. attribute:: latency
+
+        :class:`.Histogram` of call durations in seconds
+    """
+    __slots__ = ('latency', 'calls', 'errors', 'retries', 'bytes_sent',
+                 'bytes_received')
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def snapshot(self):
+        return dict(calls=self.calls, errors=self.errors,
+                    retries=self.retries, bytes_sent=self.bytes_sent,
+                    bytes_received=self.bytes_received,
+                    latency=self.latency.snapshot())
+
+
+class MetricsRegistry:
+    """In-process metrics of client calls
+
+    .. attribute:: operations
+
+        :class:`.OperationMetrics` keyed by ``(service, operation, status)``
+        where ``status`` is the HTTP status code of the response or the
+        name of the exception raised by the call
+
+    .. attribute:: in_flight
+
+        A :class:`~collections.Counter` of calls in progress keyed by
+        ``(service, operation)``
+    """
+    def __init__(self):
+        self.operations = {}
+        self.in_flight = Counter()
+
+    def call(self, service, operation, request_dict=None, loop=None):
+        """Context manager measuring a call, see :class:`.CallMetrics`
+        """
+        return CallMetrics(self, service, operation, request_dict, loop)
+
+    def record(self, service, operation, status, latency, retries=0,
+               bytes_sent=0, bytes_received=0):
+        key = (service, operation, status)
+        metrics = self.operations.get(key)
+        if metrics is None:
+            metrics = OperationMetrics()
+            self.operations[key] = metrics
+        metrics.latency.record(latency)
+        metrics.calls += 1
+        if not isinstance(status, int) or status >= 300:
+            metrics.errors += 1
+        metrics.retries += retries
+        metrics.bytes_sent += bytes_sent
+        metrics.bytes_received += bytes_received
+
+    def snapshot(self):
+        """List of dictionaries with the metrics of each service, operation
+        and status, and calls in flight
+        """
+        data = []
+        for (service, operation, status), metrics in self.operations.items():
+            entry = metrics.snapshot()
+            entry.update(service=service, operation=operation, status=status)
+            data.append(entry)
+        for (service, operation), in_flight in self.in_flight.items():
+            if in_flight:
+                data.append(dict(service=service, operation=operation,
+                                 in_flight=in_flight))
+        return data
+
+    def clear(self):
+        self.operations.clear()
+
+
+class CallMetrics:
+    """Record a call in a :class:`.MetricsRegistry` when exiting the
+    context. Set :attr:`attempts` and :attr:`response` (the ``(http,
+    parsed)`` tuple of the endpoint) before exiting
+    """
+    __slots__ = ('registry', 'key', 'request_dict', 'attempts', 'response',
+                 'start', '_loop')
+
+    def __init__(self, registry, service, operation, request_dict, loop):
+        self.registry = registry
+        self.key = (service, operation)
+        self.request_dict = request_dict
+        self.attempts = 1
+        self.response = None
+        self._loop = loop
+
+    def __enter__(self):
+        self.registry.in_flight[self.key] += 1
+        self.start = self._loop.time()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.registry.in_flight[self.key] -= 1
+        latency = self._loop.time() - self.start
+        bytes_received = 0
+        if self.response is not None:
+            http = self.response[0]
+            status = http.status_code
+            bytes_received = int(http.headers.get('content-length') or
+                                 http.headers.get('Content-Length') or 0)
+        else:
+            status = type.__name__ if type is not None else 'unknown'
+        self.registry.record(
+            self.key[0], self.key[1], status, latency, self.attempts - 1,
+            self.attempts*body_size(self.request_dict), bytes_received)
+
+
+def body_size(request_dict):
+    """Size of the body of a request, 0 for streams which cannot seek
+    """
+    body = request_dict.get('body') if request_dict else None
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    elif isinstance(body, str):
+        return len(body.encode('utf-8'))
+    elif hasattr(body, 'seek') and hasattr(body, 'tell'):
+        # botocore wraps s3 bodies into file-like objects
+        try:
+            position = body.tell()
+            size = body.seek(0, 2)
+            body.seek(position)
+            return size
+        except (OSError, ValueError):
+            pass
+    return 0
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,189 @@
+"""Client side rate limiting and retry budget"""
+import asyncio
+import random
+
+
+# Error codes returned by AWS services when throttling requests
+THROTTLING_ERRORS = frozenset((
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottledException',
+    'RequestThrottled',
+    'TooManyRequestsException',
+    'ProvisionedThroughputExceededException',
+    'RequestLimitExceeded',
+    'BandwidthLimitExceeded',
+    'LimitExceededException',
+    'SlowDown',
+    'PriorRequestNotComplete',
+    'EC2ThrottledException'
+))
+JITTERS = ('none', 'full', 'equal')
+
+
+def is_throttled(response):
+    """Check if an endpoint ``response`` is a throttling response
+    """
+    if response is None:
+        return False
+    http_response, parsed = response
+    if http_response.status_code == 429:
+        return True
+    code = parsed.get('Error', {}).get('Code')
+    return code in THROTTLING_ERRORS
+
+
+def jitter_delay(delay, jitter='full'):
+    """Apply ``jitter`` to a retry ``delay``
+
+    :param jitter: one of ``none`` (no jitter), ``full`` (a random delay
+        between 0 and ``delay``) or ``equal`` (half of ``delay`` plus a
+        random delay between 0 and half of ``delay``)
+    """
+    if jitter == 'full':
+        return random.uniform(0, delay)
+    elif jitter == 'equal':
+        return 0.5*delay + random.uniform(0, 0.5*delay)
+    return delay
+
+
+class TokenBucket:
+    """An asynchronous token bucket.
+
+    Tokens are added at :attr:`rate` per second up to :attr:`capacity`.
+    Acquiring more tokens than available reserves them and waits for the
+    bucket to refill, so that concurrent consumers are served in order.
+    When :attr:`rate` is ``None`` the bucket does not limit consumers.
+    """
+    def __init__(self, rate=None, capacity=None, loop=None):
+        self._loop = loop or asyncio.get_event_loop()
+        self._last = self._loop.time()
+        self.rate = None
+        self.capacity = capacity
+        self._tokens = 0
+        self.set_rate(rate, capacity)
+        if rate:
+            self._tokens = self.capacity
+
+    @property
+    def tokens(self):
+        """Number of available tokens, negative when tokens are reserved
+        """
+        self._refill()
+        return self._tokens
+
+    def set_rate(self, rate, capacity=None):
+        """Change the :attr:`rate` of the bucket, it can be done at runtime
+        """
+        self._refill()
+        self.rate = rate
+        if rate:
+            self.capacity = capacity or self.capacity or rate
+            self._tokens = min(self._tokens, self.capacity)
+        else:
+            self._tokens = 0
+
+    async def acquire(self, tokens=1):
+        """Acquire ``tokens`` from the bucket, waiting if not available
+        """
+        if not self.rate:
+            return
+        self._refill()
+        self._tokens -= tokens
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens/self.rate, loop=self._loop)
+
+    def _refill(self):
+        now = self._loop.time()
+        if self.rate:
+            self._tokens = min(self.capacity,
+                               self._tokens + (now - self._last)*self.rate)
+        self._last = now
+
+
+class AdaptiveRateLimiter(TokenBucket):
+    """A :class:`.TokenBucket` adapting its rate to throttling responses.
+
+    The limiter does not limit requests until the first throttling
+    response, when the rate is set to a fraction of the measured request
+    rate (multiplicative decrease). The rate is decreased at most once a
+    second, so that a burst of throttled concurrent requests counts as one.
+    The rate is then increased by ``increase`` requests per second every
+    second of successful requests (additive increase).
+    """
+    def __init__(self, min_rate=1, increase=1, decrease=0.5, loop=None):
+        super().__init__(loop=loop)
+        self.min_rate = min_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.measured_rate = None
+        self._count = 0
+        self._window_start = self._loop.time()
+        self._last_decrease = None
+
+    async def acquire(self, tokens=1):
+        self._measure()
+        await super().acquire(tokens)
+
+    def throttled(self):
+        """Multiplicative decrease of the rate after a throttling response
+        """
+        now = self._loop.time()
+        if self._last_decrease is not None and now - self._last_decrease < 1:
+            return
+        self._last_decrease = now
+        rate = self.rate or self._current_rate()
+        self.set_rate(max(self.min_rate, self.decrease*rate), 1)
+
+    def succeeded(self):
+        """Additive increase of the rate after a successful response
+        """
+        if self.rate:
+            self.set_rate(self.rate + self.increase/self.rate)
+
+    def _measure(self):
+        self._count += 1
+        elapsed = self._loop.time() - self._window_start
+        if elapsed >= 1:
+            rate = self._count/elapsed
+            if self.measured_rate is None:
+                self.measured_rate = rate
+            else:
+                self.measured_rate = 0.5*(rate + self.measured_rate)
+            self._count = 0
+            self._window_start += elapsed
+
+    def _current_rate(self):
+        if self.measured_rate is not None:
+            return self.measured_rate
+        elapsed = max(self._loop.time() - self._window_start, 1)
+        return self._count/elapsed
+
+
+class RetryBudget:
+    """Cap retries to a fraction of requests.
+
+    Each request deposits ``ratio`` tokens while each retry withdraws one.
+    The budget starts with, and can accumulate up to, ``min_retries``
+    tokens so that occasional failures are always retried.
+    """
+    def __init__(self, ratio=0.2, min_retries=10):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self._tokens = min_retries
+
+    @property
+    def tokens(self):
+        return self._tokens
+
+    def deposit(self):
+        self._tokens = min(self.min_retries, self._tokens + self.ratio)
+
+    def withdraw(self):
+        """Withdraw a retry from the budget, return ``True`` if successful
+        """
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
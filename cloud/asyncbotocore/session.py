@@ -1,14 +1,108 @@
+import asyncio
+import inspect
+
 import botocore.session
 import botocore.credentials
 from botocore.exceptions import PartialCredentialsError
 from botocore import retryhandler, translate
+from botocore.loaders import create_loader
+from botocore.hooks import HierarchicalEmitter
 import botocore.regions
 
-from .client import AsyncClientCreator
+from .args import clear_args_cache
+from .client import AsyncClientCreator, clear_client_cache
+from .credentials import CredentialCache
+
+
+# Process-wide loaders, keyed by data path, and endpoint resolvers,
+# keyed by loader, shared by all sessions
+_loaders = {}
+_endpoint_resolvers = {}
+# Functions already verified to be valid event handlers
+_verified_handlers = set()
+
+
+def get_loader(data_path=None):
+    """The shared :class:`~botocore.loaders.Loader` for ``data_path``
+
+    Loaders cache the JSON models they load, sharing them avoids loading
+    and parsing models from disk for every new session
+    """
+    loader = _loaders.get(data_path)
+    if loader is None:
+        loader = create_loader(data_path)
+        _loaders[data_path] = loader
+    return loader
+
+
+def get_endpoint_resolver(loader):
+    """The shared :class:`~botocore.regions.EndpointResolver` of a
+    ``loader``
+    """
+    resolver = _endpoint_resolvers.get(loader)
+    if resolver is None:
+        resolver = botocore.regions.EndpointResolver(
+            loader.load_data('endpoints'))
+        _endpoint_resolvers[loader] = resolver
+    return resolver
+
+
+def clear_cache():
+    """Clear process-wide loaders, endpoint resolvers, service models,
+    client classes and client arguments
+    """
+    _loaders.clear()
+    _endpoint_resolvers.clear()
+    clear_client_cache()
+    clear_args_cache()
+
+
+class AsyncEventEmitter(HierarchicalEmitter):
+    """An event emitter which inspects the signature of handler functions
+    only once per process rather than every time they are registered
+    """
+    def _verify_accept_kwargs(self, func):
+        if func not in _verified_handlers:
+            super()._verify_accept_kwargs(func)
+            if inspect.isfunction(func):
+                _verified_handlers.add(func)
 
 
 class AsyncSession(botocore.session.Session):
 
+    def __init__(self, session_vars=None, event_hooks=None, **kwargs):
+        if event_hooks is None:
+            event_hooks = AsyncEventEmitter()
+        self._credential_cache = None
+        super().__init__(session_vars, event_hooks, **kwargs)
+
+    def get_credentials(self):
+        """The session credentials wrapped by a :class:`.CredentialCache`
+        shared by all clients created from the session
+        """
+        if self._credential_cache is None:
+            credentials = super().get_credentials()
+            if credentials is not None:
+                self._credential_cache = CredentialCache(credentials)
+        return self._credential_cache
+
+    async def load_credentials(self, loop=None):
+        """Resolve the session credentials in the thread pool, so that
+        the credential provider chain does not block the event loop
+        """
+        loop = loop or asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self.get_credentials)
+
+    def _register_data_loader(self):
+        self._components.lazy_register_component(
+            'data_loader',
+            lambda: get_loader(self.get_config_variable('data_path')))
+
+    def _register_endpoint_resolver(self):
+        self._components.lazy_register_component(
+            'endpoint_resolver',
+            lambda: get_endpoint_resolver(self.get_component('data_loader')))
+
     def create_client(self, service_name, region_name=None, api_version=None,
                       use_ssl=True, verify=None, endpoint_url=None,
                       aws_access_key_id=None, aws_secret_access_key=None,
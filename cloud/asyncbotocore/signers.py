@@ -0,0 +1,160 @@
+import hmac
+from hashlib import sha256
+from functools import lru_cache
+
+import botocore.auth
+from botocore.signers import RequestSigner
+from botocore.compat import ensure_unicode
+from botocore.exceptions import UnknownSignatureVersionError, NoRegionError
+
+from .hashing import s3_option, HASHED_OPERATIONS
+
+
+# Maximum number of derived signing keys kept in memory
+MAX_SIGNING_KEYS = 256
+# Signed headers whose values repeat across requests, their canonical
+# values are memoized
+STATIC_HEADERS = frozenset(('user-agent', 'content-type', 'x-amz-target'))
+
+
+class SigningKeyCache:
+    """Cache of SigV4 signing keys.
+
+    Signing keys are derived from the secret key, the date, the region and
+    the service with four HMAC rounds. They only change once a day for a
+    given set of credentials and can therefore be shared by all requests.
+    """
+    def __init__(self, max_size=MAX_SIGNING_KEYS):
+        self.max_size = max_size
+        self._keys = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def get(self, secret_key, date, region_name, service_name):
+        cache_key = (secret_key, date, region_name, service_name)
+        key = self._keys.get(cache_key)
+        if key is None:
+            if len(self._keys) >= self.max_size:
+                # keys of previous days are evicted together with the others
+                self._keys.clear()
+            key = _sign(('AWS4' + secret_key).encode('utf-8'), date)
+            key = _sign(key, region_name)
+            key = _sign(key, service_name)
+            key = _sign(key, 'aws4_request')
+            self._keys[cache_key] = key
+        return key
+
+    def clear(self):
+        self._keys.clear()
+
+
+signing_keys = SigningKeyCache()
+
+
+def _sign(key, msg):
+    return hmac.new(key, msg.encode('utf-8'), sha256).digest()
+
+
+@lru_cache(maxsize=1024)
+def _canonical_header_value(value):
+    return ' '.join(value.split())
+
+
+def _static_header_value(value):
+    if isinstance(value, str):
+        return _canonical_header_value(value)
+    return ' '.join(value.split())
+
+
+class SigV4Mixin:
+    """SigV4 signing with cached signing keys and static header values.
+
+    The SHA256 payload hash computed by the hashing pipeline is used when
+    available in the request context
+    """
+    def signature(self, string_to_sign, request):
+        key = signing_keys.get(self.credentials.secret_key,
+                               request.context['timestamp'][0:8],
+                               self._region_name, self._service_name)
+        return hmac.new(key, string_to_sign.encode('utf-8'),
+                        sha256).hexdigest()
+
+    def canonical_headers(self, headers_to_sign):
+        headers = []
+        for key in sorted(set(headers_to_sign)):
+            if key in STATIC_HEADERS:
+                header_value = _static_header_value
+            else:
+                header_value = self._header_value
+            value = ','.join(header_value(v) for v in
+                             sorted(headers_to_sign.get_all(key)))
+            headers.append('%s:%s' % (key, ensure_unicode(value)))
+        return '\n'.join(headers)
+
+    def payload(self, request):
+        if self._should_sha256_sign_payload(request):
+            checksum = request.context.get('payload_sha256')
+            if checksum:
+                return checksum
+        return super().payload(request)
+
+
+class AsyncSigV4Auth(SigV4Mixin, botocore.auth.SigV4Auth):
+    pass
+
+
+class AsyncS3SigV4Auth(SigV4Mixin, botocore.auth.S3SigV4Auth):
+
+    def _should_sha256_sign_payload(self, request):
+        # The unsigned_payload s3 option disables payload signing of
+        # upload bodies over https
+        context = request.context
+        if (request.url.startswith('https') and
+                context.get('operation_name') in HASHED_OPERATIONS and
+                s3_option(context, 'unsigned_payload', False) and
+                s3_option(context, 'payload_signing_enabled') is None):
+            return False
+        return super()._should_sha256_sign_payload(request)
+
+
+AUTH_TYPE_MAPS = botocore.auth.AUTH_TYPE_MAPS.copy()
+AUTH_TYPE_MAPS.update({
+    'v4': AsyncSigV4Auth,
+    's3v4': AsyncS3SigV4Auth
+})
+
+
+class AsyncRequestSigner(RequestSigner):
+
+    def sign(self, operation_name, request, **kwargs):
+        # signers check the operation of unsigned payloads
+        request.context['operation_name'] = operation_name
+        return super().sign(operation_name, request, **kwargs)
+
+    def get_auth_instance(self, signing_name, region_name,
+                          signature_version=None, **kwargs):
+        # CUT AND PASTE FROM BOTOCORE
+
+        if signature_version is None:
+            signature_version = self._signature_version
+
+        cls = AUTH_TYPE_MAPS.get(signature_version)
+        if cls is None:
+            raise UnknownSignatureVersionError(
+                signature_version=signature_version)
+        frozen_credentials = None
+        if self._credentials is not None:
+            frozen_credentials = self._credentials.get_frozen_credentials()
+        kwargs['credentials'] = frozen_credentials
+        if cls.REQUIRES_REGION:
+            if self._region_name is None:
+                raise NoRegionError()
+            kwargs['region_name'] = region_name
+            kwargs['service_name'] = signing_name
+
+        # END OF CUT AND PASTE
+
+        return cls(**kwargs)
+
+    get_auth = get_auth_instance
@@ -1,25 +1,35 @@
-from pulsar.apps.http import HttpClient
-from pulsar.apps.greenio import wait
+import asyncio
 
 from .asyncbotocore import get_session
 from .utils.s3 import S3tools
 
 
+# Streamed bodies of green calls are read in batches of this many bytes
+GREEN_CHUNK_SIZE = 2**16
+# Default number of concurrent calls of GreenBotocore.gather and map
+GREEN_CONCURRENCY = 20
+
+
 class AsyncioBotocore(S3tools):
     '''High level Asynchornous botocore wrapper
     '''
     def __init__(self, service_name, region_name=None,
                  endpoint_url=None, loop=None,
                  session=None, http_session=None,
-                 **kwargs):
+                 warmup_connections=0, **kwargs):
         if not http_session:
-            http_session = HttpClient(loop=loop, decompress=False)
-        self._session = get_session()
+            from .utils.http import shared_http_client
+            http_session = shared_http_client(kwargs.get('config'), loop)
+        self._session = session or get_session()
         self._client = self._session.create_client(
             service_name, region_name=region_name,
             endpoint_url=endpoint_url,
             http_session=http_session,
             **kwargs)
+        self.warming_up = None
+        if warmup_connections:
+            self.warming_up = asyncio.ensure_future(
+                self.warmup(warmup_connections), loop=self._loop)
 
     @property
     def _loop(self):
@@ -35,6 +45,26 @@ class AsyncioBotocore(S3tools):
         '''
         return self.endpoint.http_session
 
+    def warmup(self, connections=1, url=None):
+        """Open ``connections`` to the endpoint ahead of the first requests
+
+        DNS resolution and TCP and TLS handshakes of the connections are
+        performed concurrently. Requires a :class:`.BotocoreHttpClient`
+        http session.
+
+        :param url: optional url, defaults to the endpoint url
+        :return: a coroutine resulting in the warm-up time in seconds
+        """
+        endpoint = self.endpoint
+        return self.http_session.warmup(url or endpoint.host, connections,
+                                        verify=endpoint.verify)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self._client.drain()
+
     def __getattr__(self, operation):
         return getattr(self._client, operation)
 
@@ -45,7 +75,10 @@ class GreenProxy:
         self.client = client
 
     def __getattr__(self, operation):
-        return GreenApiCall(operation, self.client)
+        call = GreenApiCall(operation, self.client)
+        # cache the callable so that next lookups bypass __getattr__
+        setattr(self, operation, call)
+        return call
 
 
 class GreenBotocore(GreenProxy):
@@ -63,11 +96,44 @@ class GreenBotocore(GreenProxy):
     def get_paginator(self, operation_name):
         return GreenPaginator(self.client.get_paginator(operation_name))
 
+    def gather(self, calls, concurrency=GREEN_CONCURRENCY):
+        '''Run many calls concurrently in the event loop
+
+        Blocks the calling greenlet until all calls are done.
+
+        :param calls: iterable over ``(operation, params)`` pairs where
+            ``params`` is a dictionary of keyword arguments of the operation
+        :param concurrency: maximum number of calls in flight
+        :return: a list with the response, or the exception raised, of
+            each call in the order of ``calls``
+        '''
+        from pulsar.apps.greenio import wait
+        return wait(self._gather(list(calls), concurrency))
+
+    def map(self, operation, params, concurrency=GREEN_CONCURRENCY):
+        '''Call ``operation`` concurrently for each dictionary of keyword
+        arguments in ``params``, see :meth:`gather`
+        '''
+        return self.gather(((operation, p) for p in params), concurrency)
+
+    async def _gather(self, calls, concurrency):
+        loop = self.client._loop
+        semaphore = asyncio.Semaphore(concurrency, loop=loop)
+
+        async def call(operation, params):
+            async with semaphore:
+                return await getattr(self, operation)._wrap_body((), params)
+
+        return await asyncio.gather(
+            *[call(operation, params) for operation, params in calls],
+            loop=loop, return_exceptions=True)
+
 
 class GreenIterator(GreenProxy):
     '''A pulsar compliant WSGI iterator
     '''
     def __iter__(self):
+        from pulsar.apps.greenio import wait
         iterator = wait(self.client.__aiter__())
         while True:
             try:
@@ -76,6 +142,41 @@ class GreenIterator(GreenProxy):
                 break
 
 
+class GreenBody(GreenIterator):
+    '''A streamed response body for greenlets
+
+    Chunks received from the network are joined in batches of at least
+    ``chunk_size`` bytes so that iterating the body switches greenlet once
+    per batch rather than once per chunk
+    '''
+    def __init__(self, client, chunk_size=GREEN_CHUNK_SIZE):
+        super().__init__(client)
+        self.chunk_size = chunk_size
+        self._iterator = None
+
+    def __iter__(self):
+        from pulsar.apps.greenio import wait
+        while True:
+            data = wait(self._read_batch())
+            if not data:
+                break
+            yield data
+
+    async def _read_batch(self):
+        if self._iterator is None:
+            self._iterator = await self.client.__aiter__()
+        chunks = []
+        size = 0
+        while size < self.chunk_size:
+            try:
+                chunk = await self._iterator.__anext__()
+            except StopAsyncIteration:
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+        return b''.join(chunks)
+
+
 class GreenPaginator(GreenProxy):
 
     def paginate(self, *args, **kwargs):
@@ -87,18 +188,20 @@ class GreenApiCall:
     def __init__(self, operation, client):
         self.operation = operation
         self.client = client
+        self.method = getattr(client, operation)
 
     def __repr__(self):
         return self.operation
     __str__ = __repr__
 
     def __call__(self, *args, **kwargs):
+        from pulsar.apps.greenio import wait
         return wait(self._wrap_body(args, kwargs))
 
     async def _wrap_body(self, args, kwargs):
-        result = await getattr(self.client, self.operation)(*args, **kwargs)
+        result = await self.method(*args, **kwargs)
         if isinstance(result, dict):
             body = result.get('Body')
             if body is not None and not isinstance(body, bytes):
-                result['Body'] = GreenIterator(body)
+                result['Body'] = GreenBody(body)
         return result
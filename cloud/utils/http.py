@@ -0,0 +1,390 @@
+"""Pulsar HTTP client for botocore
+"""
+import socket
+import asyncio
+import logging
+import weakref
+from collections import Counter
+from functools import partial
+
+from pulsar import Pool, PoolConnection
+from pulsar.apps.http import HttpClient, HttpRequest
+
+from botocore.endpoint import MAX_POOL_CONNECTIONS
+
+from ..asyncbotocore.config import AsyncConfig
+
+
+LOGGER = logging.getLogger('cloud.http')
+
+# Seconds resolved addresses are kept in the DNS cache
+DNS_TTL = 10
+# Maximum number of open connections of shared HTTP clients in a loop
+MAX_CONNECTIONS = 100
+
+
+class SafePoolConnection(PoolConnection):
+    """A :class:`.PoolConnection` which is not released back to the pool
+    when the request fails or is cancelled.
+
+    The state of the connection is unknown in these cases (a response
+    could be partially received), therefore the connection is closed.
+    """
+    __slots__ = ()
+
+    def __exit__(self, type, value, traceback):
+        if type is not None and self.pool is not None:
+            connection = self.connection
+            self.detach()
+            connection.close()
+        else:
+            super().__exit__(type, value, traceback)
+
+
+class SafePool(Pool):
+    """A :class:`.Pool` of :class:`.SafePoolConnection`.
+
+    The time spent waiting for a connection, including opening a new one,
+    is stored in the ``acquire_time`` attribute of the connection
+    """
+    async def connect(self):
+        assert not self.closed
+        start = self._loop.time()
+        connection = await self._get()
+        connection.acquire_time = self._loop.time() - start
+        return SafePoolConnection(self, connection)
+
+    def evict_idle(self, max_connections=None):
+        """Close up to ``max_connections`` idle connections of the pool
+
+        :return: the number of closed connections
+        """
+        queue = self._queue
+        evicted = 0
+        while queue.qsize() and (max_connections is None or
+                                 evicted < max_connections):
+            connection = queue.get_nowait()
+            if connection is not None and not connection.closed:
+                connection.close()
+                evicted += 1
+        return evicted
+
+
+class ConnectionLimit:
+    """Limit the number of open connections of a group of HTTP clients.
+
+    When the limit is reached, idle connections of the clients are evicted
+    before waiting for a connection to close.
+
+    .. attribute:: stats
+
+        A :class:`~collections.Counter` of opened ``connections`` and
+        idle connections ``evicted`` to make room for new ones
+    """
+    def __init__(self, max_connections=MAX_CONNECTIONS, loop=None):
+        self.max_connections = max_connections
+        self.clients = weakref.WeakSet()
+        self.stats = Counter()
+        self._semaphore = asyncio.Semaphore(max_connections, loop=loop)
+
+    @property
+    def open(self):
+        """Number of open connections
+        """
+        return self.max_connections - self._semaphore._value
+
+    async def acquire(self):
+        if self._semaphore.locked():
+            for client in self.clients:
+                if client.evict_idle(1):
+                    self.stats['evicted'] += 1
+                    break
+        await self._semaphore.acquire()
+        self.stats['connections'] += 1
+
+    def release(self):
+        self._semaphore.release()
+
+    def bind(self, connection):
+        """Release the connection slot when ``connection`` is lost
+        """
+        released = False
+
+        def _release(_, exc=None):
+            nonlocal released
+            if not released:
+                released = True
+                self.release()
+
+        connection.event('connection_lost').bind(_release)
+
+
+class DnsCache:
+    """Cache of resolved host addresses.
+
+    Addresses are kept for ``ttl`` seconds and handed out in rotation so
+    that new connections are spread across the addresses of a host.
+    """
+    def __init__(self, loop, ttl=DNS_TTL):
+        self.ttl = ttl
+        self._loop = loop
+        self._hosts = {}
+
+    def __len__(self):
+        return len(self._hosts)
+
+    async def resolve(self, host, port):
+        """Resolve ``host`` into an ``(ip, port)`` address
+        """
+        key = (host, port)
+        now = self._loop.time()
+        entry = self._hosts.get(key)
+        if entry is None or entry[0] < now:
+            infos = await self._loop.getaddrinfo(host, port,
+                                                 type=socket.SOCK_STREAM)
+            entry = [now + self.ttl, [info[4][:2] for info in infos], 0]
+            self._hosts[key] = entry
+        addresses = entry[1]
+        entry[2] = (entry[2] + 1) % len(addresses)
+        return addresses[entry[2]]
+
+    def invalidate(self, host, port):
+        self._hosts.pop((host, port), None)
+
+    def clear(self):
+        self._hosts.clear()
+
+
+class BotocoreHttpClient(HttpClient):
+    """The :class:`.HttpClient` used by botocore clients
+
+    :param ssl_context: optional :class:`ssl.SSLContext` for all TLS
+        connections. When not provided, a context is created once per
+        ``verify`` value rather than for every request
+    :param use_dns_cache: cache resolved addresses in a :class:`.DnsCache`
+    :param connection_limit: optional :class:`.ConnectionLimit` shared
+        with other clients
+    :param shared: the client is shared by several botocore clients,
+        :meth:`close` only closes idle connections
+    """
+    connection_pool = SafePool
+
+    def __init__(self, *args, ssl_context=None, use_dns_cache=False,
+                 connection_limit=None, shared=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ssl_context = ssl_context
+        self._ssl_contexts = {}
+        self.dns_cache = DnsCache(self._loop) if use_dns_cache else None
+        self.connection_limit = connection_limit
+        self.shared = shared
+        if connection_limit is not None:
+            connection_limit.clients.add(self)
+
+    def close(self):
+        if self.shared:
+            self.evict_idle()
+            return asyncio.gather(loop=self._loop)
+        return super().close()
+
+    def evict_idle(self, max_connections=None):
+        """Close up to ``max_connections`` idle connections
+        """
+        evicted = 0
+        for pool in self.connection_pools.values():
+            if max_connections is not None:
+                if evicted >= max_connections:
+                    break
+                evicted += pool.evict_idle(max_connections - evicted)
+            else:
+                evicted += pool.evict_idle()
+        return evicted
+
+    def get_pool(self, url, verify=None):
+        """The connection pool for requests to ``url``, created if needed
+        """
+        # CUT AND PASTE FROM PULSAR HttpClient._request
+        nparams = dict(((name, getattr(self, name)) for name in
+                        self.request_parameters))
+        if verify is not None:
+            nparams['verify'] = verify
+        request = HttpRequest(self, url, 'GET', {}, **nparams)
+        pool = self.connection_pools.get(request.key)
+        if pool is None:
+            host, port = request.address
+            connector = partial(self.create_connection,
+                                (host, port),
+                                ssl=request.ssl)
+            pool = self.connection_pool(connector, pool_size=self.pool_size,
+                                        loop=self._loop)
+            self.connection_pools[request.key] = pool
+        # END OF CUT AND PASTE
+        return pool
+
+    async def warmup(self, url, connections=1, verify=None):
+        """Open up to ``connections`` connections to ``url`` concurrently
+        and keep them in the connection pool
+
+        :return: the time taken by the warm-up, in seconds
+        """
+        start = self._loop.time()
+        pool = self.get_pool(url, verify)
+        connections = min(connections, pool.pool_size) - pool.available
+        results = await asyncio.gather(
+            *[pool.connect() for _ in range(max(connections, 0))],
+            loop=self._loop, return_exceptions=True)
+        opened = 0
+        for result in results:
+            if isinstance(result, Exception):
+                LOGGER.warning('Could not open connection to %s: %s',
+                               url, result)
+            else:
+                result.close()
+                opened += 1
+        elapsed = self._loop.time() - start
+        LOGGER.info('Opened %d connections to %s in %.3f seconds',
+                    opened, url, elapsed)
+        return elapsed
+
+    async def create_connection(self, address, protocol_factory=None, **kw):
+        limit = self.connection_limit
+        if limit is None:
+            return await self._create_connection(address, protocol_factory,
+                                                 **kw)
+        await limit.acquire()
+        try:
+            connection = await self._create_connection(address,
+                                                       protocol_factory, **kw)
+        except BaseException:
+            limit.release()
+            raise
+        limit.bind(connection)
+        return connection
+
+    # INTERNALS
+    def _ssl_context(self, verify=True, pre_request=None, **kw):
+        # request event handlers are passed along with the ssl parameters
+        if self.ssl_context is not None:
+            return self.ssl_context
+        if kw:
+            return super()._ssl_context(verify=verify, **kw)
+        context = self._ssl_contexts.get(verify)
+        if context is None:
+            context = super()._ssl_context(verify=verify)
+            self._ssl_contexts[verify] = context
+        return context
+
+    async def _create_connection(self, address, protocol_factory, **kw):
+        if self.dns_cache is None or not isinstance(address, tuple):
+            return await super().create_connection(address, protocol_factory,
+                                                   **kw)
+        host, port = address
+        if kw.get('ssl'):
+            kw.setdefault('server_hostname', host)
+        try:
+            return await super().create_connection(
+                await self.dns_cache.resolve(host, port), protocol_factory,
+                **kw)
+        except OSError:
+            self.dns_cache.invalidate(host, port)
+            raise
+
+
+def http_client_args(config=None):
+    """Keyword arguments of a :class:`.BotocoreHttpClient` from the
+    ``connector_args`` and ``max_pool_connections`` of a botocore client
+    ``config``
+
+    * ``limit`` (or ``max_pool_connections``) sets the pool size per host
+    * ``keepalive_timeout`` closes connections idle for longer
+    * ``force_close`` closes connections after each request
+    * ``use_dns_cache`` caches resolved addresses (default ``True``)
+    * ``ssl_context`` is used for all TLS connections
+    * ``verify_ssl`` disables certificate verification when ``False``
+    """
+    if config is None:
+        config = AsyncConfig()
+    connector_args = getattr(config, 'connector_args', None) or {}
+    pool_size = connector_args.get('limit')
+    if pool_size is None:
+        pool_size = (getattr(config, 'max_pool_connections', None) or
+                     MAX_POOL_CONNECTIONS)
+    kwargs = dict(
+        pool_size=pool_size,
+        keep_alive=connector_args.get('keepalive_timeout'),
+        close_connections=connector_args.get('force_close', False),
+        use_dns_cache=connector_args.get('use_dns_cache', True),
+        ssl_context=connector_args.get('ssl_context'),
+        decompress=False
+    )
+    if connector_args.get('verify_ssl') is False:
+        kwargs['verify'] = False
+    return kwargs
+
+
+def create_http_client(config=None, loop=None, **kwargs):
+    """Create a :class:`.BotocoreHttpClient` from a botocore client
+    ``config``, see :func:`http_client_args`
+    """
+    params = http_client_args(config)
+    params.update(kwargs)
+    return BotocoreHttpClient(loop=loop, **params)
+
+
+class PoolRegistry:
+    """Process-wide registry of shared HTTP clients.
+
+    Botocore clients with the same connection settings share an HTTP
+    client, and therefore the connection pools of each scheme, host, port
+    and TLS configuration, in each event loop. The open connections of
+    all shared clients of a loop are capped to :attr:`max_connections`.
+    """
+    def __init__(self, max_connections=MAX_CONNECTIONS):
+        self.max_connections = max_connections
+        self._loops = weakref.WeakKeyDictionary()
+
+    def http_client(self, config=None, loop=None):
+        """The shared :class:`.BotocoreHttpClient` for a client ``config``
+        """
+        loop = loop or asyncio.get_event_loop()
+        kwargs = http_client_args(config)
+        key = tuple(sorted(kwargs.items()))
+        clients = self._clients(loop)
+        client = clients.get(key)
+        if client is None:
+            client = BotocoreHttpClient(
+                loop=loop, shared=True,
+                connection_limit=self.connection_limit(loop), **kwargs)
+            clients[key] = client
+        return client
+
+    def connection_limit(self, loop=None):
+        """The :class:`.ConnectionLimit` of shared clients in ``loop``
+        """
+        loop = loop or asyncio.get_event_loop()
+        entry = self._loops.get(loop)
+        if entry is None:
+            entry = (ConnectionLimit(self.max_connections, loop=loop), {})
+            self._loops[loop] = entry
+        return entry[0]
+
+    def close(self, loop=None):
+        """Close shared clients of ``loop`` and remove them from the registry
+        """
+        loop = loop or asyncio.get_event_loop()
+        entry = self._loops.pop(loop, None)
+        clients = entry[1].values() if entry else ()
+        return asyncio.gather(*[HttpClient.close(c) for c in clients],
+                              loop=loop)
+
+    def _clients(self, loop):
+        self.connection_limit(loop)
+        return self._loops[loop][1]
+
+
+pools = PoolRegistry()
+
+
+def shared_http_client(config=None, loop=None):
+    """The shared :class:`.BotocoreHttpClient` of :data:`pools`
+    """
+    return pools.http_client(config, loop)
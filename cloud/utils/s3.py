@@ -1,17 +1,38 @@
 """Utilities for S3 storage
 """
+import io
 import os
+import re
+import json
+import base64
+import hashlib
 import mimetypes
 import logging
 import asyncio
-
-from pulsar.utils.system import convert_bytes
+import weakref
+from functools import partial
 
 # 8MB for multipart uploads
 MULTI_PART_SIZE = 2**23
+# Minimum size of parts, but the last one, accepted by S3
+MIN_PART_SIZE = 5*2**20
+# Error codes of failed parts which are retried
+RETRY_PART_ERRORS = frozenset(('RequestTimeout', 'SlowDown', 'InternalError',
+                               'ServiceUnavailable', 'BadDigest'))
+# Bandwidth is acquired in slices of this many bytes so that rate changes
+# apply to transfers in progress
+BANDWIDTH_SLICE = 2**18
+# ETags of single and multi-part uploads not encrypted with KMS keys
+MD5_ETAG = re.compile(r'^[0-9a-f]{32}(-\d+)?$')
 LOGGER = logging.getLogger('cloud.s3')
 
 
+def convert_bytes(b):
+    # pulsar is imported on first use
+    from pulsar.utils.system import convert_bytes
+    return convert_bytes(b)
+
+
 def skip_file(filename):
     if filename.startswith('.') or filename.startswith('_'):
         return True
@@ -21,14 +42,131 @@ def s3_key(key):
     return key.replace('\\', '/')
 
 
+def folder_files(folder, skip=None):
+    """Dictionary of sizes of files to upload from ``folder`` keyed by
+    their path
+    """
+    skip = set(skip or ())
+    files = {}
+    for dirpath, _, filenames in os.walk(folder):
+        for filename in filenames:
+            if skip_file(filename) or filename in skip:
+                continue
+            full_path = os.path.join(dirpath, filename)
+            files[full_path] = os.stat(full_path).st_size
+    return files
+
+
+class BandwidthLimiter:
+    """Limit the bytes per second sent and received by S3 transfers
+
+    A :class:`.TokenBucket` of bytes is shared by the transfers of each
+    event loop. The :attr:`rate`, in bytes per second, can be changed at
+    runtime with :meth:`set_rate`, ``None`` does not limit transfers.
+
+    :param capacity: optional number of bytes which can be transferred in
+        a burst, defaults to the rate
+    """
+    def __init__(self, rate=None, capacity=None):
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets = weakref.WeakKeyDictionary()
+
+    def set_rate(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity
+        for bucket in self._buckets.values():
+            bucket.set_rate(rate, capacity or rate)
+
+    async def acquire(self, size, loop):
+        """Wait until ``size`` bytes can be transferred
+        """
+        while size > 0 and self.rate:
+            bucket = self._buckets.get(loop)
+            if bucket is None:
+                from ..asyncbotocore.ratelimit import TokenBucket
+                bucket = TokenBucket(self.rate, self.capacity or self.rate,
+                                     loop=loop)
+                self._buckets[loop] = bucket
+            tokens = min(size, BANDWIDTH_SLICE)
+            await bucket.acquire(tokens)
+            size -= tokens
+
+
+bandwidth = BandwidthLimiter()
+
+
+class ThrottledBody(io.BytesIO):
+    """A request body sent in :data:`BANDWIDTH_SLICE` chunks, each chunk
+    waiting for bandwidth from a :class:`.BandwidthLimiter`
+
+    The http client iterates over the body and awaits each chunk before
+    writing it, so that bodies are throttled while they are streamed.
+    """
+    def __init__(self, data, limiter, loop):
+        super().__init__(data)
+        self.limiter = limiter
+        self.loop = loop
+
+    def __iter__(self):
+        for chunk in iter(partial(self.read, BANDWIDTH_SLICE), b''):
+            yield self._acquire(chunk)
+
+    async def _acquire(self, chunk):
+        await self.limiter.acquire(len(chunk), self.loop)
+        return chunk
+
+
 class S3tools:
     """Mixin with additional s3 methods
+
+    .. attribute:: part_attempts
+
+        Maximum number of attempts of each part of multi-part uploads and
+        copies before the whole transfer is aborted
+
+    .. attribute:: part_backoff
+
+        Base delay in seconds between attempts of a part, doubled after
+        each failed attempt
+
+    .. attribute:: bandwidth_limiter
+
+        The :class:`.BandwidthLimiter` of uploads and downloads, by default
+        the :data:`bandwidth` limiter shared by all clients of the process
+
+    Multi-part transfers add the number of retried parts to their result
+    as ``PartRetries``.
     """
+    part_attempts = 3
+    part_backoff = 0.5
+    bandwidth_limiter = bandwidth
+
     async def upload_file(self, bucket, file, uploadpath=None, key=None,
-                          ContentType=None, **kw):
+                          ContentType=None, part_size=None, resume=None,
+                          verify=False, progress=None, **kw):
         """Upload a file to S3 possibly using the multi-part uploader
         Return the key uploaded
+
+        :param part_size: size of the parts of multi-part uploads of files
+            larger than it, defaults to :data:`MULTI_PART_SIZE`
+        :param resume: optional folder where the state of multi-part
+            uploads is saved, see :class:`.UploadState`. Failed uploads
+            are not aborted and the next upload of the file only sends
+            the missing parts
+        :param verify: send the MD5 of the data as ``ContentMD5`` and
+            check the ETags returned by S3 against it, parts rejected by S3
+            or failing the check are retried and a
+            :class:`~botocore.exceptions.ChecksumError` is raised if the
+            ETag of the object does not match. Not suitable for objects
+            encrypted with KMS keys, whose ETags are not MD5 digests
+        :param progress: optional callable called with the number of bytes
+            of each uploaded part, or of the whole file, once uploaded
         """
+        part_size = part_size or MULTI_PART_SIZE
+        if part_size < MIN_PART_SIZE:
+            raise ValueError('part size must be at least %d bytes'
+                             % MIN_PART_SIZE)
         is_filename = False
 
         if hasattr(file, 'read'):
@@ -60,21 +198,88 @@ class S3tools:
 
         params['ContentType'] = ContentType
 
-        if size > MULTI_PART_SIZE and is_filename:
-            resp = await _multipart(self, file, params)
-        elif is_filename:
-            with open(file, 'rb') as fp:
-                params['Body'] = fp.read()
-            resp = await self.put_object(**params)
+        if size > part_size and is_filename:
+            state = None
+            if resume:
+                state = UploadState(resume, bucket, key, file, part_size)
+            with self.operation():
+                resp = await _multipart(self, file, params, part_size, state,
+                                        verify, progress)
         else:
-            params['Body'] = file
+            if is_filename:
+                with open(file, 'rb') as fp:
+                    file = fp.read()
+            elif isinstance(file, str):
+                file = file.encode('utf-8')
+            if verify:
+                params['ContentMD5'], md5 = await _content_md5(self, file)
+            params['Body'] = ThrottledBody(file, self.bandwidth_limiter,
+                                           self._loop)
             resp = await self.put_object(**params)
+            if verify:
+                _check_etag(resp, md5)
+            if progress:
+                progress(len(file))
         if 'Key' not in resp:
             resp['Key'] = key
         if 'Bucket' not in resp:
             resp['Bucket'] = bucket
         return resp
 
+    async def download_file(self, bucket, key, filename, checksum=None,
+                            algorithm='sha256', verify=True, part_size=None,
+                            **kw):
+        """Download an object into ``filename``
+
+        Checksums are computed while chunks are written.
+
+        :param checksum: optional expected hex digest of the object
+        :param algorithm: a :mod:`hashlib` algorithm for ``checksum``
+        :param verify: verify the ETag of the object when it is the MD5 of
+            the object or, for multi-part uploads, when ``part_size`` is
+            given. ETags are not verified for ``Range`` and ``PartNumber``
+            downloads and for objects encrypted with KMS or customer keys,
+            whose ETags are not MD5 digests
+        :param part_size: optional size of the parts of the upload
+        :return: the ``get_object`` response where the ``Body`` is
+            replaced by the hex digest of the object as ``Checksum``
+        :raise ChecksumError: if a check fails, ``filename`` is removed
+        """
+        from botocore.exceptions import ChecksumError
+        response = await self.get_object(Bucket=bucket, Key=key, **kw)
+        body = response.pop('Body')
+        expected = _md5_etag(response, kw)
+        etag = None
+        if verify and expected:
+            if '-' not in expected:
+                etag = ETag()
+            elif part_size:
+                etag = ETag(part_size)
+        digest = hashlib.new(algorithm)
+        try:
+            with open(filename, 'wb') as fp:
+                async for chunk in body:
+                    await _throttle_download(self.bandwidth_limiter, body,
+                                             chunk, self._loop)
+                    fp.write(chunk)
+                    digest.update(chunk)
+                    if etag:
+                        etag.update(chunk)
+            response['Checksum'] = digest.hexdigest()
+            if etag and etag.hexdigest() != expected:
+                raise ChecksumError(checksum_type='etag',
+                                    expected_checksum=expected,
+                                    actual_checksum=etag.hexdigest())
+            if checksum and response['Checksum'] != checksum:
+                raise ChecksumError(checksum_type=algorithm,
+                                    expected_checksum=checksum,
+                                    actual_checksum=response['Checksum'])
+        except Exception:
+            if os.path.exists(filename):
+                os.remove(filename)
+            raise
+        return response
+
     async def copy_storage_object(self, source_bucket, source_key,
                                   bucket, key):
         """Copy a file from one bucket into another
@@ -83,8 +288,9 @@ class S3tools:
         size = info['ContentLength']
 
         if size > MULTI_PART_SIZE:
-            result = await _multipart_copy(self, source_bucket, source_key,
-                                           bucket, key, size)
+            with self.operation():
+                result = await _multipart_copy(self, source_bucket,
+                                               source_key, bucket, key, size)
         else:
             result = await self.copy_object(
                 Bucket=bucket, Key=key,
@@ -93,7 +299,7 @@ class S3tools:
         return result
 
     def upload_folder(self, bucket, folder, key=None, skip=None,
-                      content_types=None):
+                      content_types=None, **kwargs):
         """Recursively upload a ``folder`` into a backet.
 
         :param bucket: bucket where to upload the folder to
@@ -102,55 +308,227 @@ class S3tools:
         :param skip: Optional list of files to skip
         :param content_types: Optional dictionary mapping suffixes to
             content types
-        :return: a coroutine
+        :param kwargs: ``files``, ``concurrency``, ``part_size``, ``sync``,
+            ``resume`` and ``verify`` options of :class:`.FolderUploader`
+        :return: the :class:`.FolderUploader`, awaiting it runs the upload
+            and results in the upload summary
         """
-        uploader = FolderUploader(self, bucket, folder, key, skip,
-                                  content_types)
-        return uploader.start()
+        return FolderUploader(self, bucket, folder, key, skip,
+                              content_types, **kwargs)
+
+
+class UploadState:
+    """Local state of a resumable multi-part upload
+
+    The upload id and the ETags of uploaded parts are saved in a JSON file
+    of ``folder`` named after the bucket, key and file uploaded. The state
+    is only valid for the size, modification time and part size of the
+    file when the upload started.
+    """
+    def __init__(self, folder, bucket, key, filename, part_size):
+        stat = os.stat(filename)
+        filename = os.path.abspath(filename)
+        self.source = dict(bucket=bucket, key=key, filename=filename,
+                           size=stat.st_size, mtime=stat.st_mtime,
+                           part_size=part_size)
+        name = json.dumps([bucket, key, filename]).encode('utf-8')
+        self.path = os.path.join(folder, '%s.json' %
+                                 hashlib.sha1(name).hexdigest())
+        self.upload_id = None
+        self.parts = {}
+
+    def load(self):
+        """Load the state saved by a previous upload
+
+        :return: the upload id of a previous upload of a different version
+            of the file, which should be aborted
+        """
+        try:
+            with open(self.path) as fp:
+                data = json.load(fp)
+        except (OSError, ValueError):
+            return
+        if data.get('source') != self.source:
+            self.remove()
+            return data.get('upload_id')
+        self.upload_id = data['upload_id']
+        self.parts = dict((int(n), etag) for n, etag in data['parts'].items())
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp = '%s.tmp' % self.path
+        with open(temp, 'w') as fp:
+            json.dump(dict(source=self.source, upload_id=self.upload_id,
+                           parts=self.parts), fp)
+        os.replace(temp, self.path)
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class ETag:
+    """Incremental computation of the ETag of an S3 object
+
+    The ETag is the MD5 of the data, or, when ``part_size`` is given, the
+    MD5 of the MD5 digests of the parts followed by the number of parts as
+    computed by S3 for multi-part uploads
+    """
+    def __init__(self, part_size=None):
+        self.part_size = part_size
+        self.digests = []
+        self._md5 = hashlib.md5()
+        self._size = 0
+
+    def update(self, data):
+        data = memoryview(data)
+        while data:
+            if self.part_size:
+                chunk = data[:self.part_size - self._size]
+            else:
+                chunk = data
+            self._md5.update(chunk)
+            self._size += len(chunk)
+            data = data[len(chunk):]
+            if self._size == self.part_size:
+                self.add_digest(self._md5.digest())
+                self._md5 = hashlib.md5()
+                self._size = 0
+
+    def add_digest(self, digest):
+        """Add the MD5 ``digest`` of a part
+        """
+        self.digests.append(digest)
+
+    def hexdigest(self):
+        if not self.part_size:
+            return self._md5.hexdigest()
+        digests = list(self.digests)
+        if self._size:
+            digests.append(self._md5.digest())
+        return '%s-%d' % (hashlib.md5(b''.join(digests)).hexdigest(),
+                          len(digests))
 
 
 # INTERNALS
-async def _multipart(self, filename, params):
-    response = await self.create_multipart_upload(**params)
+async def _multipart(self, filename, params, part_size=MULTI_PART_SIZE,
+                     state=None, verify=False, progress=None):
     bucket = params['Bucket']
     key = params['Key']
-    uid = response['UploadId']
+    uid = None
+    uploaded = {}
+    if state:
+        stale = state.load()
+        if stale:
+            await _abort_multipart(self, bucket, key, stale)
+        if state.upload_id:
+            uploaded = await _uploaded_parts(self, bucket, key,
+                                             state.upload_id)
+            if uploaded is None:
+                uploaded = {}
+            else:
+                uid = state.upload_id
+    if uid is None:
+        response = await self.create_multipart_upload(**params)
+        uid = response['UploadId']
+        if state:
+            state.upload_id = uid
+            state.parts = {}
+            state.save()
     params['UploadId'] = uid
     params.pop('ContentType', None)
+    size = os.stat(filename).st_size
+    retries = 0
+    composite = ETag(part_size)
     try:
         parts = []
         with open(filename, 'rb') as file:
-            while True:
-                body = file.read(MULTI_PART_SIZE)
-                if not body:
-                    break
-                num = len(parts) + 1
-                params['Body'] = body
-                params['PartNumber'] = num
-                result = await self.upload_part(**params)
-                part = result['ResponseMetadata']['HTTPHeaders']
-                parts.append(dict(ETag=part['Etag'], PartNumber=num))
+            for num, start in enumerate(range(0, size, part_size), 1):
+                etag = uploaded.get((num, min(part_size, size - start)))
+                if etag:
+                    file.seek(start + part_size)
+                    composite.add_digest(bytes.fromhex(etag.strip('"')))
+                else:
+                    params['Body'] = file.read(part_size)
+                    params['PartNumber'] = num
+                    check = None
+                    if verify:
+                        params['ContentMD5'], md5 = await _content_md5(
+                            self, params['Body'])
+                        composite.add_digest(bytes.fromhex(md5))
+                        check = partial(_check_etag, expected=md5)
+                    body = params['Body']
+                    result, attempts = await _transfer_part(
+                        self, self.upload_part, params, check)
+                    retries += attempts - 1
+                    if progress:
+                        progress(len(body))
+                    etag = result['ResponseMetadata']['HTTPHeaders']['Etag']
+                    if state:
+                        state.parts[num] = etag
+                        state.save()
+                parts.append(dict(ETag=etag, PartNumber=num))
     except Exception:
-        await self.abort_multipart_upload(Bucket=bucket, Key=key,
-                                          UploadId=uid)
+        if not state:
+            await _abort_multipart(self, bucket, key, uid)
         raise
     else:
         if parts:
             bits = dict(Parts=parts)
             result = await self.complete_multipart_upload(
                 Bucket=bucket, UploadId=uid, Key=key, MultipartUpload=bits)
+            result['PartRetries'] = retries
+            if state:
+                state.remove()
+            if verify:
+                _check_etag(result, composite.hexdigest())
             return result
         else:
             await self.abort_multipart_upload(
                 Bucket=bucket, Key=key, UploadId=uid)
 
 
+async def _uploaded_parts(self, bucket, key, uid):
+    """ETags of the uploaded parts of upload ``uid`` keyed by part number
+    and size, ``None`` if the upload does not exist
+    """
+    from botocore.exceptions import ClientError
+    parts = {}
+    paginator = self.get_paginator('list_parts')
+    try:
+        async for page in paginator.paginate(Bucket=bucket, Key=key,
+                                             UploadId=uid):
+            for part in page.get('Parts', ()):
+                parts[(part['PartNumber'], part['Size'])] = part['ETag']
+    except ClientError as exc:
+        if exc.response['Error']['Code'] != 'NoSuchUpload':
+            raise
+        return None
+    return parts
+
+
+async def _abort_multipart(self, bucket, key, uid):
+    """Abort upload ``uid``, a failure is logged so that it does not mask
+    the error which caused the abort
+    """
+    from botocore.exceptions import BotoCoreError, ClientError
+    try:
+        await self.abort_multipart_upload(Bucket=bucket, Key=key,
+                                          UploadId=uid)
+    except (BotoCoreError, ClientError) as exc:
+        LOGGER.warning('Could not abort upload "%s" of "%s": %s',
+                       uid, key, exc)
+
+
 async def _multipart_copy(self, source_bucket, source_key, bucket,
                           key, size):
     response = await self.create_multipart_upload(Bucket=bucket, Key=key)
     start = 0
     parts = []
     num = 1
+    retries = 0
     uid = response['UploadId']
     params = {
         'CopySource': _source_string(source_bucket, source_key),
@@ -163,45 +541,190 @@ async def _multipart_copy(self, source_bucket, source_key, bucket,
             end = min(size, start + MULTI_PART_SIZE)
             params['PartNumber'] = num
             params['CopySourceRange'] = 'bytes={}-{}'.format(start, end-1)
-            part = await self.upload_part_copy(**params)
+            part, attempts = await _transfer_part(
+                self, self.upload_part_copy, params)
+            retries += attempts - 1
             parts.append(dict(
                 ETag=part['CopyPartResult']['ETag'], PartNumber=num))
             start = end
             num += 1
     except:
-        await self.abort_multipart_upload(Bucket=bucket, Key=key,
-                                          UploadId=uid)
+        await _abort_multipart(self, bucket, key, uid)
         raise
     else:
         if parts:
             bits = dict(Parts=parts)
             result = await self.complete_multipart_upload(
                 Bucket=bucket, UploadId=uid, Key=key, MultipartUpload=bits)
+            result['PartRetries'] = retries
             return result
         else:
             await self.abort_multipart_upload(Bucket=bucket, Key=key,
                                               UploadId=uid)
 
 
+async def _transfer_part(self, transfer, params, check=None):
+    """Call ``transfer``, ``upload_part`` or ``upload_part_copy``, with
+    ``params`` retrying transient failures up to ``self.part_attempts``
+    times. The optional ``check`` of the result raises a
+    :class:`~botocore.exceptions.ChecksumError` to retry a part
+
+    :return: the result and the number of attempts
+    """
+    from botocore.exceptions import BotoCoreError, ClientError
+    from ..asyncbotocore.ratelimit import jitter_delay
+    attempt = 1
+    body = params.get('Body')
+    while True:
+        try:
+            if body:
+                params['Body'] = ThrottledBody(body, self.bandwidth_limiter,
+                                               self._loop)
+            result = await transfer(**params)
+            if check:
+                check(result)
+            return result, attempt
+        except asyncio.CancelledError:
+            raise
+        except (BotoCoreError, ClientError, OSError,
+                asyncio.TimeoutError) as exc:
+            if attempt >= self.part_attempts or not _retry_part(exc):
+                raise
+            delay = jitter_delay(self.part_backoff*2**(attempt - 1))
+            LOGGER.warning('Part %d of "%s" failed, retrying in %.2f '
+                           'seconds: %s', params['PartNumber'],
+                           params['Key'], delay, exc)
+            await asyncio.sleep(delay, loop=self._loop)
+            attempt += 1
+
+
+async def _content_md5(self, body):
+    """Base64 and hex encoded MD5 digests of ``body`` computed in the
+    hashing thread pool. The base64 digest is sent as ``ContentMD5`` so
+    that the body is not hashed again by botocore
+    """
+    from ..asyncbotocore.hashing import payload_hashes
+    md5, _ = await payload_hashes(body, False, self._loop)
+    return md5, base64.b64decode(md5).hex()
+
+
+async def _throttle_download(limiter, body, chunk, loop):
+    """Wait for the bandwidth of a ``chunk`` of a streamed response
+    ``body``.
+
+    Reading from the connection is paused meanwhile, otherwise data
+    received while waiting would pile up in the queue of the stream.
+    """
+    transport = getattr(getattr(body, '_response', None), 'transport', None)
+    if (not limiter.rate or transport is None or transport.is_closing() or
+            getattr(body, 'done', True)):
+        return await limiter.acquire(len(chunk), loop)
+    transport.pause_reading()
+    try:
+        await limiter.acquire(len(chunk), loop)
+    finally:
+        if not transport.is_closing():
+            transport.resume_reading()
+
+
+def _etag(result):
+    """The ETag, without quotes, of an S3 response
+    """
+    etag = result.get('ETag')
+    if not etag:
+        headers = result['ResponseMetadata']['HTTPHeaders']
+        etag = headers.get('etag') or headers.get('Etag') or ''
+    return etag.strip('"')
+
+
+def _md5_etag(response, params):
+    """The ETag of a ``get_object`` response when it is the MD5, single or
+    multi-part, of the body
+    """
+    if 'Range' in params or 'PartNumber' in params:
+        return
+    if (response.get('ServerSideEncryption') == 'aws:kms' or
+            response.get('SSECustomerAlgorithm')):
+        return
+    etag = _etag(response)
+    if MD5_ETAG.match(etag):
+        return etag
+
+
+def _check_etag(result, expected):
+    from botocore.exceptions import ChecksumError
+    etag = _etag(result)
+    if etag != expected:
+        raise ChecksumError(checksum_type='etag', expected_checksum=expected,
+                            actual_checksum=etag)
+
+
+def _retry_part(exc):
+    """Check if a part failed with a transient error: a connection error,
+    a timeout, a server or throttling error or a checksum mismatch
+    """
+    from botocore.exceptions import (
+        ChecksumError, ClientError, EndpointConnectionError,
+        IncompleteReadError
+    )
+    from ..asyncbotocore.ratelimit import THROTTLING_ERRORS
+    if isinstance(exc, ClientError):
+        response = exc.response
+        status = response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+        code = response.get('Error', {}).get('Code')
+        return (status >= 500 or status == 429 or code in RETRY_PART_ERRORS or
+                code in THROTTLING_ERRORS)
+    return isinstance(exc, (OSError, asyncio.TimeoutError, ChecksumError,
+                            EndpointConnectionError, IncompleteReadError))
+
+
 def _source_string(bucket, key):
     return '{}/{}'.format(bucket, key)
 
 
 class FolderUploader:
     """Utility class to recursively upload a folder to S3
+
+    :param files: optional dictionary of sizes keyed by path of the files
+        of ``folder`` to upload, by default all files not skipped
+    :param concurrency: optional maximum number of files uploaded
+        concurrently
+    :param part_size: size of the parts of multi-part uploads
+    :param sync: skip files with an uploaded object of the same size
+        modified after the file
+    :param resume: optional folder where the state of multi-part uploads
+        is saved so that failed uploads can be resumed
+    :param verify: verify the ETags of uploaded files and parts
+
+    Await the uploader to run the upload, :meth:`throughput` reports the
+    bytes uploaded so far, parts of multi-part uploads included, while the
+    upload runs.
     """
     def __init__(self, botocore, bucket, folder, key=None, skip=None,
-                 content_types=None):
+                 content_types=None, files=None, concurrency=None,
+                 part_size=MULTI_PART_SIZE, sync=False, resume=None,
+                 verify=False):
         self.botocore = botocore
         self.bucket = bucket
         self.folder = folder
         self.all = {}
         self.failures = {}
         self.success = {}
+        self.skipped = {}
+        self.part_retries = 0
         self.total_size = 0
+        self.bytes_sent = 0
         self.total_files = 0
+        self.started = None
+        self.finished = None
         self.skip = set(skip or ())
         self.content_types = content_types or {}
+        self.files = files
+        self.concurrency = concurrency
+        self.part_size = part_size
+        self.sync = sync
+        self.resume = resume
+        self.verify = verify
         if not os.path.isdir(folder):
             raise ValueError('%s not a folder' % folder)
         if not key:
@@ -216,37 +739,101 @@ class FolderUploader:
     def _loop(self):
         return self.botocore._loop
 
+    def __await__(self):
+        return self.start().__await__()
+
+    def throughput(self):
+        """Aggregate throughput of the upload so far
+        """
+        elapsed = 0
+        if self.started is not None:
+            elapsed = (self.finished or self._loop.time()) - self.started
+        files = len(self.success)
+        sent = self.bytes_sent
+        return dict(files=files,
+                    bytes=sent,
+                    failures=len(self.failures),
+                    elapsed=elapsed,
+                    files_per_second=files/elapsed if elapsed else 0,
+                    bytes_per_second=sent/elapsed if elapsed else 0)
+
     async def start(self):
         # Loop through all files and upload
-        futures = []
-        for dirpath, _, filenames in os.walk(self.folder):
-            for filename in filenames:
-                if skip_file(filename) or filename in self.skip:
-                    continue
-                full_path = os.path.join(dirpath, filename)
-                futures.append(self._upload_file(full_path))
-                self.all[full_path] = os.stat(full_path).st_size
+        self.started = self._loop.time()
+        files = self.files
+        if files is None:
+            files = folder_files(self.folder, self.skip)
+        if self.sync:
+            files = await self._changed(files)
+        self.all.update(files)
         self.total_files = len(self.all)
-        await asyncio.gather(*futures, loop=self._loop)
+        semaphore = None
+        if self.concurrency:
+            semaphore = asyncio.Semaphore(self.concurrency, loop=self._loop)
+        await asyncio.gather(*[self._upload_file(full_path, semaphore)
+                               for full_path in files], loop=self._loop)
+        self.finished = self._loop.time()
         failures = len(self.failures)
         total_files = self.total_files - failures
-        LOGGER.info('Uploaded %d files for a total of %s. %d failures',
-                    total_files, convert_bytes(self.total_size), failures)
+        throughput = self.throughput()
+        LOGGER.info('Uploaded %d files for a total of %s in %.1f seconds '
+                    '(%s/s, %.1f files/s). %d failures, %d skipped, '
+                    '%d part retries',
+                    total_files, convert_bytes(self.total_size),
+                    throughput['elapsed'],
+                    convert_bytes(int(throughput['bytes_per_second'])),
+                    throughput['files_per_second'], failures,
+                    len(self.skipped), self.part_retries)
         return dict(failures=self.failures,
                     files=self.success,
+                    skipped=self.skipped,
+                    part_retries=self.part_retries,
                     total_size=self.total_size)
 
-    async def _upload_file(self, full_path):
+    def _progress(self, size):
+        self.bytes_sent += size
+
+    def _key(self, full_path):
+        rel_path = os.path.relpath(full_path, self.folder)
+        return s3_key(os.path.join(self.key, rel_path))
+
+    async def _changed(self, files):
+        """Files of ``files`` without an up to date uploaded object
+        """
+        uploaded = {}
+        paginator = self.botocore.get_paginator('list_objects_v2')
+        pages = paginator.paginate(Bucket=self.bucket, Prefix=self.key + '/')
+        async for page in pages:
+            for obj in page.get('Contents', ()):
+                uploaded[obj['Key']] = obj
+        changed = {}
+        for full_path, size in files.items():
+            key = self._key(full_path)
+            obj = uploaded.get(key)
+            # listed modification times are truncated to seconds
+            if (obj and obj['Size'] == size and
+                    obj['LastModified'].timestamp() >=
+                    int(os.stat(full_path).st_mtime)):
+                self.skipped[key] = size
+            else:
+                changed[full_path] = size
+        return changed
+
+    async def _upload_file(self, full_path, semaphore=None):
         """Coroutine for uploading a single file
         """
-        rel_path = os.path.relpath(full_path, self.folder)
-        key = s3_key(os.path.join(self.key, rel_path))
+        if semaphore:
+            async with semaphore:
+                return await self._upload_file(full_path)
+        key = self._key(full_path)
         ct = self.content_types.get(key.split('.')[-1])
-        with open(full_path, 'rb') as fp:
-            file = fp.read()
         try:
-            await self.botocore.upload_file(self.bucket, file, key=key,
-                                            ContentType=ct)
+            response = await self.botocore.upload_file(
+                self.bucket, full_path, uploadpath=os.path.dirname(key),
+                ContentType=ct, part_size=self.part_size,
+                resume=self.resume, verify=self.verify,
+                progress=self._progress)
+            self.part_retries += response.get('PartRetries', 0)
         except Exception as exc:
             LOGGER.error('Could not upload "%s": %s', key, exc)
             self.failures[key] = self.all.pop(full_path)
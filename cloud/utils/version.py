@@ -1,6 +1,4 @@
-import datetime
 import os
-import subprocess
 
 symbol = {'alpha': 'a', 'beta': 'b'}
 
@@ -20,6 +18,7 @@ def get_version(version, filename=None):
 
 
 def sh(command, cwd=None):
+    import subprocess
     return subprocess.Popen(command,
                             stdout=subprocess.PIPE,
                             stderr=subprocess.PIPE,
@@ -38,6 +37,7 @@ def get_git_changeset(filename=None):
     dirname = os.path.dirname(filename or __file__)
     git_show = sh('git show --pretty=format:%ct --quiet HEAD',
                   cwd=dirname)
+    import datetime
     timestamp = git_show.partition('\n')[0]
     try:
         timestamp = datetime.datetime.utcfromtimestamp(int(timestamp))
@@ -1,9 +1,11 @@
 import os
+import asyncio
 import tempfile
 import unittest
 
 from pulsar.apps.greenio import GreenPool
-from pulsar.apps.http import HttpClient
+
+from cloud.utils.http import BotocoreHttpClient
 
 
 ONEKB = 2**10
@@ -42,6 +44,57 @@ class RandomFile:
         return b''
 
 
+class FakeRaw:
+
+    def __init__(self, body):
+        self.body = body
+
+    async def read(self):
+        return self.body
+
+
+class FakeResponse:
+
+    def __init__(self, status_code=200, headers=None, body=b''):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.raw = FakeRaw(body)
+
+
+class FakeHttpSession:
+    """An http session stand-in for testing clients without the network.
+
+    Requests are recorded in :attr:`requests` and answered by the
+    ``handler`` coroutine function (an empty 200 response by default)
+    """
+    def __init__(self, handler=None, loop=None):
+        self._loop = loop or asyncio.get_event_loop()
+        self.handler = handler
+        self.requests = []
+
+    async def request(self, pre_request=None, **kwargs):
+        self.requests.append(kwargs)
+        if pre_request:
+            pre_request(FakeResponse())
+        if self.handler:
+            return await self.handler(**kwargs)
+        return FakeResponse()
+
+    async def close(self):
+        pass
+
+
+def fake_client(service_name, handler=None, **kwargs):
+    """Create a botocore client talking to a :class:`.FakeHttpSession`
+    """
+    from cloud.asyncbotocore import get_session
+    return get_session().create_client(
+        service_name, region_name='us-east-1',
+        http_session=FakeHttpSession(handler),
+        aws_access_key_id='access', aws_secret_access_key='secret',
+        **kwargs)
+
+
 def green(f):
 
     def _(self):
@@ -56,8 +109,8 @@ class BotocoreMixin:
     @classmethod
     def setUpClass(cls):
         cls.green_pool = GreenPool()
-        cls.sessions = HttpClient(pool_size=cls.pool_size,
-                                  decompress=False)
+        cls.sessions = BotocoreHttpClient(pool_size=cls.pool_size,
+                                          decompress=False)
         cls.kwargs = dict(http_session=cls.sessions,
                           region_name='us-east-1')
         cls.test = unittest.TestCase()
@@ -0,0 +1,425 @@
+"""A local stand-in for S3 and DynamoDB used by offline benchmarks.
+
+The server runs in a thread and keeps objects and items in memory. It
+supports the operations used by the benchmarks: S3 objects, multipart
+uploads, parts listings and copies, ListObjects/ListObjectsV2 pagination,
+DynamoDB GetItem/PutItem and SQS SendMessage/ReceiveMessage. S3 requests
+must use path style addressing, the Content-MD5 header of PUT requests is
+checked like S3 does.
+
+Latency, bandwidth and throttling can be injected via the ``latency``
+(seconds added to each request), ``bandwidth`` (bytes per second of
+request and response bodies) and ``throttle`` (fraction of requests
+answered with a throttling error) attributes of :class:`.FakeAwsServer`.
+Response bodies are written in ``chunk_size`` segments when set, each
+segment being delayed according to the bandwidth.
+
+Run the module to serve from a separate process, the url of the server
+is written to stdout.
+"""
+import json
+import time
+import base64
+import uuid
+import random
+import hashlib
+import argparse
+import threading
+from collections import defaultdict, deque
+from urllib.parse import urlsplit, parse_qs, unquote
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from xml.sax.saxutils import escape
+
+
+S3_NS = 'http://s3.amazonaws.com/doc/2006-03-01/'
+SQS_NS = 'http://queue.amazonaws.com/doc/2012-11-05/'
+DYNAMODB_PREFIX = 'DynamoDB_20120810.'
+
+
+def etag(body):
+    return '"%s"' % hashlib.md5(body).hexdigest()
+
+
+def xml(root, *elements, ns=S3_NS):
+    body = ''.join(elements)
+    xmlns = ' xmlns="%s"' % ns if ns else ''
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            '<{0}{1}>{2}</{0}>'.format(root, xmlns, body)
+            ).encode('utf-8')
+
+
+def md5_hex(text):
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+
+def tag(name, value):
+    return '<{0}>{1}</{0}>'.format(name, escape(str(value)))
+
+
+class FakeAwsHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self._handle()
+
+    def do_HEAD(self):
+        self._handle()
+
+    def do_PUT(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def do_DELETE(self):
+        self._handle()
+
+    def log_message(self, *args):
+        pass
+
+    def handle_expect_100(self):
+        # pulsar does not parse a final response received together with
+        # the interim 100 response, do not send it when there is no body
+        if int(self.headers.get('Content-Length') or 0):
+            return super().handle_expect_100()
+        return True
+
+    # INTERNALS
+    def _handle(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        server.delay(len(body))
+        target = self.headers.get('X-Amz-Target', '')
+        dynamodb = target.startswith(DYNAMODB_PREFIX)
+        sqs = self.command == 'POST' and body.startswith(b'Action=')
+        with server.lock:
+            server.stats['requests'] += 1
+            throttled = server.random.random() < server.throttle
+            if throttled:
+                server.stats['throttled'] += 1
+        if throttled:
+            if dynamodb:
+                status, headers, body = self._dynamodb_error(
+                    'ProvisionedThroughputExceededException')
+            else:
+                status, headers, body = self._s3_error(503, 'SlowDown')
+        elif dynamodb:
+            status, headers, body = self._dynamodb(
+                target[len(DYNAMODB_PREFIX):], body)
+        elif sqs:
+            status, headers, body = self._sqs(body)
+        else:
+            status, headers, body = self._s3(body)
+        server.delay(0 if server.chunk_size else len(body))
+        self.send_response(status)
+        headers.setdefault('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command == 'HEAD':
+            return
+        elif server.chunk_size:
+            for start in range(0, len(body), server.chunk_size):
+                chunk = body[start:start + server.chunk_size]
+                if server.bandwidth:
+                    time.sleep(len(chunk)/server.bandwidth)
+                self.wfile.write(chunk)
+        else:
+            self.wfile.write(body)
+
+    def _s3(self, body):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query, keep_blank_values=True)
+        bits = unquote(url.path).lstrip('/').split('/', 1)
+        bucket = bits[0]
+        key = bits[1] if len(bits) > 1 else ''
+        method = self.command
+        md5 = self.headers.get('Content-MD5')
+        if (method == 'PUT' and md5 and
+                md5 != base64.b64encode(hashlib.md5(body).digest()).decode()):
+            return self._s3_error(400, 'BadDigest')
+        if not key:
+            if method == 'GET':
+                return self._list_objects(bucket, query)
+            return self._s3_error(405, 'MethodNotAllowed')
+        elif 'uploads' in query:
+            return self._create_multipart_upload(bucket, key)
+        elif 'uploadId' in query:
+            return self._multipart(bucket, key, query, body)
+        elif method == 'PUT':
+            return self._put_object(bucket, key, body)
+        elif method in ('GET', 'HEAD'):
+            obj = self.server.objects.get((bucket, key))
+            if obj is None:
+                return self._s3_error(404, 'NoSuchKey')
+            headers = {'ETag': self.server.etags[(bucket, key)],
+                       'Content-Type': 'application/octet-stream'}
+            if method == 'HEAD':
+                headers['Content-Length'] = str(len(obj))
+                return 200, headers, b''
+            byte_range = self.headers.get('Range')
+            if byte_range:
+                start, end = byte_range.split('=')[1].split('-')
+                body = obj[int(start):int(end) + 1]
+                headers['Content-Range'] = 'bytes %s-%d/%d' % (
+                    start, int(start) + len(body) - 1, len(obj))
+                return 206, headers, body
+            return 200, headers, obj
+        elif method == 'DELETE':
+            self.server.objects.pop((bucket, key), None)
+            self.server.etags.pop((bucket, key), None)
+            return 204, {}, b''
+        return self._s3_error(405, 'MethodNotAllowed')
+
+    def _put_object(self, bucket, key, body):
+        source = self.headers.get('x-amz-copy-source')
+        if source:
+            body = self._copy_source(source)
+            if body is None:
+                return self._s3_error(404, 'NoSuchKey')
+            self.server.put(bucket, key, body)
+            return 200, {}, xml('CopyObjectResult', tag('ETag', etag(body)))
+        self.server.put(bucket, key, body)
+        return 200, {'ETag': etag(body)}, b''
+
+    def _create_multipart_upload(self, bucket, key):
+        server = self.server
+        with server.lock:
+            server.upload_ids += 1
+            upload_id = 'upload%d' % server.upload_ids
+        server.uploads[upload_id] = {}
+        return 200, {}, xml('InitiateMultipartUploadResult',
+                            tag('Bucket', bucket), tag('Key', key),
+                            tag('UploadId', upload_id))
+
+    def _multipart(self, bucket, key, query, body):
+        upload_id = query['uploadId'][0]
+        parts = self.server.uploads.get(upload_id)
+        if parts is None:
+            return self._s3_error(404, 'NoSuchUpload')
+        method = self.command
+        if method == 'PUT':
+            number = int(query['partNumber'][0])
+            source = self.headers.get('x-amz-copy-source')
+            if source:
+                body = self._copy_source(
+                    source, self.headers.get('x-amz-copy-source-range'))
+                if body is None:
+                    return self._s3_error(404, 'NoSuchKey')
+                parts[number] = body
+                return 200, {}, xml('CopyPartResult',
+                                    tag('ETag', etag(body)))
+            parts[number] = body
+            return 200, {'ETag': etag(body)}, b''
+        elif method == 'POST':
+            self.server.uploads.pop(upload_id)
+            numbers = sorted(parts)
+            body = b''.join(parts[n] for n in numbers)
+            digests = b''.join(hashlib.md5(parts[n]).digest()
+                               for n in numbers)
+            multipart_etag = '"%s-%d"' % (hashlib.md5(digests).hexdigest(),
+                                          len(numbers))
+            self.server.put(bucket, key, body, multipart_etag)
+            return 200, {}, xml('CompleteMultipartUploadResult',
+                                tag('Bucket', bucket), tag('Key', key),
+                                tag('ETag', multipart_etag))
+        elif method == 'GET':
+            elements = [tag('Bucket', bucket), tag('Key', key),
+                        tag('UploadId', upload_id),
+                        tag('IsTruncated', 'false')]
+            for number, part in sorted(parts.items()):
+                elements.append('<Part>%s%s%s</Part>' % (
+                    tag('PartNumber', number), tag('ETag', etag(part)),
+                    tag('Size', len(part))))
+            return 200, {}, xml('ListPartsResult', *elements)
+        elif method == 'DELETE':
+            self.server.uploads.pop(upload_id)
+            return 204, {}, b''
+        return self._s3_error(405, 'MethodNotAllowed')
+
+    def _copy_source(self, source, byte_range=None):
+        bucket, key = unquote(source).lstrip('/').split('/', 1)
+        body = self.server.objects.get((bucket, key))
+        if body is not None and byte_range:
+            start, end = byte_range.split('=')[1].split('-')
+            body = body[int(start):int(end) + 1]
+        return body
+
+    def _list_objects(self, bucket, query):
+        def param(name, default=None):
+            return query.get(name, [default])[0]
+
+        v2 = param('list-type') == '2'
+        prefix = param('prefix', '')
+        max_keys = int(param('max-keys', 1000))
+        start = param('continuation-token' if v2 else 'marker', '')
+        if v2:
+            start = max(start, param('start-after', ''))
+        keys = sorted(key for b, key in self.server.objects
+                      if b == bucket and key.startswith(prefix) and
+                      key > start)
+        truncated = len(keys) > max_keys
+        keys = keys[:max_keys]
+        elements = [tag('Name', bucket), tag('Prefix', prefix),
+                    tag('MaxKeys', max_keys),
+                    tag('IsTruncated', 'true' if truncated else 'false')]
+        if v2:
+            elements.append(tag('KeyCount', len(keys)))
+            if truncated:
+                elements.append(tag('NextContinuationToken', keys[-1]))
+        elif truncated:
+            elements.append(tag('NextMarker', keys[-1]))
+        for key in keys:
+            body = self.server.objects[(bucket, key)]
+            elements.append('<Contents>%s%s%s%s</Contents>' % (
+                tag('Key', key), tag('ETag', self.server.etags[(bucket, key)]),
+                tag('Size', len(body)),
+                tag('LastModified', self.server.modified[(bucket, key)])))
+        return 200, {}, xml('ListBucketResult', *elements)
+
+    def _s3_error(self, status, code):
+        # S3 errors are not namespaced
+        return status, {}, xml('Error', tag('Code', code),
+                               tag('Message', code), ns=None)
+
+    def _dynamodb(self, operation, body):
+        data = json.loads(body.decode('utf-8'))
+        items = self.server.items
+        table = data.get('TableName')
+        if operation == 'PutItem':
+            item = data['Item']
+            items[(table, self._item_key(item))] = item
+            result = {}
+        elif operation == 'GetItem':
+            item = items.get((table, self._item_key(data['Key'])))
+            result = {'Item': item} if item else {}
+        else:
+            return self._dynamodb_error('UnknownOperationException')
+        return 200, self._dynamodb_headers(), json.dumps(result).encode()
+
+    def _dynamodb_error(self, code):
+        body = json.dumps({'__type': 'com.amazonaws.dynamodb.v20120810#%s'
+                           % code, 'message': code}).encode('utf-8')
+        return 400, self._dynamodb_headers(), body
+
+    def _dynamodb_headers(self):
+        return {'Content-Type': 'application/x-amz-json-1.0'}
+
+    def _item_key(self, key):
+        return json.dumps(key, sort_keys=True)
+
+    def _sqs(self, body):
+        params = parse_qs(body.decode('utf-8'))
+
+        def param(name, default=None):
+            return params.get(name, [default])[0]
+
+        action = param('Action')
+        messages = self.server.queues[param('QueueUrl')]
+        if action == 'SendMessage':
+            message = param('MessageBody', '')
+            messages.append(message)
+            result = (tag('MD5OfMessageBody', md5_hex(message)) +
+                      tag('MessageId', uuid.uuid4()))
+        elif action == 'ReceiveMessage':
+            result = []
+            for _ in range(int(param('MaxNumberOfMessages', 1))):
+                if not messages:
+                    break
+                message = messages.popleft()
+                result.append('<Message>%s%s%s%s</Message>' % (
+                    tag('MessageId', uuid.uuid4()),
+                    tag('ReceiptHandle', uuid.uuid4()),
+                    tag('MD5OfBody', md5_hex(message)),
+                    tag('Body', message)))
+            result = ''.join(result)
+        else:
+            return 400, {}, xml('ErrorResponse', '<Error>%s</Error>' % tag(
+                'Code', 'InvalidAction'), ns=SQS_NS)
+        return 200, {}, xml(
+            '%sResponse' % action,
+            '<{0}Result>{1}</{0}Result>'.format(action, result),
+            '<ResponseMetadata>%s</ResponseMetadata>' % tag(
+                'RequestId', uuid.uuid4()),
+            ns=SQS_NS)
+
+
+class FakeAwsServer(ThreadingMixIn, HTTPServer):
+    """Threaded server answering S3 and DynamoDB requests, see module
+    documentation
+    """
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, latency=0, bandwidth=None, throttle=0, seed=7,
+                 chunk_size=None, address=('127.0.0.1', 0)):
+        super().__init__(address, FakeAwsHandler)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.throttle = throttle
+        self.chunk_size = chunk_size
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'throttled': 0, 'connections': 0}
+        self.objects = {}
+        self.etags = {}
+        self.modified = {}
+        self.uploads = {}
+        self.upload_ids = 0
+        self.items = {}
+        self.queues = defaultdict(deque)
+        self._thread = None
+
+    @property
+    def url(self):
+        return 'http://%s:%d' % self.server_address[:2]
+
+    def process_request(self, request, client_address):
+        with self.lock:
+            self.stats['connections'] += 1
+        super().process_request(request, client_address)
+
+    def delay(self, size):
+        delay = self.latency/2
+        if self.bandwidth:
+            delay += size/self.bandwidth
+        if delay:
+            time.sleep(delay)
+
+    def put(self, bucket, key, body, object_etag=None):
+        self.objects[(bucket, key)] = body
+        self.etags[(bucket, key)] = object_etag or etag(body)
+        self.modified[(bucket, key)] = time.strftime('%Y-%m-%dT%H:%M:%S.000Z',
+                                                     time.gmtime())
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--bandwidth', type=float, default=None)
+    parser.add_argument('--throttle', type=float, default=0)
+    parser.add_argument('--chunk-size', type=int, default=None)
+    args = parser.parse_args()
+    server = FakeAwsServer(latency=args.latency, bandwidth=args.bandwidth,
+                           throttle=args.throttle, chunk_size=args.chunk_size)
+    print(server.url, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
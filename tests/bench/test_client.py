@@ -0,0 +1,22 @@
+import unittest
+
+from cloud.aws import AsyncioBotocore
+
+
+class BenchmarkClient(unittest.TestCase):
+    """Create 100 clients
+    """
+    __benchmark__ = True
+    __number__ = 1
+
+    def _create_clients(self, service_name):
+        for _ in range(100):
+            AsyncioBotocore(service_name, region_name='us-east-1',
+                            aws_access_key_id='access',
+                            aws_secret_access_key='secret')
+
+    def test_dynamodb_clients(self):
+        self._create_clients('dynamodb')
+
+    def test_s3_clients(self):
+        self._create_clients('s3')
@@ -0,0 +1,184 @@
+import os
+import gc
+import sys
+import json
+import time
+import subprocess
+import tracemalloc
+import unittest
+from collections import defaultdict
+
+from cloud.aws import AsyncioBotocore
+from cloud.asyncbotocore.config import AsyncConfig
+from cloud.asyncbotocore.instrumentation import Instrumentation
+from cloud.utils.http import create_http_client
+
+from tests.bench import server
+
+
+KEY = {'testKey': {'S': 'bench1'}}
+# CPU-bound phases of a call, the rest of the CPU time is spent in the
+# http client and the event loop
+CPU_PHASES = ('serialize', 'hash', 'sign', 'parse')
+# Machine readable results are written to this file
+RESULTS = os.environ.get('BENCH_CPU_RESULTS', 'bench-cpu.json')
+
+
+class PhaseSink:
+    """Total duration of each phase of instrumented calls
+    """
+    def __init__(self):
+        self.durations = defaultdict(float)
+
+    def __call__(self, timings):
+        for phase, duration in timings.durations().items():
+            self.durations[phase] += duration
+
+
+class EmitTimer:
+    """Time spent emitting events, including the time of their handlers
+    """
+    def __init__(self, emitter):
+        self.emitter = emitter
+        self.total = 0
+
+    def __enter__(self):
+        emit = self.emitter.emit
+
+        def timed_emit(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return emit(*args, **kwargs)
+            finally:
+                self.total += time.perf_counter() - start
+
+        self.emitter.emit = timed_emit
+        return self
+
+    def __exit__(self, *args):
+        del self.emitter.emit
+
+
+class BenchmarkCpu(unittest.TestCase):
+    """Client CPU time and memory per call, from ``_make_api_call`` to the
+    response parser, for DynamoDB, S3 and SQS operations.
+
+    Canned responses are served by :mod:`tests.bench.server` in a separate
+    process so that the CPU time of the benchmark process is the cost of
+    the client stack. Event emission overlaps with the serialize and sign
+    phases, since handlers run during those phases.
+    """
+    __benchmark__ = True
+    __number__ = 1
+    calls = 500
+    benchmark_template = (
+        '{0[name]}: {0[cpu_us]:.0f}us CPU per call ({0[split]}), '
+        'events {0[events_us]:.0f}us, peak {0[peak_kb]:.1f}KB, '
+        'retained {0[retained_blocks]:.1f} blocks per call')
+
+    @classmethod
+    async def setUpClass(cls):
+        cls.server = subprocess.Popen(
+            [sys.executable, server.__file__], stdout=subprocess.PIPE)
+        url = cls.server.stdout.readline().decode('utf-8').strip()
+        cls.phases = PhaseSink()
+        cls.results = {}
+        config = AsyncConfig(s3=dict(addressing_style='path'), metrics=False,
+                             instrumentation=Instrumentation(cls.phases))
+        cls.http_session = create_http_client(config)
+        kwargs = dict(region_name='us-east-1', endpoint_url=url,
+                      http_session=cls.http_session, config=config,
+                      aws_access_key_id='access',
+                      aws_secret_access_key='secret')
+        cls.dynamodb = AsyncioBotocore('dynamodb', **kwargs)
+        cls.s3 = AsyncioBotocore('s3', **kwargs)
+        cls.sqs = AsyncioBotocore('sqs', **kwargs)
+        cls.queue_url = url + '/queue/bench'
+        cls.body = os.urandom(2**10)
+        await cls.dynamodb.put_item(TableName='bench',
+                                    Item=dict(KEY, foo={'S': 'bench'}))
+        await cls.s3.put_object(Bucket='bench', Key='get', Body=cls.body)
+
+    @classmethod
+    async def tearDownClass(cls):
+        await cls.http_session.close()
+        cls.server.terminate()
+        cls.server.wait()
+        cls.server.stdout.close()
+        with open(RESULTS, 'w') as fp:
+            json.dump(cls.results, fp, indent=2)
+
+    def getSummary(self, info, repeat, total_time, total_time2):
+        info.update(self.results[info['name']])
+        return info
+
+    async def _measure(self, client, call, **params):
+        endpoint = client.endpoint
+        instrumentation = endpoint.instrumentation
+        for _ in range(20):
+            await call(**params)
+        # CPU time without instrumentation
+        endpoint.instrumentation = None
+        gc.collect()
+        blocks = sys.getallocatedblocks()
+        start = time.process_time()
+        for _ in range(self.calls):
+            await call(**params)
+        cpu = (time.process_time() - start)/self.calls
+        gc.collect()
+        retained = (sys.getallocatedblocks() - blocks)/self.calls
+        # phases and event emission
+        endpoint.instrumentation = instrumentation
+        self.phases.durations.clear()
+        with EmitTimer(client.meta.events) as events:
+            for _ in range(self.calls):
+                await call(**params)
+        # memory allocated by a call
+        endpoint.instrumentation = None
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        for _ in range(20):
+            await call(**params)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        tracemalloc.stop()
+        endpoint.instrumentation = instrumentation
+        phases = dict(((phase, 1e6*self.phases.durations[phase]/self.calls)
+                       for phase in CPU_PHASES))
+        phases['other'] = max(1e6*cpu - sum(phases.values()), 0)
+        self.results['%s.%s' % (type(self).__name__, self._testMethodName)] = (
+            dict(cpu_us=1e6*cpu, phases_us=phases,
+                 events_us=1e6*events.total/self.calls,
+                 peak_kb=peak/1024, retained_blocks=retained,
+                 split=', '.join('%s %.0fus' % item
+                                 for item in phases.items())))
+
+    async def test_dynamodb_get_item(self):
+        await self._measure(self.dynamodb, self.dynamodb.get_item,
+                            TableName='bench', Key=KEY)
+
+    async def test_dynamodb_put_item(self):
+        await self._measure(self.dynamodb, self.dynamodb.put_item,
+                            TableName='bench',
+                            Item=dict(KEY, foo={'S': 'bench'}))
+
+    async def test_s3_get_object(self):
+        async def get_object(**params):
+            response = await self.s3.get_object(**params)
+            return await response['Body'].read()
+
+        await self._measure(self.s3, get_object, Bucket='bench', Key='get')
+
+    async def test_s3_put_object(self):
+        await self._measure(self.s3, self.s3.put_object, Bucket='bench',
+                            Key='put', Body=self.body)
+
+    async def test_sqs_send_message(self):
+        await self._measure(self.sqs, self.sqs.send_message,
+                            QueueUrl=self.queue_url, MessageBody='bench')
+
+    async def test_sqs_receive_message(self):
+        for _ in range(3*self.calls + 100):
+            await self.sqs.send_message(QueueUrl=self.queue_url,
+                                        MessageBody='bench')
+        await self._measure(self.sqs, self.sqs.receive_message,
+                            QueueUrl=self.queue_url)
@@ -0,0 +1,93 @@
+import os
+import unittest
+
+import greenlet
+from pulsar.apps.greenio import GreenPool, wait
+
+from cloud.aws import GreenBotocore, GreenIterator
+from cloud.utils.http import create_http_client
+
+from tests.bench.server import FakeAwsServer
+
+
+BUCKET = 'bench'
+MB = 2**20
+# Bandwidth in bytes per second and size of the segments of response
+# bodies written by the fake server
+BANDWIDTH = float(os.environ.get('BENCH_BANDWIDTH', 200*MB))
+CHUNK_SIZE = int(os.environ.get('BENCH_CHUNK_SIZE', 2**14))
+
+
+class SwitchCounter:
+    """Count greenlet switches while active
+    """
+    def __init__(self):
+        self.switches = 0
+
+    def __call__(self, event, args):
+        if event in ('switch', 'throw'):
+            self.switches += 1
+
+    def __enter__(self):
+        self.previous = greenlet.settrace(self)
+        return self
+
+    def __exit__(self, *args):
+        greenlet.settrace(self.previous)
+
+
+class BenchmarkGreen(unittest.TestCase):
+    """Greenlet switches per MB of objects downloaded with
+    :class:`.GreenBotocore` from a local :class:`.FakeAwsServer` writing
+    bodies in ``BENCH_CHUNK_SIZE`` segments at ``BENCH_BANDWIDTH``
+    """
+    __benchmark__ = True
+    __number__ = 1
+    object_size = 16*MB
+    benchmark_template = ('{0[name]}: {0[switches_per_mb]:.1f} greenlet '
+                          'switches per MB')
+
+    @classmethod
+    async def setUpClass(cls):
+        cls.server = FakeAwsServer(bandwidth=BANDWIDTH,
+                                   chunk_size=CHUNK_SIZE).start()
+        cls.green_pool = GreenPool()
+        cls.http_session = create_http_client()
+        cls.s3 = GreenBotocore('s3', region_name='us-east-1',
+                               endpoint_url=cls.server.url,
+                               http_session=cls.http_session,
+                               aws_access_key_id='access',
+                               aws_secret_access_key='secret')
+        cls.switches = {}
+        await cls.s3.client.put_object(Bucket=BUCKET, Key='green',
+                                       Body=os.urandom(cls.object_size))
+
+    @classmethod
+    async def tearDownClass(cls):
+        await cls.http_session.close()
+        cls.server.stop()
+
+    def getSummary(self, info, repeat, total_time, total_time2):
+        info['switches_per_mb'] = self.switches[info['name']]
+        return info
+
+    def _download(self, streamed):
+        with SwitchCounter() as counter:
+            size = sum(len(data) for data in streamed())
+        self.assertEqual(size, self.object_size)
+        name = '%s.%s' % (type(self).__name__, self._testMethodName)
+        self.switches[name] = counter.switches*MB/size
+
+    def test_chunks(self):
+        def streamed():
+            response = wait(self.s3.client.get_object(Bucket=BUCKET,
+                                                      Key='green'))
+            return GreenIterator(response['Body'])
+
+        return self.green_pool.submit(self._download, streamed)
+
+    def test_batches(self):
+        def streamed():
+            return self.s3.get_object(Bucket=BUCKET, Key='green')['Body']
+
+        return self.green_pool.submit(self._download, streamed)
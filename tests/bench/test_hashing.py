@@ -0,0 +1,40 @@
+import io
+import os
+import asyncio
+import unittest
+
+from cloud.asyncbotocore.hashing import (
+    payload_hashes, hash_request, md5_base64, sha256_hex
+)
+from cloud.utils.s3 import MULTI_PART_SIZE
+
+
+class BenchmarkHashing(unittest.TestCase):
+    """Hash 16 multipart bodies in flight at once
+    """
+    __benchmark__ = True
+    __number__ = 5
+    parts = 16
+
+    @classmethod
+    def setUpClass(cls):
+        cls.body = os.urandom(MULTI_PART_SIZE)
+
+    async def test_threaded_pipeline(self):
+        await asyncio.gather(*[payload_hashes(self.body)
+                               for _ in range(self.parts)])
+
+    async def test_request_pipeline(self):
+        # botocore hands BytesIO bodies to the pipeline
+        requests = [dict(body=io.BytesIO(self.body), headers={},
+                         url='http://s3.amazonaws.com')
+                    for _ in range(self.parts)]
+        await asyncio.gather(*[hash_request('UploadPart', request, {})
+                               for request in requests])
+
+    async def test_event_loop_thread(self):
+        async def inline(body):
+            return md5_base64(body), sha256_hex(body)
+
+        await asyncio.gather(*[inline(self.body)
+                               for _ in range(self.parts)])
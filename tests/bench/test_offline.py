@@ -0,0 +1,122 @@
+import os
+import json
+import asyncio
+import tempfile
+import unittest
+
+from cloud.aws import AsyncioBotocore
+from cloud.asyncbotocore.config import AsyncConfig
+from cloud.asyncbotocore.metrics import MetricsRegistry
+from cloud.utils.http import create_http_client
+from cloud.utils.s3 import MULTI_PART_SIZE
+
+from tests import RandomFile
+from tests.bench.server import FakeAwsServer
+
+
+BUCKET = 'bench'
+KEY = {'testKey': {'S': 'bench1'}}
+# Injected latency in seconds, bandwidth in bytes per second and fraction
+# of throttled requests of the fake server
+LATENCY = float(os.environ.get('BENCH_LATENCY', 0))
+BANDWIDTH = float(os.environ.get('BENCH_BANDWIDTH', 0)) or None
+THROTTLE = float(os.environ.get('BENCH_THROTTLE', 0))
+# Machine readable results are written to this file
+RESULTS = os.environ.get('BENCH_RESULTS', 'bench-offline.json')
+
+
+class BenchmarkOffline(unittest.TestCase):
+    """S3 and DynamoDB operations against a local :class:`.FakeAwsServer`
+
+    Latency percentiles of each operation, benchmark timings and server
+    statistics are written as JSON to the ``BENCH_RESULTS`` file
+    """
+    __benchmark__ = True
+    __number__ = 1
+    concurrency = 50
+    object_size = 2**16
+
+    @classmethod
+    async def setUpClass(cls):
+        cls.server = FakeAwsServer(latency=LATENCY, bandwidth=BANDWIDTH,
+                                   throttle=THROTTLE).start()
+        cls.metrics = MetricsRegistry()
+        cls.results = {}
+        config = AsyncConfig(s3=dict(addressing_style='path'),
+                             metrics=cls.metrics)
+        cls.http_session = create_http_client(config, pool_size=100)
+        kwargs = dict(region_name='us-east-1', endpoint_url=cls.server.url,
+                      http_session=cls.http_session, config=config,
+                      aws_access_key_id='access',
+                      aws_secret_access_key='secret')
+        cls.s3 = AsyncioBotocore('s3', **kwargs)
+        cls.dynamodb = AsyncioBotocore('dynamodb', **kwargs)
+        cls.body = os.urandom(cls.object_size)
+        cls.multipart = RandomFile(2*MULTI_PART_SIZE + 1).__enter__()
+        await cls.s3.put_object(Bucket=BUCKET, Key='get', Body=cls.body)
+        await cls.s3.put_object(Bucket=BUCKET, Key='copy',
+                                Body=cls.multipart.body())
+        await asyncio.gather(*[
+            cls.s3.put_object(Bucket=BUCKET, Key='list/%04d' % i, Body=b'')
+            for i in range(1000)])
+        await cls.dynamodb.put_item(TableName='bench',
+                                    Item=dict(KEY, foo={'S': 'bench'}))
+        cls.metrics.clear()
+
+    @classmethod
+    async def tearDownClass(cls):
+        cls.multipart.__exit__()
+        await cls.http_session.close()
+        cls.server.stop()
+        with open(RESULTS, 'w') as fp:
+            json.dump(dict(
+                server=dict(latency=LATENCY, bandwidth=BANDWIDTH,
+                            throttle=THROTTLE, **cls.server.stats),
+                benchmarks=cls.results,
+                operations=cls.metrics.snapshot()), fp, indent=2)
+
+    def getSummary(self, info, repeat, total_time, total_time2):
+        self.results[info['name']] = dict(info)
+        return info
+
+    def gather(self, coroutines):
+        return asyncio.gather(*coroutines)
+
+    async def test_put_object(self):
+        await self.gather(
+            self.s3.put_object(Bucket=BUCKET, Key='put/%d' % i,
+                               Body=self.body)
+            for i in range(self.concurrency))
+
+    async def test_get_object(self):
+        async def get_object():
+            response = await self.s3.get_object(Bucket=BUCKET, Key='get')
+            return await response['Body'].read()
+
+        await self.gather(get_object() for _ in range(self.concurrency))
+
+    async def test_multipart_upload(self):
+        await self.s3.upload_file(BUCKET, self.multipart.filename,
+                                  uploadpath='multipart')
+
+    async def test_copy(self):
+        await self.s3.copy_storage_object(BUCKET, 'copy', BUCKET, 'copied')
+
+    async def test_upload_folder(self):
+        with tempfile.TemporaryDirectory() as folder:
+            for i in range(self.concurrency):
+                with open(os.path.join(folder, 'file%d' % i), 'wb') as fp:
+                    fp.write(self.body)
+            await self.s3.upload_folder(BUCKET, folder, key='folder')
+
+    async def test_paginator(self):
+        paginator = self.s3.get_paginator('list_objects_v2')
+        pages = paginator.paginate(Bucket=BUCKET, Prefix='list/',
+                                   MaxKeys=100)
+        async for _ in pages:
+            pass
+
+    async def test_get_item(self):
+        await self.gather(
+            self.dynamodb.get_item(TableName='bench', Key=KEY)
+            for _ in range(self.concurrency))
@@ -0,0 +1,46 @@
+import os
+import unittest
+
+from botocore.awsrequest import create_request_object
+from botocore.credentials import Credentials
+
+from cloud.asyncbotocore.config import AsyncConfig
+from cloud.asyncbotocore.hashing import hash_request
+from cloud.asyncbotocore.signers import AsyncS3SigV4Auth
+from cloud.utils.s3 import MULTI_PART_SIZE
+
+
+ONEGB = 2**30
+
+
+class BenchmarkPayloadSigning(unittest.TestCase):
+    """Hash and sign 1GB of upload_part bodies
+    """
+    __benchmark__ = True
+    __number__ = 1
+
+    @classmethod
+    def setUpClass(cls):
+        cls.body = os.urandom(MULTI_PART_SIZE)
+        cls.auth = AsyncS3SigV4Auth(Credentials('access', 'secret'),
+                                    's3', 'us-east-1')
+
+    async def _upload(self, url, **s3):
+        context = dict(client_config=AsyncConfig(s3=s3),
+                       has_streaming_input=True)
+        for _ in range(ONEGB // MULTI_PART_SIZE):
+            request_dict = dict(method='PUT', url=url, body=self.body,
+                                headers={}, context=context.copy())
+            await hash_request('UploadPart', request_dict,
+                               request_dict['context'])
+            self.auth.add_auth(create_request_object(request_dict))
+
+    async def test_signed_payload(self):
+        await self._upload('http://s3.amazonaws.com/bucket/key')
+
+    async def test_content_md5(self):
+        await self._upload('https://s3.amazonaws.com/bucket/key')
+
+    async def test_unsigned_payload(self):
+        await self._upload('https://s3.amazonaws.com/bucket/key',
+                           unsigned_payload=True, content_md5=False)
@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+
+from cloud.aws import AsyncioBotocore
+from cloud.asyncbotocore.config import AsyncConfig
+from cloud.utils.http import create_http_client
+
+from tests.test_dynamodb import DynamoMixin
+
+
+class BenchmarkPoolSize(DynamoMixin, unittest.TestCase):
+    """Throughput of 100 concurrent get_item calls for different sizes
+    of the connection pool, and of 10 clients with shared or separate
+    connection pools
+    """
+    __benchmark__ = True
+    __number__ = 1
+
+    @classmethod
+    async def setUpClass(cls):
+        await super().setUpClass()
+        await cls.put_item('bench1', foo={'S': 'dbsajcdsacs'})
+        cls.kwargs = dict(
+            TableName=cls.table_name,
+            Key={
+                'testKey': {
+                    'S': 'bench1'
+                }
+            },
+        )
+
+    async def _get_items(self, limit):
+        config = AsyncConfig(connector_args=dict(limit=limit))
+        http_session = create_http_client(config)
+        client = AsyncioBotocore('dynamodb', region_name='us-east-1',
+                                 http_session=http_session)
+        try:
+            await asyncio.gather(*[client.get_item(**self.kwargs)
+                                   for _ in range(100)])
+        finally:
+            await http_session.close()
+
+    async def _many_clients(self, shared):
+        clients = []
+        for _ in range(10):
+            kwargs = dict(region_name='us-east-1')
+            if not shared:
+                kwargs['http_session'] = create_http_client()
+            clients.append(AsyncioBotocore('dynamodb', **kwargs))
+        try:
+            for _ in range(5):
+                await asyncio.gather(*[client.get_item(**self.kwargs)
+                                       for client in clients])
+        finally:
+            if not shared:
+                await asyncio.gather(*[client.http_session.close()
+                                       for client in clients])
+
+    def test_pool_1(self):
+        return self._get_items(1)
+
+    def test_pool_10(self):
+        return self._get_items(10)
+
+    def test_pool_50(self):
+        return self._get_items(50)
+
+    def test_shared_pool(self):
+        return self._many_clients(True)
+
+    def test_separate_pools(self):
+        return self._many_clients(False)
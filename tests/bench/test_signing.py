@@ -0,0 +1,33 @@
+import unittest
+
+from botocore.auth import SigV4Auth
+from botocore.credentials import Credentials
+
+from cloud.asyncbotocore.signers import AsyncSigV4Auth
+
+from tests.test_signing import dynamodb_request
+
+
+class BenchmarkSigning(unittest.TestCase):
+    """Sign 1000 DynamoDB requests
+    """
+    __benchmark__ = True
+    __number__ = 10
+    requests = 1000
+
+    @classmethod
+    def setUpClass(cls):
+        cls.credentials = Credentials('access', 'secret')
+
+    def _sign(self, auth):
+        for _ in range(self.requests):
+            request = dynamodb_request()
+            cr = auth.canonical_request(request)
+            sts = auth.string_to_sign(request, cr)
+            auth.signature(sts, request)
+
+    def test_botocore_signer(self):
+        self._sign(SigV4Auth(self.credentials, 'dynamodb', 'us-east-1'))
+
+    def test_cached_signer(self):
+        self._sign(AsyncSigV4Auth(self.credentials, 'dynamodb', 'us-east-1'))
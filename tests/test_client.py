@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+
+from cloud.asyncbotocore import get_session
+from cloud.asyncbotocore.client import ClientClosedError
+
+from tests import FakeHttpSession, fake_client
+
+
+KEY = {'testKey': {'S': 'test'}}
+
+
+class ClosingHttpSession(FakeHttpSession):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.closed = 0
+
+    async def close(self):
+        self.closed += 1
+
+
+async def slow(**kwargs):
+    await asyncio.sleep(0.05)
+    return await FakeHttpSession().request()
+
+
+async def hang(**kwargs):
+    await asyncio.sleep(10)
+
+
+def create_client(http_session):
+    return get_session().create_client(
+        'dynamodb', region_name='us-east-1', http_session=http_session,
+        aws_access_key_id='access', aws_secret_access_key='secret')
+
+
+class ClientLifecycleTest(unittest.TestCase):
+
+    async def test_shared_session(self):
+        http_session = ClosingHttpSession()
+        client1 = create_client(http_session)
+        client2 = create_client(http_session)
+        await client1.close()
+        self.assertEqual(http_session.closed, 0)
+        await client1.close()
+        self.assertEqual(http_session.closed, 0)
+        with self.assertRaises(ClientClosedError):
+            await client1.get_item(TableName='table', Key=KEY)
+        await client2.get_item(TableName='table', Key=KEY)
+        await client2.close()
+        self.assertEqual(http_session.closed, 1)
+
+    async def test_context_manager(self):
+        http_session = ClosingHttpSession()
+        async with create_client(http_session) as client:
+            await client.get_item(TableName='table', Key=KEY)
+        self.assertEqual(http_session.closed, 1)
+
+    async def test_drain(self):
+        client = fake_client('dynamodb', slow)
+        calls = [asyncio.ensure_future(client.get_item(TableName='table',
+                                                       Key=KEY))
+                 for _ in range(3)]
+        await asyncio.sleep(0)
+        self.assertEqual(client.in_flight, 3)
+        self.assertEqual(await client.drain(), 0)
+        self.assertTrue(all(call.done() for call in calls))
+        self.assertEqual(len([call.result() for call in calls]), 3)
+        with self.assertRaises(ClientClosedError):
+            await client.get_item(TableName='table', Key=KEY)
+
+    async def test_drain_timeout(self):
+        client = fake_client('dynamodb', hang)
+        call = asyncio.ensure_future(client.get_item(TableName='table',
+                                                     Key=KEY))
+        await asyncio.sleep(0)
+        self.assertEqual(await client.drain(0.01), 1)
+        self.assertFalse(call.done())
+        call.cancel()
+        await asyncio.wait([call])
+        self.assertEqual(client.in_flight, 0)
@@ -0,0 +1,159 @@
+import json
+import asyncio
+import datetime
+import threading
+import unittest
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from botocore.credentials import CredentialResolver, InstanceMetadataProvider
+from botocore.utils import InstanceMetadataFetcher
+
+from cloud.asyncbotocore import get_session
+from cloud.asyncbotocore.credentials import CredentialCache, RETRY_INTERVAL
+
+from tests import FakeHttpSession
+
+
+ROLE = 'test-role'
+PATH = '/latest/meta-data/iam/security-credentials/'
+
+
+class MetadataHandler(BaseHTTPRequestHandler):
+    """A stand-in for the instance metadata endpoint.
+
+    The first credentials expire in ``server.expires_in`` seconds,
+    refreshed credentials in one hour
+    """
+    def do_GET(self):
+        server = self.server
+        if self.path == PATH:
+            body = ROLE
+        elif self.path == PATH + ROLE:
+            server.served += 1
+            expires_in = server.expires_in if server.served == 1 else 3600
+            expiration = (datetime.datetime.utcnow() +
+                          datetime.timedelta(seconds=expires_in))
+            body = json.dumps({
+                'AccessKeyId': 'KEY%d' % server.served,
+                'SecretAccessKey': 'secret',
+                'Token': 'token',
+                'Expiration': expiration.strftime('%Y-%m-%dT%H:%M:%SZ')
+            })
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+
+class FailingCredentials:
+    """Refreshable credentials within the advisory refresh window which
+    cannot be refreshed
+    """
+    _advisory_refresh_timeout = 15*60
+    _mandatory_refresh_timeout = 10*60
+
+    def __init__(self):
+        self.calls = 0
+
+    def refresh_needed(self, refresh_in=None):
+        return True
+
+    def _seconds_remaining(self):
+        return 12*60
+
+    def get_frozen_credentials(self):
+        self.calls += 1
+        raise ConnectionError('metadata endpoint down')
+
+
+class CredentialsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), MetadataHandler)
+        self.server.served = 0
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def session(self, expires_in):
+        self.server.expires_in = expires_in
+        fetcher = InstanceMetadataFetcher(
+            url='http://127.0.0.1:%d%s' % (self.server.server_port, PATH))
+        session = get_session()
+        session.register_component('credential_provider', CredentialResolver(
+            [InstanceMetadataProvider(iam_role_fetcher=fetcher)]))
+        return session
+
+    def client(self, session):
+        return session.create_client('dynamodb', region_name='us-east-1',
+                                     http_session=FakeHttpSession())
+
+    def access_key(self, client):
+        authorization = client.http_session.requests[-1]['headers'][
+            'Authorization']
+        return authorization.split('Credential=')[1].split('/')[0]
+
+    async def test_background_refresh(self):
+        # credentials enter the advisory refresh window in two seconds
+        session = self.session(15*60 + 2)
+        credentials = await session.load_credentials()
+        client1 = self.client(session)
+        client2 = self.client(session)
+        self.assertTrue(client2._request_signer._credentials is credentials)
+        try:
+            await client1.list_tables()
+            self.assertEqual(self.access_key(client1), 'KEY1')
+            await asyncio.sleep(3)
+            self.assertEqual(credentials.stats['refreshes'], 1)
+            self.assertEqual(credentials.stats['blocking'], 0)
+            await client2.list_tables()
+            self.assertEqual(self.access_key(client2), 'KEY2')
+        finally:
+            credentials.stop()
+
+    async def test_blocking_refresh(self):
+        # credentials within the mandatory refresh window
+        session = self.session(60)
+        credentials = await session.load_credentials()
+        client = self.client(session)
+        try:
+            await client.list_tables()
+            self.assertEqual(self.access_key(client), 'KEY2')
+            self.assertEqual(credentials.stats['blocking'], 1)
+        finally:
+            credentials.stop()
+
+    async def test_clients_closed(self):
+        session = self.session(3600)
+        credentials = await session.load_credentials()
+        client1 = self.client(session)
+        client2 = self.client(session)
+        try:
+            self.assertTrue(credentials._timer)
+            await client1.close()
+            self.assertTrue(credentials._timer)
+            await client2.drain()
+            self.assertEqual(credentials._timer, None)
+        finally:
+            credentials.stop()
+
+    async def test_refresh_failure(self):
+        loop = asyncio.get_event_loop()
+        credentials = CredentialCache(FailingCredentials(), loop)
+        credentials.start()
+        try:
+            await asyncio.sleep(0.2)
+            self.assertEqual(credentials.stats['failures'], 1)
+            self.assertEqual(credentials.credentials.calls, 1)
+            self.assertGreater(credentials._timer._when - loop.time(),
+                               RETRY_INTERVAL - 1)
+        finally:
+            credentials.stop()
@@ -88,3 +88,11 @@ class DynamoTest(DynamoMixin, unittest.TestCase):
         )
         self.assert_status(response)
         self.assertEqual(response['Item']['testKey'], {'S': test_key})
+
+    async def test_warmup(self):
+        endpoint = self.client.endpoint
+        elapsed = await self.client.warmup(3)
+        self.assertTrue(elapsed >= 0)
+        pool = self.client.http_session.get_pool(endpoint.host,
+                                                 endpoint.verify)
+        self.assertTrue(pool.available >= 3)
@@ -0,0 +1,58 @@
+import json
+import asyncio
+import unittest
+
+from botocore.exceptions import ClientError
+
+from cloud.asyncbotocore.config import AsyncConfig
+from cloud.asyncbotocore.endpoint import (
+    RequestTimeoutError, DeadlineExceededError
+)
+
+from tests import FakeResponse, fake_client
+
+
+KEY = {'testKey': {'S': 'test'}}
+
+
+async def hang(**kwargs):
+    await asyncio.sleep(10)
+
+
+async def throttle(**kwargs):
+    body = {'__type': 'ProvisionedThroughputExceededException'}
+    return FakeResponse(400, body=json.dumps(body).encode('utf-8'))
+
+
+class EndpointTest(unittest.TestCase):
+
+    async def test_attempt_timeout(self):
+        config = AsyncConfig(connect_timeout=0.01, read_timeout=0.01,
+                             retry_args=dict(min_retries=1))
+        client = fake_client('dynamodb', hang, config=config)
+        with self.assertRaises(RequestTimeoutError):
+            await client.get_item(TableName='table', Key=KEY)
+        self.assertEqual(len(client.http_session.requests), 2)
+        self.assertEqual(client._endpoint.retry_stats['retries'], 1)
+        self.assertEqual(client._endpoint.retry_stats['denied'], 1)
+
+    async def test_call_deadline(self):
+        client = fake_client('dynamodb', hang)
+        loop = client._loop
+        start = loop.time()
+        with self.assertRaises(DeadlineExceededError):
+            await client.get_item(TableName='table', Key=KEY, deadline=0.05)
+        self.assertTrue(loop.time() - start < 1)
+
+    async def test_client_deadline(self):
+        client = fake_client('dynamodb', throttle,
+                             config=AsyncConfig(deadline=0.1))
+        loop = client._loop
+        start = loop.time()
+        # either the last attempt or the retry sleep exceeds the deadline
+        with self.assertRaises((ClientError, DeadlineExceededError)):
+            await client.get_item(TableName='table', Key=KEY)
+        self.assertTrue(loop.time() - start < 0.2)
+        stats = client._endpoint.retry_stats
+        self.assertTrue(stats['throttled'] >= 1)
+        self.assertTrue(len(client.http_session.requests) < 10)
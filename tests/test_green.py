@@ -0,0 +1,102 @@
+import json
+import asyncio
+import unittest
+
+from botocore.exceptions import ClientError
+from pulsar.apps.greenio import GreenPool
+
+from cloud.aws import GreenProxy, GreenBody, GreenBotocore
+
+from tests import FakeHttpSession, FakeResponse, fake_client
+
+
+class ChunkedStream:
+    """A streamed body stand-in yielding ``chunks``
+    """
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    async def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.chunks:
+            raise StopAsyncIteration
+        return self.chunks.pop(0)
+
+
+class TableHandler:
+    """Answer DynamoDB GetItem requests with the requested key, or a
+    validation error for the ``bad`` key, and record calls in flight
+    """
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, data=None, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.in_flight -= 1
+        key = json.loads(data.decode('utf-8'))['Key']
+        if key['id']['S'] == 'bad':
+            body = {'__type': 'ValidationException'}
+            return FakeResponse(400, body=json.dumps(body).encode('utf-8'))
+        return FakeResponse(body=json.dumps({'Item': key}).encode('utf-8'))
+
+
+class GreenTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.green_pool = GreenPool()
+
+    def test_cached_callables(self):
+        proxy = GreenProxy(fake_client('s3'))
+        call = proxy.get_object
+        self.assertEqual(str(call), 'get_object')
+        self.assertIs(proxy.get_object, call)
+        self.assertIsNot(proxy.put_object, call)
+        self.assertRaises(AttributeError, getattr, proxy, 'foo')
+
+    async def test_body_batches(self):
+        chunks = [b'x'*100]*25
+        body = GreenBody(ChunkedStream(chunks), chunk_size=1000)
+        batches = await self.green_pool.submit(list, body)
+        self.assertEqual([len(b) for b in batches], [1000, 1000, 500])
+        self.assertEqual(b''.join(batches), b''.join(chunks))
+
+    async def test_empty_body(self):
+        body = GreenBody(ChunkedStream([]))
+        batches = await self.green_pool.submit(list, body)
+        self.assertEqual(batches, [])
+
+    def green_client(self, handler):
+        return GreenBotocore('dynamodb', region_name='us-east-1',
+                             http_session=FakeHttpSession(handler),
+                             aws_access_key_id='access',
+                             aws_secret_access_key='secret')
+
+    async def test_map(self):
+        handler = TableHandler()
+        client = self.green_client(handler)
+        keys = ['k%d' % i for i in range(10)]
+        params = [dict(TableName='table', Key={'id': {'S': k}})
+                  for k in keys]
+        responses = await self.green_pool.submit(client.map, 'get_item',
+                                                 params, concurrency=3)
+        self.assertEqual([r['Item']['id']['S'] for r in responses], keys)
+        self.assertEqual(handler.max_in_flight, 3)
+
+    async def test_gather_errors(self):
+        client = self.green_client(TableHandler())
+        calls = [('get_item', dict(TableName='table', Key={'id': {'S': k}}))
+                 for k in ('a', 'bad', 'b')]
+        calls.append(('foo', {}))
+        responses = await self.green_pool.submit(client.gather, calls)
+        self.assertEqual(responses[0]['Item']['id']['S'], 'a')
+        self.assertIsInstance(responses[1], ClientError)
+        self.assertEqual(responses[2]['Item']['id']['S'], 'b')
+        self.assertIsInstance(responses[3], AttributeError)
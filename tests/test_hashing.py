@@ -0,0 +1,126 @@
+import io
+import os
+import base64
+import hashlib
+import tempfile
+import unittest
+from unittest import mock
+
+from pulsar.apps.test import sequential
+
+from cloud.asyncbotocore import hashing
+from cloud.asyncbotocore.config import AsyncConfig
+from cloud.asyncbotocore.hashing import (
+    payload_hashes, file_hashes, hash_request, MIN_THREADED_SIZE
+)
+
+from tests import fake_client
+
+
+@sequential
+class HashingTest(unittest.TestCase):
+
+    def _digests(self, body):
+        md5 = base64.b64encode(hashlib.md5(body).digest()).decode('ascii')
+        return md5, hashlib.sha256(body).hexdigest()
+
+    async def test_small_body(self):
+        body = os.urandom(MIN_THREADED_SIZE - 1)
+        self.assertEqual(await payload_hashes(body), self._digests(body))
+
+    async def test_large_body(self):
+        body = os.urandom(3*MIN_THREADED_SIZE)
+        self.assertEqual(await payload_hashes(body), self._digests(body))
+        md5, sha256 = await payload_hashes(body, sha256=False)
+        self.assertEqual(md5, self._digests(body)[0])
+        self.assertEqual(sha256, None)
+
+    async def test_hash_request(self):
+        body = os.urandom(2*MIN_THREADED_SIZE)
+        md5, sha256 = self._digests(body)
+        request = dict(body=body, headers={}, url='http://s3.amazonaws.com')
+        context = {}
+        await hash_request('UploadPart', request, context)
+        self.assertEqual(request['headers']['Content-MD5'], md5)
+        self.assertEqual(context['payload_sha256'], sha256)
+        # payload not signed over https
+        request = dict(body=body, headers={}, url='https://s3.amazonaws.com')
+        context = {}
+        await hash_request('PutObject', request, context)
+        self.assertEqual(request['headers']['Content-MD5'], md5)
+        self.assertFalse('payload_sha256' in context)
+
+    async def test_not_hashed(self):
+        request = dict(body=b'{}', headers={}, url='http://localhost')
+        await hash_request('GetItem', request, {})
+        self.assertFalse(request['headers'])
+
+    async def test_unsigned_payload(self):
+        body = os.urandom(2*MIN_THREADED_SIZE)
+        context = dict(client_config=AsyncConfig(
+            s3=dict(unsigned_payload=True, content_md5=False)))
+        request = dict(body=body, headers={}, url='https://s3.amazonaws.com')
+        await hash_request('UploadPart', request, context)
+        self.assertFalse(request['headers'])
+        self.assertFalse('payload_sha256' in context)
+        # always signed over http
+        request = dict(body=body, headers={}, url='http://s3.amazonaws.com')
+        await hash_request('UploadPart', request, context)
+        self.assertFalse(request['headers'])
+        self.assertEqual(context['payload_sha256'], self._digests(body)[1])
+
+    def test_file_hashes(self):
+        body = io.BytesIO(os.urandom(3*MIN_THREADED_SIZE))
+        body.seek(10)
+        self.assertEqual(file_hashes(body),
+                         self._digests(body.getvalue()[10:]))
+        self.assertEqual(body.tell(), 10)
+        md5, sha256 = file_hashes(body, sha256=False)
+        self.assertEqual(md5, self._digests(body.getvalue()[10:])[0])
+        self.assertEqual(sha256, None)
+
+    async def test_file_like_request(self):
+        body = os.urandom(2*MIN_THREADED_SIZE)
+        md5, sha256 = self._digests(body)
+        request = dict(body=io.BytesIO(body), headers={},
+                       url='http://s3.amazonaws.com')
+        context = {}
+        await hash_request('UploadPart', request, context)
+        self.assertEqual(request['headers']['Content-MD5'], md5)
+        self.assertEqual(context['payload_sha256'], sha256)
+        self.assertEqual(request['body'].tell(), 0)
+        # the buffer is released
+        request['body'].write(b'x')
+
+    async def _client_call(self, method, body, **params):
+        client = fake_client('s3', endpoint_url='http://s3.amazonaws.com')
+        with mock.patch.object(hashing, 'payload_hashes',
+                               wraps=hashing.payload_hashes) as threaded, \
+                mock.patch('botocore.handlers._calculate_md5_from_file') \
+                as inline:
+            await getattr(client, method)(Bucket='bucket', Key='key',
+                                          Body=body, **params)
+        self.assertFalse(inline.called)
+        return threaded, client._endpoint.http_session.requests[0]
+
+    async def test_put_object(self):
+        body = os.urandom(2*MIN_THREADED_SIZE)
+        threaded, request = await self._client_call('put_object', body)
+        self.assertEqual(threaded.call_count, 1)
+        md5, sha256 = self._digests(body)
+        self.assertEqual(request['headers']['Content-MD5'], md5)
+        self.assertEqual(request['headers']['X-Amz-Content-SHA256'], sha256)
+
+    async def test_upload_part_file(self):
+        body = os.urandom(2*MIN_THREADED_SIZE)
+        with tempfile.TemporaryFile() as fp:
+            fp.write(body)
+            fp.seek(0)
+            with mock.patch.object(hashing, 'file_hashes',
+                                   wraps=hashing.file_hashes) as hashes:
+                threaded, request = await self._client_call(
+                    'upload_part', fp, UploadId='1', PartNumber=1)
+        self.assertEqual(hashes.call_count, 1)
+        md5, sha256 = self._digests(body)
+        self.assertEqual(request['headers']['Content-MD5'], md5)
+        self.assertEqual(request['headers']['X-Amz-Content-SHA256'], sha256)
@@ -0,0 +1,80 @@
+import asyncio
+import unittest
+
+from botocore.exceptions import ParamValidationError
+
+from cloud.asyncbotocore.config import AsyncConfig
+from cloud.asyncbotocore.hedging import Hedger, LatencyTracker
+
+
+class Operation:
+    name = 'GetItem'
+
+
+class SlowEndpoint:
+    """Endpoint stand-in answering after the delays in ``delays``
+    """
+    def __init__(self, delays):
+        self.delays = list(delays)
+        self.cancelled = 0
+
+    async def make_request(self, operation_model, request_dict):
+        delay = self.delays.pop(0) if self.delays else 0
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return delay
+
+
+class HedgingTest(unittest.TestCase):
+
+    def hedger(self, **kw):
+        kw.setdefault('min_samples', 5)
+        return Hedger(['GetItem'], loop=asyncio.get_event_loop(), **kw)
+
+    def test_latency_tracker(self):
+        latencies = LatencyTracker(window=100)
+        self.assertEqual(latencies.percentile(99), None)
+        for i in range(1, 101):
+            latencies.add(i)
+        self.assertEqual(latencies.percentile(50), 50)
+        self.assertEqual(latencies.percentile(99), 99)
+        self.assertEqual(latencies.percentile(100), 100)
+
+    async def test_no_samples(self):
+        hedger = self.hedger()
+        endpoint = SlowEndpoint([0.01])
+        self.assertEqual(hedger.delay('GetItem'), None)
+        await hedger.make_request(endpoint, Operation, {})
+        self.assertEqual(hedger.stats['hedged'], 0)
+
+    async def test_hedge_wins(self):
+        hedger = self.hedger()
+        endpoint = SlowEndpoint([0.001]*5 + [1, 0.001])
+        for _ in range(5):
+            await hedger.make_request(endpoint, Operation, {})
+        result = await hedger.make_request(endpoint, Operation, {})
+        self.assertEqual(result, 0.001)
+        self.assertEqual(hedger.stats['hedged'], 1)
+        self.assertEqual(hedger.stats['hedge_wins'], 1)
+        await asyncio.sleep(0)
+        self.assertEqual(endpoint.cancelled, 1)
+
+    async def test_hedge_budget(self):
+        hedger = self.hedger(max_ratio=0)
+        hedger.budget.withdraw = lambda: False
+        endpoint = SlowEndpoint([0.001]*5 + [0.05])
+        for _ in range(6):
+            await hedger.make_request(endpoint, Operation, {})
+        self.assertEqual(hedger.stats['hedged'], 0)
+        self.assertEqual(hedger.stats['denied'], 1)
+
+    def test_hedge_args(self):
+        config = AsyncConfig(hedge_args=dict(operations=['GetItem']))
+        self.assertEqual(config.hedge_args['operations'], ['GetItem'])
+        self.assertRaises(ParamValidationError, AsyncConfig,
+                          hedge_args=dict(operations='GetItem'))
+        self.assertRaises(ParamValidationError, AsyncConfig,
+                          hedge_args=dict(foo=1))
@@ -0,0 +1,131 @@
+import asyncio
+import unittest
+
+from cloud.aws import AsyncioBotocore
+from cloud.asyncbotocore.config import AsyncConfig
+from cloud.utils.http import (
+    create_http_client, ConnectionLimit, PoolRegistry
+)
+
+from tests.bench.server import FakeAwsServer
+
+
+class IdleClient:
+
+    def __init__(self, limit):
+        self.limit = limit
+
+    def evict_idle(self, max_connections=None):
+        self.limit.release()
+        return 1
+
+
+class HttpClientTest(unittest.TestCase):
+
+    def test_connector_args(self):
+        config = AsyncConfig(connector_args=dict(limit=3,
+                                                 keepalive_timeout=5,
+                                                 force_close=True))
+        client = create_http_client(config)
+        self.assertEqual(client.pool_size, 3)
+        self.assertEqual(client.keep_alive, 5)
+        self.assertTrue(client.close_connections)
+        self.assertTrue(client.dns_cache is not None)
+        self.assertFalse(client.decompress)
+
+    def test_max_pool_connections(self):
+        config = AsyncConfig(max_pool_connections=20,
+                             connector_args=dict(use_dns_cache=False))
+        client = create_http_client(config)
+        self.assertEqual(client.pool_size, 20)
+        self.assertEqual(client.keep_alive, 12)
+        self.assertFalse(client.close_connections)
+        self.assertEqual(client.dns_cache, None)
+
+    def test_ssl_context(self):
+        client = create_http_client()
+        context = client._ssl_context()
+        self.assertTrue(client._ssl_context() is context)
+        self.assertTrue(client._ssl_context(pre_request=print) is context)
+        self.assertFalse(client._ssl_context(verify=False) is context)
+        config = AsyncConfig(connector_args=dict(ssl_context=context))
+        client = create_http_client(config)
+        self.assertTrue(client.ssl_context is context)
+        self.assertTrue(client._ssl_context(verify=False) is context)
+
+    async def test_dns_cache(self):
+        dns_cache = create_http_client().dns_cache
+        address = await dns_cache.resolve('localhost', 443)
+        self.assertEqual(address[1], 443)
+        self.assertEqual(len(dns_cache), 1)
+        dns_cache.invalidate('localhost', 443)
+        self.assertEqual(len(dns_cache), 0)
+
+    def test_registry(self):
+        registry = PoolRegistry(max_connections=20)
+        client = registry.http_client()
+        self.assertTrue(client.shared)
+        self.assertTrue(registry.http_client() is client)
+        self.assertTrue(registry.http_client(AsyncConfig()) is client)
+        config = AsyncConfig(connector_args=dict(limit=3))
+        client3 = registry.http_client(config)
+        self.assertFalse(client3 is client)
+        self.assertEqual(client3.pool_size, 3)
+        limit = registry.connection_limit()
+        self.assertTrue(client.connection_limit is limit)
+        self.assertTrue(client3.connection_limit is limit)
+        self.assertEqual(limit.max_connections, 20)
+        self.assertEqual(set(limit.clients), set((client, client3)))
+
+    async def test_registry_close(self):
+        registry = PoolRegistry()
+        client = registry.http_client()
+        await client.close()
+        self.assertTrue(registry.http_client() is client)
+        await registry.close()
+        self.assertFalse(registry.http_client() is client)
+
+    async def test_connection_limit(self):
+        limit = ConnectionLimit(2)
+        await limit.acquire()
+        await limit.acquire()
+        self.assertEqual(limit.open, 2)
+        client = IdleClient(limit)
+        limit.clients.add(client)
+        await asyncio.wait_for(limit.acquire(), 1)
+        self.assertEqual(limit.open, 2)
+        self.assertEqual(limit.stats['connections'], 3)
+        self.assertEqual(limit.stats['evicted'], 1)
+
+    async def test_warmup(self):
+        server = FakeAwsServer().start()
+        http_session = create_http_client()
+        try:
+            client = AsyncioBotocore('dynamodb', 'us-east-1',
+                                     endpoint_url=server.url,
+                                     http_session=http_session,
+                                     aws_access_key_id='access',
+                                     aws_secret_access_key='secret')
+            elapsed = await client.warmup(3)
+            self.assertTrue(elapsed >= 0)
+            endpoint = client.endpoint
+            pool = http_session.get_pool(endpoint.host, endpoint.verify)
+            self.assertEqual(pool.available, 3)
+            await self._connections(server, 3)
+            # requests use the warm connections
+            await asyncio.gather(*[client.put_item(
+                TableName='table', Item={'id': {'S': str(i)}})
+                for i in range(3)])
+            self.assertEqual(server.stats['connections'], 3)
+            self.assertEqual(pool.available, 3)
+        finally:
+            await http_session.close()
+            server.stop()
+
+    async def _connections(self, server, connections):
+        # connections are accepted by the server thread
+        for _ in range(100):
+            if server.stats['connections'] >= connections:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(server.stats['connections'], connections)
@@ -0,0 +1,54 @@
+import os
+import sys
+import json
+import subprocess
+import unittest
+
+
+# Maximum time, in seconds, for importing a module of the package
+IMPORT_BUDGET = 0.25
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = '''
+import sys, time, json
+modules = set(sys.modules)
+start = time.perf_counter()
+import %s
+print(json.dumps(dict(
+    time=time.perf_counter() - start,
+    modules=sorted(set(sys.modules) - modules))))
+'''
+
+
+def import_module(module):
+    """Import ``module`` in a new interpreter
+
+    :return: a dictionary with the import ``time`` and the new ``modules``
+    """
+    output = subprocess.check_output([sys.executable, '-c', SCRIPT % module],
+                                     cwd=ROOT, universal_newlines=True)
+    return json.loads(output.strip().split('\n')[-1])
+
+
+class ImportTest(unittest.TestCase):
+
+    def assertNotImported(self, modules, *packages):
+        for package in packages:
+            imported = [m for m in modules
+                        if m == package or m.startswith(package + '.')]
+            self.assertFalse(imported, '%s imported' % package)
+
+    def test_cloud(self):
+        result = import_module('cloud')
+        self.assertLess(result['time'], IMPORT_BUDGET)
+        self.assertNotImported(result['modules'], 'pulsar', 'botocore')
+
+    def test_aws(self):
+        result = import_module('cloud.aws')
+        self.assertLess(result['time'], IMPORT_BUDGET)
+        self.assertNotImported(result['modules'], 'pulsar', 'botocore',
+                               'cloud.pusher')
+
+    def test_pusher(self):
+        result = import_module('cloud.pusher')
+        self.assertNotImported(result['modules'], 'botocore', 'cloud.aws',
+                               'cloud.asyncbotocore')
@@ -0,0 +1,81 @@
+import logging
+import unittest
+
+from botocore.exceptions import ClientError, ParamValidationError
+
+from cloud.asyncbotocore.config import AsyncConfig
+from cloud.asyncbotocore.instrumentation import (
+    Instrumentation, LatencySink, LoggingSink
+)
+
+from tests import fake_client
+from tests.test_endpoint import throttle
+
+
+class InstrumentationTest(unittest.TestCase):
+
+    def client(self, *sinks, handler=None, **kw):
+        config = AsyncConfig(instrumentation=Instrumentation(*sinks), **kw)
+        return fake_client('dynamodb', handler, config=config)
+
+    def test_config(self):
+        with self.assertRaises(ParamValidationError):
+            AsyncConfig(instrumentation=lambda timings: None)
+        instrumentation = Instrumentation()
+        config = AsyncConfig().merge(
+            AsyncConfig(instrumentation=instrumentation))
+        self.assertEqual(config.instrumentation, instrumentation)
+
+    def test_disabled(self):
+        client = fake_client('dynamodb')
+        self.assertEqual(client._endpoint.instrumentation, None)
+
+    async def test_phases(self):
+        calls = []
+        client = self.client(calls.append)
+        await client.list_tables()
+        self.assertEqual(len(calls), 1)
+        timings = calls[0]
+        self.assertEqual(timings.service, 'dynamodb')
+        self.assertEqual(timings.operation, 'ListTables')
+        self.assertEqual(timings.attempts, 1)
+        self.assertEqual(timings.error, None)
+        phases = [event[0] for event in timings.events]
+        self.assertEqual(phases, ['serialize', 'hash', 'sign', 'rate_limit',
+                                  'send', 'read', 'parse'])
+        for _, start, end in timings.events:
+            self.assertTrue(timings.start <= start <= end <= timings.end)
+        self.assertTrue(sum(timings.durations().values()) <=
+                        timings.duration)
+
+    async def test_retries(self):
+        calls = []
+        client = self.client(calls.append, handler=throttle,
+                             retry_args=dict(min_retries=1))
+        with self.assertRaises(ClientError):
+            await client.list_tables()
+        timings = calls[0]
+        self.assertEqual(timings.attempts, 2)
+        self.assertTrue(isinstance(timings.error, ClientError))
+        phases = [event[0] for event in timings.events]
+        self.assertEqual(phases.count('sign'), 2)
+        self.assertEqual(phases.count('retry_sleep'), 1)
+
+    async def test_latency_sink(self):
+        sink = LatencySink()
+        client = self.client(sink)
+        for _ in range(3):
+            await client.list_tables()
+        self.assertEqual(len(sink.latencies[('ListTables', 'total')]), 3)
+        self.assertTrue(sink.percentile('ListTables', 'parse') > 0)
+        self.assertEqual(sink.percentile('GetItem'), None)
+
+    async def test_logging_sink(self):
+        def failing(timings):
+            raise RuntimeError
+
+        client = self.client(failing, LoggingSink(level=logging.INFO))
+        with self.assertLogs('cloud.instrumentation', 'INFO') as logs:
+            await client.list_tables()
+        self.assertEqual(len(logs.records), 2)
+        self.assertTrue('dynamodb.ListTables' in logs.output[1])
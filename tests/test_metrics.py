@@ -0,0 +1,108 @@
+import os
+import asyncio
+import tempfile
+import unittest
+
+from botocore.exceptions import ClientError, ParamValidationError
+
+from cloud.aws import AsyncioBotocore
+from cloud.asyncbotocore.config import AsyncConfig
+from cloud.asyncbotocore.metrics import Histogram, MetricsRegistry, registry
+from cloud.utils.s3 import FolderUploader
+
+from tests import FakeHttpSession, FakeResponse, fake_client
+from tests.test_endpoint import hang, throttle
+
+
+async def ok(**kwargs):
+    return FakeResponse(headers={'content-length': '2'}, body=b'{}')
+
+
+class MetricsTest(unittest.TestCase):
+
+    def client(self, handler=ok, **kw):
+        metrics = MetricsRegistry()
+        config = AsyncConfig(metrics=metrics, **kw)
+        return fake_client('dynamodb', handler, config=config), metrics
+
+    def test_histogram(self):
+        histogram = Histogram()
+        self.assertEqual(histogram.percentile(50), None)
+        for i in range(1, 1001):
+            histogram.record(i/1000)
+        histogram.record(0)
+        self.assertEqual(len(histogram), 1001)
+        self.assertEqual(histogram.percentile(0), 0)
+        self.assertEqual(histogram.percentile(100), 1)
+        for percentile in (50, 90, 99):
+            value = histogram.percentile(percentile)
+            self.assertAlmostEqual(value, percentile/100,
+                                   delta=percentile/100/32)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['count'], 1001)
+        self.assertEqual(snapshot['max'], 1)
+
+    def test_config(self):
+        with self.assertRaises(ParamValidationError):
+            AsyncConfig(metrics={})
+        self.assertTrue(fake_client('dynamodb')._endpoint.metrics is
+                        registry)
+        client = fake_client('dynamodb', config=AsyncConfig(metrics=False))
+        self.assertEqual(client._endpoint.metrics, None)
+
+    async def test_calls(self):
+        client, metrics = self.client()
+        await client.list_tables()
+        await client.list_tables()
+        calls = metrics.operations[('dynamodb', 'ListTables', 200)]
+        self.assertEqual(calls.calls, 2)
+        self.assertEqual(calls.errors, 0)
+        self.assertEqual(calls.bytes_received, 4)
+        self.assertEqual(calls.bytes_sent, 4)
+        self.assertEqual(len(calls.latency), 2)
+        snapshot = metrics.snapshot()
+        self.assertEqual(len(snapshot), 1)
+        self.assertEqual(snapshot[0]['operation'], 'ListTables')
+        self.assertEqual(snapshot[0]['latency']['count'], 2)
+
+    async def test_errors(self):
+        client, metrics = self.client(throttle,
+                                      retry_args=dict(min_retries=1))
+        with self.assertRaises(ClientError):
+            await client.list_tables()
+        calls = metrics.operations[('dynamodb', 'ListTables', 400)]
+        self.assertEqual(calls.errors, 1)
+        self.assertEqual(calls.retries, 1)
+
+    async def test_in_flight(self):
+        client, metrics = self.client(hang)
+        request = asyncio.ensure_future(client.list_tables())
+        await asyncio.sleep(0.01)
+        self.assertEqual(metrics.in_flight[('dynamodb', 'ListTables')], 1)
+        self.assertEqual(metrics.snapshot()[0]['in_flight'], 1)
+        request.cancel()
+        await asyncio.wait([request])
+        self.assertEqual(metrics.in_flight[('dynamodb', 'ListTables')], 0)
+        calls = metrics.operations[('dynamodb', 'ListTables',
+                                    'CancelledError')]
+        self.assertEqual(calls.errors, 1)
+
+    async def test_folder_throughput(self):
+        s3 = AsyncioBotocore('s3', 'us-east-1',
+                             http_session=FakeHttpSession(),
+                             aws_access_key_id='access',
+                             aws_secret_access_key='secret')
+        with tempfile.TemporaryDirectory() as folder:
+            for name in ('a.txt', 'b.txt'):
+                with open(os.path.join(folder, name), 'wb') as fp:
+                    fp.write(b'x'*100)
+            uploader = FolderUploader(s3, 'bucket', folder, 'test')
+            self.assertEqual(uploader.throughput()['files'], 0)
+            await uploader.start()
+        calls = registry.operations[('s3', 'PutObject', 200)]
+        self.assertTrue(calls.bytes_sent >= 200)
+        throughput = uploader.throughput()
+        self.assertEqual(throughput['files'], 2)
+        self.assertEqual(throughput['bytes'], 200)
+        self.assertTrue(throughput['bytes_per_second'] > 0)
+        self.assertTrue(throughput['files_per_second'] > 0)
@@ -0,0 +1,88 @@
+import asyncio
+import unittest
+
+from botocore.exceptions import ParamValidationError
+
+from cloud.asyncbotocore.config import AsyncConfig
+from cloud.asyncbotocore.ratelimit import (
+    TokenBucket, AdaptiveRateLimiter, RetryBudget, jitter_delay, is_throttled
+)
+
+
+class FakeResponse:
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class RateLimitTest(unittest.TestCase):
+
+    async def test_token_bucket(self):
+        loop = asyncio.get_event_loop()
+        bucket = TokenBucket(100, loop=loop)
+        self.assertEqual(bucket.capacity, 100)
+        start = loop.time()
+        await bucket.acquire(100)
+        self.assertTrue(loop.time() - start < 0.05)
+        await bucket.acquire(10)
+        self.assertTrue(loop.time() - start >= 0.09)
+
+    async def test_token_bucket_set_rate(self):
+        bucket = TokenBucket()
+        await bucket.acquire(10**6)
+        bucket.set_rate(10)
+        self.assertEqual(bucket.rate, 10)
+        self.assertEqual(bucket.capacity, 10)
+        bucket.set_rate(None)
+        await bucket.acquire(10**6)
+
+    def test_retry_budget(self):
+        budget = RetryBudget(ratio=0.5, min_retries=2)
+        self.assertTrue(budget.withdraw())
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+        for _ in range(10):
+            budget.deposit()
+        self.assertEqual(budget.tokens, 2)
+
+    async def test_adaptive_rate_limiter(self):
+        limiter = AdaptiveRateLimiter(min_rate=2)
+        self.assertEqual(limiter.rate, None)
+        for _ in range(20):
+            await limiter.acquire()
+        limiter.throttled()
+        self.assertEqual(limiter.rate, 10)
+        # burst of throttling responses
+        limiter.throttled()
+        self.assertEqual(limiter.rate, 10)
+        limiter.succeeded()
+        self.assertEqual(limiter.rate, 10.1)
+
+    def test_jitter(self):
+        self.assertEqual(jitter_delay(1, 'none'), 1)
+        for _ in range(10):
+            self.assertTrue(0 <= jitter_delay(1, 'full') <= 1)
+            self.assertTrue(0.5 <= jitter_delay(1, 'equal') <= 1)
+
+    def test_is_throttled(self):
+        self.assertFalse(is_throttled(None))
+        self.assertTrue(is_throttled((FakeResponse(429), {})))
+        self.assertFalse(is_throttled((FakeResponse(200), {})))
+        self.assertTrue(is_throttled(
+            (FakeResponse(400),
+             {'Error': {'Code': 'ProvisionedThroughputExceededException'}})))
+
+    def test_retry_args(self):
+        config = AsyncConfig(retry_args=dict(jitter='full', min_retries=5))
+        self.assertEqual(config.retry_args['jitter'], 'full')
+        config = config.merge(AsyncConfig(retry_args=dict(adaptive=False)))
+        self.assertEqual(config.retry_args, dict(jitter='full', min_retries=5,
+                                                 adaptive=False))
+        self.assertRaises(ParamValidationError, AsyncConfig,
+                          retry_args=dict(jitter='random'))
+        self.assertRaises(ParamValidationError, AsyncConfig,
+                          retry_args=dict(foo=1))
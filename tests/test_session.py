@@ -0,0 +1,79 @@
+import unittest
+
+from botocore.exceptions import ClientError
+
+from cloud.asyncbotocore.config import AsyncConfig
+from cloud.asyncbotocore.session import get_session
+
+from tests import FakeHttpSession, fake_client
+from tests.test_endpoint import throttle
+
+
+class SessionTest(unittest.TestCase):
+
+    def test_shared_loader(self):
+        session1, session2 = get_session(), get_session()
+        self.assertTrue(session1.get_component('data_loader') is
+                        session2.get_component('data_loader'))
+        self.assertTrue(session1.get_component('endpoint_resolver') is
+                        session2.get_component('endpoint_resolver'))
+
+    def test_cached_client_class(self):
+        client1, client2 = fake_client('dynamodb'), fake_client('dynamodb')
+        self.assertFalse(client1 is client2)
+        self.assertTrue(type(client1) is type(client2))
+        self.assertTrue(client1._service_model is client2._service_model)
+        self.assertFalse(client1.meta.events is client2.meta.events)
+        client3 = fake_client('s3')
+        self.assertFalse(type(client3) is type(client1))
+
+    def test_client_class_handlers(self):
+        def add_method(name):
+            def handler(class_attributes, **kwargs):
+                class_attributes[name] = lambda self: name
+            return handler
+
+        sessions = get_session(), get_session()
+        for session, name in zip(sessions, ('first', 'second')):
+            session.register('creating-client-class.dynamodb',
+                             add_method(name))
+        client1, client2 = [session.create_client(
+            'dynamodb', region_name='us-east-1',
+            http_session=FakeHttpSession(), aws_access_key_id='access',
+            aws_secret_access_key='secret') for session in sessions]
+        self.assertFalse(type(client1) is type(client2))
+        self.assertEqual(client1.first(), 'first')
+        self.assertEqual(client2.second(), 'second')
+        self.assertFalse(hasattr(client1, 'second'))
+        self.assertFalse(hasattr(fake_client('dynamodb'), 'first'))
+
+    def test_cached_client_args(self):
+        from cloud.asyncbotocore.args import _client_args
+        config = AsyncConfig(user_agent_extra='test-args')
+        client1 = fake_client('sqs', config=config)
+        cached = len(_client_args)
+        client2 = fake_client('sqs', config=AsyncConfig(
+            user_agent_extra='test-args'))
+        self.assertEqual(len(_client_args), cached)
+        self.assertEqual(client1.meta.endpoint_url, client2.meta.endpoint_url)
+        self.assertFalse(client1.meta.config is client2.meta.config)
+        client3 = fake_client('sqs', config=config,
+                              endpoint_url='http://localhost:9324')
+        self.assertEqual(len(_client_args), cached + 1)
+        self.assertEqual(client3.meta.endpoint_url, 'http://localhost:9324')
+        client4 = get_session().create_client(
+            'sqs', region_name='eu-west-1', config=config,
+            http_session=client1.http_session,
+            aws_access_key_id='access', aws_secret_access_key='secret')
+        self.assertEqual(client4.meta.region_name, 'eu-west-1')
+        self.assertEqual(client4.meta.endpoint_url,
+                         'https://eu-west-1.queue.amazonaws.com')
+
+    async def test_retries_registered(self):
+        fake_client('dynamodb')
+        # the second client of a service has retry handlers too
+        config = AsyncConfig(retry_args=dict(min_retries=1))
+        client = fake_client('dynamodb', throttle, config=config)
+        with self.assertRaises(ClientError):
+            await client.list_tables()
+        self.assertEqual(len(client.http_session.requests), 2)
@@ -0,0 +1,92 @@
+import unittest
+from hashlib import sha256
+
+from botocore.auth import SigV4Auth, S3SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials
+
+from cloud.asyncbotocore.config import AsyncConfig
+from cloud.asyncbotocore.signers import (
+    AsyncSigV4Auth, AsyncS3SigV4Auth, SigningKeyCache, signing_keys,
+    _canonical_header_value
+)
+
+from tests import fake_client
+
+
+def dynamodb_request(timestamp='20170301T120000Z'):
+    request = AWSRequest(
+        method='POST', url='https://dynamodb.us-east-1.amazonaws.com/',
+        data=b'{"TableName": "test"}',
+        headers={'X-Amz-Target': 'DynamoDB_20120810.GetItem',
+                 'Content-Type': 'application/x-amz-json-1.0',
+                 'User-Agent': 'pulsar-cloud  test  agent'})
+    request.context['timestamp'] = timestamp
+    return request
+
+
+class SigningTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.credentials = Credentials('access', 'secret')
+
+    def _signatures(self, botocore_cls, async_cls, request):
+        auth = botocore_cls(self.credentials, 'dynamodb', 'us-east-1')
+        async_auth = async_cls(self.credentials, 'dynamodb', 'us-east-1')
+        cr = auth.canonical_request(request)
+        self.assertEqual(cr, async_auth.canonical_request(request))
+        sts = auth.string_to_sign(request, cr)
+        return (auth.signature(sts, request),
+                async_auth.signature(sts, request))
+
+    def test_signature(self):
+        signature, async_signature = self._signatures(
+            SigV4Auth, AsyncSigV4Auth, dynamodb_request())
+        self.assertEqual(signature, async_signature)
+
+    def test_s3_signature(self):
+        signature, async_signature = self._signatures(
+            S3SigV4Auth, AsyncS3SigV4Auth, dynamodb_request())
+        self.assertEqual(signature, async_signature)
+
+    def test_static_header_values(self):
+        _canonical_header_value.cache_clear()
+        request = dynamodb_request()
+        request.headers['X-Amz-Date'] = request.context['timestamp']
+        signature, async_signature = self._signatures(
+            SigV4Auth, AsyncSigV4Auth, request)
+        self.assertEqual(signature, async_signature)
+        # content type and target only, the user agent is not signed
+        self.assertEqual(_canonical_header_value.cache_info().currsize, 2)
+
+    def test_signing_key_reused(self):
+        signing_keys.clear()
+        for _ in range(3):
+            self._signatures(SigV4Auth, AsyncSigV4Auth, dynamodb_request())
+        self.assertEqual(len(signing_keys), 1)
+        self._signatures(SigV4Auth, AsyncSigV4Auth,
+                         dynamodb_request('20170302T000000Z'))
+        self.assertEqual(len(signing_keys), 2)
+
+    def test_signing_key_cache_size(self):
+        cache = SigningKeyCache(max_size=2)
+        key = cache.get('secret', '20170301', 'us-east-1', 'dynamodb')
+        self.assertEqual(
+            key, cache.get('secret', '20170301', 'us-east-1', 'dynamodb'))
+        cache.get('secret', '20170301', 'us-east-1', 's3')
+        self.assertEqual(len(cache), 2)
+        cache.get('secret', '20170301', 'eu-west-1', 's3')
+        self.assertEqual(len(cache), 1)
+
+    async def test_unsigned_payload_operations(self):
+        config = AsyncConfig(s3=dict(unsigned_payload=True))
+        client = fake_client('s3', config=config,
+                             endpoint_url='https://s3.amazonaws.com')
+        requests = client._endpoint.http_session.requests
+        await client.put_object(Bucket='bucket', Key='key', Body=b'data')
+        self.assertEqual(requests[-1]['headers']['X-Amz-Content-SHA256'],
+                         'UNSIGNED-PAYLOAD')
+        await client.head_object(Bucket='bucket', Key='key')
+        self.assertEqual(requests[-1]['headers']['X-Amz-Content-SHA256'],
+                         sha256(b'').hexdigest())
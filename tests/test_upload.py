@@ -0,0 +1,540 @@
+import os
+import sys
+import asyncio
+import hashlib
+import tempfile
+import unittest
+import subprocess
+import importlib.util
+from unittest import mock
+
+from pulsar.apps.test import sequential
+from botocore.exceptions import (
+    ClientError, ChecksumError, ParamValidationError
+)
+
+from cloud.aws import AsyncioBotocore
+from cloud.asyncbotocore import hashing
+from cloud.asyncbotocore.client import ClientClosedError
+from cloud.asyncbotocore.endpoint import DeadlineExceededError
+from cloud.asyncbotocore.config import AsyncConfig
+from cloud.utils.http import create_http_client
+from cloud.utils.s3 import (
+    BANDWIDTH_SLICE, MIN_PART_SIZE, BandwidthLimiter, ETag, UploadState
+)
+
+from tests import FakeHttpSession, FakeResponse
+from tests.bench.server import FakeAwsServer
+
+
+BUCKET = 'bucket'
+S3UPLOAD = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'bin',
+                        's3upload.py')
+INTERNAL_ERROR = {'Error': {'Code': 'InternalError'},
+                  'ResponseMetadata': {'HTTPStatusCode': 500}}
+ACCESS_DENIED = {'Error': {'Code': 'AccessDenied'},
+                 'ResponseMetadata': {'HTTPStatusCode': 403}}
+
+
+class SlowHandler:
+    """Answer requests after a short delay and record calls in flight
+    """
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.in_flight -= 1
+        return FakeResponse()
+
+
+def load_s3upload():
+    spec = importlib.util.spec_from_file_location('s3upload', S3UPLOAD)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_files(folder, sizes):
+    for name, size in sizes.items():
+        with open(os.path.join(folder, name), 'wb') as fp:
+            fp.write(os.urandom(size))
+
+
+@sequential
+class FolderUploadTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeAwsServer().start()
+        config = AsyncConfig(s3=dict(addressing_style='path'))
+        cls.http_session = create_http_client(config)
+        cls.s3 = AsyncioBotocore('s3', 'us-east-1',
+                                 endpoint_url=cls.server.url,
+                                 http_session=cls.http_session, config=config,
+                                 aws_access_key_id='access',
+                                 aws_secret_access_key='secret')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        return cls.http_session.close()
+
+    async def test_concurrency(self):
+        handler = SlowHandler()
+        s3 = AsyncioBotocore('s3', 'us-east-1',
+                             http_session=FakeHttpSession(handler),
+                             aws_access_key_id='access',
+                             aws_secret_access_key='secret')
+        with tempfile.TemporaryDirectory() as folder:
+            write_files(folder, dict(('f%d' % i, 10) for i in range(6)))
+            result = await s3.upload_folder(BUCKET, folder, key='test',
+                                            concurrency=2)
+        self.assertEqual(len(result['files']), 6)
+        self.assertEqual(handler.max_in_flight, 2)
+
+    async def test_part_size(self):
+        with tempfile.TemporaryDirectory() as folder:
+            write_files(folder, {'big.bin': MIN_PART_SIZE + 10})
+            with self.assertRaises(ValueError):
+                await self.s3.upload_file(BUCKET,
+                                          os.path.join(folder, 'big.bin'),
+                                          part_size=2**20)
+            result = await self.s3.upload_folder(BUCKET, folder, key='parts',
+                                                 part_size=MIN_PART_SIZE)
+        size = MIN_PART_SIZE + 10
+        self.assertEqual(result['files'], {'parts/big.bin': size})
+        self.assertFalse(self.server.uploads)
+        body = self.server.objects[(BUCKET, 'parts/big.bin')]
+        self.assertEqual(len(body), size)
+
+    async def test_throughput_progress(self):
+        sent = []
+        upload_part = self.s3.upload_part
+
+        async def recording_upload_part(**params):
+            sent.append(uploader.throughput()['bytes'])
+            return await upload_part(**params)
+
+        self.s3.upload_part = recording_upload_part
+        size = 2*MIN_PART_SIZE + 10
+        try:
+            with tempfile.TemporaryDirectory() as folder:
+                write_files(folder, {'big.bin': size})
+                uploader = self.s3.upload_folder(BUCKET, folder,
+                                                 key='progress',
+                                                 part_size=MIN_PART_SIZE)
+                result = await uploader
+        finally:
+            del self.s3.upload_part
+        self.assertEqual(sent, [0, MIN_PART_SIZE, 2*MIN_PART_SIZE])
+        self.assertEqual(uploader.throughput()['bytes'], size)
+        self.assertEqual(result['total_size'], size)
+
+    async def test_sync(self):
+        with tempfile.TemporaryDirectory() as folder:
+            write_files(folder, {'a.txt': 10, 'b.txt': 20})
+            result = await self.s3.upload_folder(BUCKET, folder, key='sync',
+                                                 sync=True)
+            self.assertEqual(len(result['files']), 2)
+            self.assertFalse(result['skipped'])
+            write_files(folder, {'b.txt': 30})
+            result = await self.s3.upload_folder(BUCKET, folder, key='sync',
+                                                 sync=True)
+        self.assertEqual(result['files'], {'sync/b.txt': 30})
+        self.assertEqual(result['skipped'], {'sync/a.txt': 10})
+
+    async def test_resume(self):
+        calls = []
+        upload_part = self.s3.upload_part
+
+        async def failing_upload_part(**params):
+            calls.append(params['PartNumber'])
+            if len(calls) == 2:
+                raise ConnectionResetError
+            return await upload_part(**params)
+
+        self.s3.upload_part = failing_upload_part
+        self.s3.part_attempts = 1
+        try:
+            with tempfile.TemporaryDirectory() as folder:
+                filename = os.path.join(folder, 'resume.bin')
+                size = 2*MIN_PART_SIZE + 10
+                write_files(folder, {'resume.bin': size})
+                state = os.path.join(folder, 'state')
+                with self.assertRaises(ConnectionResetError):
+                    await self.s3.upload_file(BUCKET, filename,
+                                              part_size=MIN_PART_SIZE,
+                                              resume=state)
+                self.assertEqual(len(os.listdir(state)), 1)
+                await self.s3.upload_file(BUCKET, filename,
+                                          part_size=MIN_PART_SIZE,
+                                          resume=state)
+                self.assertEqual(calls, [1, 2, 2, 3])
+                self.assertEqual(os.listdir(state), [])
+                with open(filename, 'rb') as fp:
+                    body = fp.read()
+        finally:
+            del self.s3.upload_part
+            del self.s3.part_attempts
+        self.assertEqual(self.server.objects[(BUCKET, 'resume.bin')], body)
+        self.assertFalse(self.server.uploads)
+
+    async def test_resume_changed_file(self):
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, 'changed.bin')
+            write_files(folder, {'changed.bin': MIN_PART_SIZE + 10})
+            state = UploadState(os.path.join(folder, 'state'), BUCKET,
+                                'changed.bin', filename, MIN_PART_SIZE)
+            response = await self.s3.create_multipart_upload(
+                Bucket=BUCKET, Key='changed.bin')
+            state.upload_id = response['UploadId']
+            state.save()
+            os.utime(filename, (0, 0))
+            await self.s3.upload_file(BUCKET, filename,
+                                      part_size=MIN_PART_SIZE,
+                                      resume=os.path.join(folder, 'state'))
+        self.assertNotIn(state.upload_id, self.server.uploads)
+        self.assertIn((BUCKET, 'changed.bin'), self.server.objects)
+
+    async def _upload_failing_parts(self, errors, key):
+        """Upload a file of two parts, the first attempts of the second part
+        raise ``errors``
+        """
+        errors = list(errors)
+        upload_part = self.s3.upload_part
+
+        async def failing_upload_part(**params):
+            if params['PartNumber'] == 2 and errors:
+                raise errors.pop(0)
+            return await upload_part(**params)
+
+        self.s3.upload_part = failing_upload_part
+        self.s3.part_backoff = 0.001
+        try:
+            with tempfile.TemporaryDirectory() as folder:
+                write_files(folder, {key: MIN_PART_SIZE + 10})
+                return await self.s3.upload_file(
+                    BUCKET, os.path.join(folder, key),
+                    part_size=MIN_PART_SIZE)
+        finally:
+            del self.s3.upload_part
+            del self.s3.part_backoff
+
+    async def test_part_retry(self):
+        response = await self._upload_failing_parts(
+            [ConnectionResetError(),
+             ClientError(INTERNAL_ERROR, 'UploadPart')], 'retry.bin')
+        self.assertEqual(response['PartRetries'], 2)
+        body = self.server.objects[(BUCKET, 'retry.bin')]
+        self.assertEqual(len(body), MIN_PART_SIZE + 10)
+
+    async def test_part_attempts_exhausted(self):
+        with self.assertRaises(ConnectionResetError):
+            await self._upload_failing_parts([ConnectionResetError()]*3,
+                                             'exhausted.bin')
+        self.assertNotIn((BUCKET, 'exhausted.bin'), self.server.objects)
+        self.assertFalse(self.server.uploads)
+
+    async def test_part_not_retried(self):
+        errors = [ClientError(ACCESS_DENIED, 'UploadPart'),
+                  ParamValidationError(report='invalid'),
+                  ClientClosedError(operation_name='UploadPart'),
+                  DeadlineExceededError(endpoint_url='s3', attempts=1)]
+        for error in errors:
+            # the second error would be raised by a retry
+            with self.assertRaises(type(error)):
+                await self._upload_failing_parts(
+                    [error, ConnectionResetError()], 'denied.bin')
+            self.assertFalse(self.server.uploads)
+
+    async def test_drain_multipart(self):
+        config = AsyncConfig(s3=dict(addressing_style='path'))
+        s3 = AsyncioBotocore('s3', 'us-east-1', endpoint_url=self.server.url,
+                             http_session=self.http_session, config=config,
+                             aws_access_key_id='access',
+                             aws_secret_access_key='secret')
+        s3.bandwidth_limiter = BandwidthLimiter(rate=32*2**20,
+                                                capacity=BANDWIDTH_SLICE)
+        with tempfile.TemporaryDirectory() as folder:
+            write_files(folder, {'drain.bin': 3*MIN_PART_SIZE})
+            upload = asyncio.ensure_future(s3.upload_file(
+                BUCKET, os.path.join(folder, 'drain.bin'),
+                part_size=MIN_PART_SIZE))
+            while not self.server.uploads:
+                await asyncio.sleep(0.01)
+            self.assertEqual(await s3.drain(), 0)
+            # the drain waited for the upload, which was aborted
+            self.assertTrue(upload.done())
+            with self.assertRaises(ClientClosedError):
+                upload.result()
+        self.assertFalse(self.server.uploads)
+        self.assertNotIn((BUCKET, 'drain.bin'), self.server.objects)
+
+    def test_etag(self):
+        data = os.urandom(1000)
+        etag = ETag()
+        etag.update(data[:10])
+        etag.update(data[10:])
+        self.assertEqual(etag.hexdigest(), hashlib.md5(data).hexdigest())
+        etag = ETag(300)
+        for start in range(0, 1000, 70):
+            etag.update(data[start:start + 70])
+        digests = b''.join(hashlib.md5(data[i:i + 300]).digest()
+                           for i in range(0, 1000, 300))
+        self.assertEqual(etag.hexdigest(),
+                         '%s-4' % hashlib.md5(digests).hexdigest())
+
+    async def test_verify_upload(self):
+        with tempfile.TemporaryDirectory() as folder:
+            write_files(folder, {'small.bin': 100,
+                                 'large.bin': MIN_PART_SIZE + 10})
+            for name, parts in (('small.bin', 1), ('large.bin', 2)):
+                # bodies are hashed once, botocore reuses the digests
+                with mock.patch.object(hashing, 'md5_base64',
+                                       wraps=hashing.md5_base64) as md5:
+                    response = await self.s3.upload_file(
+                        BUCKET, os.path.join(folder, name),
+                        uploadpath='verify', part_size=MIN_PART_SIZE,
+                        verify=True)
+                self.assertEqual(md5.call_count, parts)
+                self.assertEqual(response['Key'], 'verify/%s' % name)
+
+    async def test_verify_part(self):
+        corrupted = []
+        upload_part = self.s3.upload_part
+
+        async def corrupting_upload_part(**params):
+            if not corrupted:
+                corrupted.append(params['PartNumber'])
+                params['Body'] = params['Body'].getvalue()[1:]
+            return await upload_part(**params)
+
+        self.s3.upload_part = corrupting_upload_part
+        self.s3.part_backoff = 0.001
+        try:
+            with tempfile.TemporaryDirectory() as folder:
+                write_files(folder, {'corrupted.bin': MIN_PART_SIZE + 10})
+                filename = os.path.join(folder, 'corrupted.bin')
+                response = await self.s3.upload_file(
+                    BUCKET, filename, part_size=MIN_PART_SIZE, verify=True)
+                with open(filename, 'rb') as fp:
+                    body = fp.read()
+        finally:
+            del self.s3.upload_part
+            del self.s3.part_backoff
+        self.assertEqual(corrupted, [1])
+        self.assertEqual(response['PartRetries'], 1)
+        self.assertEqual(self.server.objects[(BUCKET, 'corrupted.bin')],
+                         body)
+
+    async def test_download(self):
+        body = os.urandom(MIN_PART_SIZE + 10)
+        sha256 = hashlib.sha256(body).hexdigest()
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, 'download.bin')
+            with open(filename, 'wb') as fp:
+                fp.write(body)
+            await self.s3.upload_file(BUCKET, filename,
+                                      part_size=MIN_PART_SIZE)
+            os.remove(filename)
+            response = await self.s3.download_file(
+                BUCKET, 'download.bin', filename, checksum=sha256,
+                part_size=MIN_PART_SIZE)
+            self.assertEqual(response['Checksum'], sha256)
+            with open(filename, 'rb') as fp:
+                self.assertEqual(fp.read(), body)
+            with self.assertRaises(ChecksumError):
+                await self.s3.download_file(BUCKET, 'download.bin', filename,
+                                            checksum='0'*64)
+            self.assertFalse(os.path.exists(filename))
+            with self.assertRaises(ChecksumError):
+                await self.s3.download_file(BUCKET, 'download.bin', filename,
+                                            part_size=2*MIN_PART_SIZE)
+
+    async def test_download_unverified_etag(self):
+        body = os.urandom(1000)
+        self.server.put(BUCKET, 'kms.bin', body, '"not-an-md5"')
+        self.server.put(BUCKET, 'range.bin', body)
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, 'download.bin')
+            await self.s3.download_file(BUCKET, 'kms.bin', filename)
+            with open(filename, 'rb') as fp:
+                self.assertEqual(fp.read(), body)
+            response = await self.s3.download_file(
+                BUCKET, 'range.bin', filename, Range='bytes=0-99')
+            self.assertEqual(response['ContentLength'], 100)
+            with open(filename, 'rb') as fp:
+                self.assertEqual(fp.read(), body[:100])
+
+    async def test_bandwidth(self):
+        limiter = BandwidthLimiter(rate=4*2**20, capacity=2**18)
+        loop = asyncio.get_event_loop()
+        self.s3.bandwidth_limiter = limiter
+        try:
+            with tempfile.TemporaryDirectory() as folder:
+                write_files(folder, {'a.bin': 2**20, 'b.bin': 2**20})
+                start = loop.time()
+                await self.s3.upload_folder(BUCKET, folder, key='bandwidth')
+                elapsed = loop.time() - start
+                self.assertGreater(elapsed, 0.4)
+                limiter.set_rate(32*2**20, 2**18)
+                start = loop.time()
+                await self.s3.download_file(BUCKET, 'bandwidth/a.bin',
+                                            os.path.join(folder, 'c.bin'))
+                self.assertLess(loop.time() - start, elapsed)
+        finally:
+            del self.s3.bandwidth_limiter
+        self.assertEqual(limiter._buckets[loop].rate, 32*2**20)
+
+    async def test_slow_upload_timeout(self):
+        # the body takes longer to send than the connect and read timeouts
+        config = AsyncConfig(connect_timeout=0.1, read_timeout=0.1,
+                             s3=dict(addressing_style='path'))
+        s3 = AsyncioBotocore('s3', 'us-east-1', endpoint_url=self.server.url,
+                             http_session=self.http_session, config=config,
+                             aws_access_key_id='access',
+                             aws_secret_access_key='secret')
+        s3.bandwidth_limiter = BandwidthLimiter(rate=2**22,
+                                                capacity=BANDWIDTH_SLICE)
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        await s3.upload_file(BUCKET, os.urandom(2**21), key='slow.bin')
+        self.assertGreater(loop.time() - start, 0.4)
+        self.assertEqual(s3.endpoint.retry_stats['retries'], 0)
+
+    async def test_bandwidth_streamed(self):
+        loop = asyncio.get_event_loop()
+        sent = []
+
+        async def handler(data=None, **kwargs):
+            for chunk in data:
+                chunk = await chunk
+                sent.append((loop.time(), len(chunk)))
+            return FakeResponse()
+
+        s3 = AsyncioBotocore('s3', 'us-east-1',
+                             http_session=FakeHttpSession(handler),
+                             aws_access_key_id='access',
+                             aws_secret_access_key='secret')
+        s3.bandwidth_limiter = BandwidthLimiter(rate=2**22,
+                                                capacity=BANDWIDTH_SLICE)
+        await s3.upload_file(BUCKET, os.urandom(2**20), key='streamed')
+        # the body is sent in slices spread over a quarter of a second
+        self.assertEqual([size for _, size in sent], [BANDWIDTH_SLICE]*4)
+        self.assertGreater(sent[-1][0] - sent[0][0], 0.15)
+
+    async def test_bandwidth_failed_attempt(self):
+        sent = []
+        writers = []
+
+        async def write(data):
+            for chunk in data:
+                sent.append(await chunk)
+
+        async def handler(data=None, **kwargs):
+            # the body is written by a background task, as pulsar does
+            writers.append(asyncio.ensure_future(write(data)))
+            await asyncio.sleep(10)
+
+        s3 = AsyncioBotocore('s3', 'us-east-1',
+                             http_session=FakeHttpSession(handler),
+                             config=AsyncConfig(deadline=0.2),
+                             aws_access_key_id='access',
+                             aws_secret_access_key='secret')
+        s3.bandwidth_limiter = BandwidthLimiter(rate=2**20,
+                                                capacity=BANDWIDTH_SLICE)
+        with self.assertRaises(DeadlineExceededError):
+            await s3.upload_file(BUCKET, os.urandom(2**21), key='failed')
+        await asyncio.sleep(0.1)
+        # the writer of the failed attempt stopped taking bandwidth
+        self.assertTrue(all(writer.done() for writer in writers))
+        self.assertLess(len(sent), 2)
+
+    async def test_bandwidth_download_paused(self):
+        from cloud.utils.s3 import _throttle_download
+        loop = asyncio.get_event_loop()
+        transport = mock.Mock()
+        transport.is_closing.return_value = False
+        body = mock.Mock(done=False)
+        body._response.transport = transport
+        limiter = BandwidthLimiter(rate=2**20, capacity=BANDWIDTH_SLICE)
+        await _throttle_download(limiter, body, b'x'*BANDWIDTH_SLICE, loop)
+        transport.pause_reading.assert_called_once_with()
+        transport.resume_reading.assert_called_once_with()
+        # the response is received, reading is not paused
+        body.done = True
+        await _throttle_download(limiter, body, b'x'*BANDWIDTH_SLICE, loop)
+        self.assertEqual(transport.pause_reading.call_count, 1)
+
+    async def test_bandwidth_unlimited(self):
+        limiter = BandwidthLimiter()
+        await limiter.acquire(2**30, asyncio.get_event_loop())
+        self.assertFalse(limiter._buckets)
+
+
+class S3uploadTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.s3upload = load_s3upload()
+
+    def test_shard_files(self):
+        files = dict(('f%d' % i, size)
+                     for i, size in enumerate((90, 50, 40, 30, 20, 10)))
+        shards = self.s3upload.shard_files(files, 3)
+        self.assertEqual(len(shards), 3)
+        self.assertEqual([sum(shard.values()) for shard in shards],
+                         [90, 80, 70])
+        merged = {}
+        for shard in shards:
+            merged.update(shard)
+        self.assertEqual(merged, files)
+
+    def test_shard_files_empty(self):
+        self.assertEqual(self.s3upload.shard_files({}, 4), [])
+
+    def test_shard_more_workers_than_files(self):
+        shards = self.s3upload.shard_files({'a': 10, 'b': 20}, 4)
+        self.assertEqual(shards, [{'b': 20}, {'a': 10}])
+
+    def test_merge_results(self):
+        results = [dict(failures={'a': 1}, files={'b': 2}, skipped={},
+                        total_size=2, part_retries=1),
+                   dict(failures={}, files={'c': 3, 'd': 4}, skipped={'e': 5},
+                        total_size=7, part_retries=2)]
+        merged = self.s3upload.merge_results(results)
+        self.assertEqual(merged, dict(failures={'a': 1},
+                                      files={'b': 2, 'c': 3, 'd': 4},
+                                      skipped={'e': 5}, total_size=9,
+                                      part_retries=3))
+        self.assertEqual(self.s3upload.merge_results([])['files'], {})
+
+    def test_upload_workers(self):
+        # run the script in a new process, workers are forked from it
+        server = FakeAwsServer().start()
+        env = dict(os.environ, AWS_ACCESS_KEY_ID='access',
+                   AWS_SECRET_ACCESS_KEY='secret',
+                   PYTHONPATH=os.pathsep.join(sys.path))
+        try:
+            with tempfile.TemporaryDirectory() as folder:
+                sizes = dict(('f%d.bin' % i, 1000*i) for i in range(1, 8))
+                write_files(folder, sizes)
+                process = subprocess.run(
+                    [sys.executable, S3UPLOAD, folder, '-b', 'bucket/workers',
+                     '--workers', '3', '--endpoint-url', server.url],
+                    env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                    timeout=60)
+        finally:
+            server.stop()
+        output = process.stdout.decode('utf-8')
+        self.assertEqual(process.returncode, 0, output)
+        self.assertIn('3 workers uploaded 7 files', output)
+        for name, size in sizes.items():
+            body = server.objects[(BUCKET, 'workers/%s' % name)]
+            self.assertEqual(len(body), size)